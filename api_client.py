@@ -0,0 +1,343 @@
+import logging
+import socket
+import threading
+import urllib.request
+from contextlib import contextmanager
+
+import httpcore
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+# DeepSeek API配置
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+# 连接池默认配置
+DEFAULT_POOL_SIZE = 5            # 默认连接池大小（与默认并发线程数一致）
+DEFAULT_KEEPALIVE_EXPIRY = 60.0  # 空闲连接保持时间（秒）
+
+# 请求超时默认配置：连接超时较短以便尽快重试，读取超时覆盖长批次的生成时间
+DEFAULT_CONNECT_TIMEOUT = 10.0   # 建立连接的超时（秒）
+DEFAULT_READ_TIMEOUT = 120.0     # 两次收到数据之间的最长间隔（秒）
+
+
+class ConnectionMetrics:
+    """统计HTTP请求数、新建连接数和TLS握手次数
+
+    每个任务持有自己的统计对象：同步客户端在 record_connections 范围内的请求计入该对象，
+    异步客户端在创建时传入。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    def trace(self, event_name, info):
+        """httpcore 跟踪回调，在建立连接和完成握手时计数"""
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def atrace(self, event_name, info):
+        """异步客户端使用的 httpcore 跟踪回调"""
+        self.trace(event_name, info)
+
+    def on_request(self, request):
+        """httpx 请求钩子：计数并挂载跟踪回调"""
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def on_request_async(self, request):
+        """异步 httpx 请求钩子"""
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self.atrace
+
+    def snapshot(self):
+        """返回当前统计数据，reuse_ratio 为复用已有连接的请求比例"""
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0,
+            }
+
+
+
+# 共享的同步客户端由多个任务同时使用，请求按发出线程当前所属的统计对象计数
+_metrics_scope = threading.local()
+
+
+@contextmanager
+def record_connections(metrics):
+    """with 块内本线程通过共享客户端发出的请求计入 metrics"""
+    previous = getattr(_metrics_scope, "metrics", None)
+    _metrics_scope.metrics = metrics
+    try:
+        yield
+    finally:
+        _metrics_scope.metrics = previous
+
+
+def _on_request(request):
+    """共享客户端的请求钩子：计入当前线程所属任务的统计对象"""
+    metrics = getattr(_metrics_scope, "metrics", None)
+    if metrics is not None:
+        metrics.on_request(request)
+
+# 进程内共享的客户端，按 (api_key, base_url) 复用
+_clients = {}
+_clients_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+_keepalive_expiry = DEFAULT_KEEPALIVE_EXPIRY
+# 连接池重新配置时被替换的基础客户端不能立即关闭（其他任务可能还在用它等待响应），
+# use_client 记录每个基础客户端正在进行的调用数，被替换的客户端在最后一次调用结束后关闭
+_clients_in_use = {}    # {基础客户端: 正在使用它的调用数}
+_retired_clients = set()
+
+
+# 取消任务时中断正在等待响应的请求：关闭客户端不会唤醒阻塞在读取上的线程，
+# 因此每次读取前登记所属任务的取消事件和套接字，取消时直接 shutdown 这些套接字
+_abort_scope = threading.local()
+_active_reads = {}  # {取消事件: {线程ID: 套接字}}
+_active_reads_lock = threading.Lock()
+
+
+@contextmanager
+def abortable_requests(cancel_event):
+    """with 块内本线程通过共享客户端发出的请求可以被 abort_requests(cancel_event) 立即中断"""
+    previous = getattr(_abort_scope, "event", None)
+    _abort_scope.event = cancel_event
+    try:
+        yield
+    finally:
+        _abort_scope.event = previous
+
+
+def abort_requests(cancel_event):
+    """断开与 cancel_event 关联、正在等待数据的连接，阻塞的读取立即出错返回
+
+    调用前应先设置 cancel_event，之后才开始的读取会直接失败。
+    """
+    with _active_reads_lock:
+        for sock in _active_reads.get(cancel_event, {}).values():
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _AbortableStream(httpcore.NetworkStream):
+    """读取期间登记套接字的网络流，其他线程可以通过 abort_requests 中断读取"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, max_bytes, timeout=None):
+        event = getattr(_abort_scope, "event", None)
+        if event is None:
+            return self._stream.read(max_bytes, timeout)
+        ident = threading.get_ident()
+        with _active_reads_lock:
+            _active_reads.setdefault(event, {})[ident] = self._stream.get_extra_info("socket")
+        try:
+            if event.is_set():
+                raise httpcore.ReadError("请求已取消")
+            return self._stream.read(max_bytes, timeout)
+        finally:
+            with _active_reads_lock:
+                reads = _active_reads[event]
+                del reads[ident]
+                if not reads:
+                    del _active_reads[event]
+
+    def write(self, buffer, timeout=None):
+        self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        return _AbortableStream(self._stream.start_tls(ssl_context, server_hostname, timeout))
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+
+class _AbortableBackend(httpcore.NetworkBackend):
+    """建立可中断网络流的同步网络后端"""
+
+    def __init__(self):
+        self._backend = httpcore.SyncBackend()
+
+    def connect_tcp(self, *args, **kwargs):
+        return _AbortableStream(self._backend.connect_tcp(*args, **kwargs))
+
+    def connect_unix_socket(self, *args, **kwargs):
+        return _AbortableStream(self._backend.connect_unix_socket(*args, **kwargs))
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+
+class _AbortableTransport(httpx.HTTPTransport):
+    """连接可被 abort_requests 中断的 httpx 传输层"""
+
+    def __init__(self, limits):
+        super().__init__(limits=limits)
+        # HTTPTransport 没有设置网络后端的参数，按相同的默认参数重建连接池
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=_AbortableBackend(),
+        )
+
+
+def make_timeout(connect_timeout=None, read_timeout=None):
+    """构建请求超时：connect 为建立连接的超时，读取、写入和等待空闲连接使用 read_timeout"""
+    return httpx.Timeout(
+        read_timeout if read_timeout is not None else DEFAULT_READ_TIMEOUT,
+        connect=connect_timeout if connect_timeout is not None else DEFAULT_CONNECT_TIMEOUT,
+    )
+
+
+_timeout = make_timeout()
+
+
+def configure_pool(pool_size=None, keepalive_expiry=None, timeout=None):
+    """设置连接池大小、空闲连接保持时间和客户端默认超时（make_timeout 的返回值）
+
+    配置变化后，之后获取的客户端会使用新的连接池。旧客户端没有在途调用时立即关闭；
+    仍有 use_client 调用在使用时继续保留，它们照常完成，最后一个调用结束后再关闭。
+    """
+    global _pool_size, _keepalive_expiry, _timeout
+    pool_size = max(int(pool_size or DEFAULT_POOL_SIZE), 1)
+    keepalive_expiry = keepalive_expiry if keepalive_expiry is not None else _keepalive_expiry
+    timeout = timeout or _timeout
+    with _clients_lock:
+        if pool_size == _pool_size and keepalive_expiry == _keepalive_expiry and timeout == _timeout:
+            return
+        _pool_size = pool_size
+        _keepalive_expiry = keepalive_expiry
+        _timeout = timeout
+        # 不同重试次数的客户端与基础客户端共享连接池，只需关闭基础客户端
+        retired = [client for key, client in _clients.items() if len(key) == 2]
+        _clients.clear()
+        idle = [client for client in retired if client not in _clients_in_use]
+        _retired_clients.update(client for client in retired if client in _clients_in_use)
+    for client in idle:
+        client.close()
+
+
+def ensure_pool_size(pool_size):
+    """连接池小于 pool_size 时扩大连接池，已经足够大时不做改动（不会缩小其他任务正在使用的连接池）"""
+    with _clients_lock:
+        current = _pool_size
+    if pool_size > current:
+        configure_pool(pool_size)
+
+
+def _lookup_client(api_key, base_url, max_retries):
+    """返回 (基础客户端, 请求使用的客户端)，调用方需持有 _clients_lock"""
+    if not api_key:
+        raise ValueError("API Key未设置")
+
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is None:
+        limits = httpx.Limits(
+            max_connections=_pool_size,
+            max_keepalive_connections=_pool_size,
+            keepalive_expiry=_keepalive_expiry,
+        )
+        # 自定义传输层会关闭 httpx 的环境变量代理支持，配置了代理时使用默认传输层（取消时等待读取超时）
+        transport = None if urllib.request.getproxies() else _AbortableTransport(limits)
+        http_client = httpx.Client(
+            limits=limits,
+            transport=transport,
+            event_hooks={"request": [_on_request]},
+        )
+        client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, timeout=_timeout)
+        _clients[key] = client
+        logger.debug(f"创建共享API客户端，连接池大小: {_pool_size}")
+    if max_retries is None:
+        return client, client
+
+    variant_key = key + (max_retries,)
+    variant = _clients.get(variant_key)
+    if variant is None:
+        variant = client.with_options(max_retries=max_retries)
+        _clients[variant_key] = variant
+    return client, variant
+
+
+def get_client(api_key, base_url=DEEPSEEK_BASE_URL, max_retries=None):
+    """获取共享的线程安全 OpenAI 客户端（长连接复用）
+
+    max_retries 不为 None 时返回共享同一连接池、但 SDK 内置重试次数不同的客户端，
+    由调用方自行负责重试时传入0。
+    返回的客户端可能在连接池重新配置时被关闭，持有它发送请求时应使用 use_client。
+    """
+    with _clients_lock:
+        return _lookup_client(api_key, base_url, max_retries)[1]
+
+
+@contextmanager
+def use_client(api_key, base_url=DEEPSEEK_BASE_URL, max_retries=None):
+    """with 块内使用共享客户端，参数同 get_client
+
+    期间连接池被重新配置（例如另一个并发数更大的任务开始运行）时，客户端不会被关闭，
+    块内的请求照常完成，最后一个使用者离开后才关闭旧客户端。
+    """
+    with _clients_lock:
+        base, client = _lookup_client(api_key, base_url, max_retries)
+        _clients_in_use[base] = _clients_in_use.get(base, 0) + 1
+    try:
+        yield client
+    finally:
+        with _clients_lock:
+            _clients_in_use[base] -= 1
+            close = False
+            if not _clients_in_use[base]:
+                del _clients_in_use[base]
+                close = base in _retired_clients
+                _retired_clients.discard(base)
+        if close:
+            base.close()
+
+
+def create_async_client(api_key, base_url=DEEPSEEK_BASE_URL, pool_size=None, max_retries=None,
+                        timeout=None, metrics=None):
+    """创建异步 OpenAI 客户端
+
+    异步连接池绑定在创建它的事件循环上，因此不做进程级共享，
+    由调用方在事件循环结束前关闭。timeout 为空时使用 configure_pool 设置的默认超时。
+    metrics 为可选的 ConnectionMetrics，该客户端的请求计入其中。
+    """
+    if not api_key:
+        raise ValueError("API Key未设置")
+
+    pool_size = max(int(pool_size or _pool_size), 1)
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=_keepalive_expiry,
+        ),
+        event_hooks={"request": [metrics.on_request_async]} if metrics else {},
+    )
+    extra_params = {} if max_retries is None else {"max_retries": max_retries}
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                       timeout=timeout or _timeout, **extra_params)
+
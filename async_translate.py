@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+
+from api_client import create_async_client
+from rate_limiter import get_rate_limiter, estimate_request_tokens
+from retry_policy import run_steps_async, is_auth_error, CANCEL_CHECK_INTERVAL
+from batch_pipeline import translate_task_steps
+from translation_prompts import (check_auth_error, TRANSLATION_MODEL, TRANSLATION_TEMPERATURE,
+                                 TRANSLATION_MAX_TOKENS)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ASYNC_CONCURRENCY = 100  # 默认最大并发请求数
+
+
+async def request_translation_async(client, messages, controller=None, max_tokens=None, json_mode=False,
+                                    usage=None, rate_limit_stats=None):
+    """发送异步翻译请求，记录 token 用量和限流等待，并向自适应并发控制器反馈延迟和过载错误"""
+    extra_params = {"response_format": {"type": "json_object"}} if json_mode else {}
+    max_tokens = max_tokens or TRANSLATION_MAX_TOKENS
+    await get_rate_limiter().acquire_async(estimate_request_tokens(messages, max_tokens), rate_limit_stats)
+    start_time = time.monotonic()
+    try:
+        response = await client.chat.completions.create(
+            model=TRANSLATION_MODEL,
+            messages=messages,
+            temperature=TRANSLATION_TEMPERATURE,
+            max_tokens=max_tokens,
+            **extra_params
+        )
+    except Exception as e:
+        if controller:
+            controller.record_failure(e, start_time)
+        check_auth_error(e)
+        raise
+    if controller:
+        controller.record_success(time.monotonic() - start_time,
+                                  getattr(response.usage, "completion_tokens", None) or max_tokens)
+    if usage:
+        usage.record(response.usage)
+    return response.choices[0].message.content
+
+
+async def run_batches_async(batches, translate, on_result, concurrency, is_cancelled, controller=None):
+    """在并发上限内执行所有批次，每个批次完成后立即回调写入结果
+
+    batches 按需逐个取出，不会一次性创建全部协程；
+    提供 controller 时并发上限随控制器动态调整。
+    任务被取消时在 CANCEL_CHECK_INTERVAL 秒内撤销所有在途协程，对应的 HTTP 请求随之关闭。
+    返回 False 表示任务被取消；API Key 无效时同样撤销所有在途批次，然后抛出该错误。
+    """
+    tasks = set()
+    auth_errors = []
+
+    def stopped():
+        return bool(auth_errors) or is_cancelled()
+
+    async def run_one(task):
+        try:
+            translations = await translate(task)
+            # 取消时已返回的批次也写回，未完成的条目带有取消标记，写回时会被跳过
+            on_result(task, translations)
+        except Exception as e:
+            # API Key 无效时其他批次也不会成功，中止整个任务
+            if is_auth_error(e):
+                auth_errors.append(e)
+                return
+            logger.error(f"处理翻译结果时出错: {e}")
+
+    async def wait_any():
+        # 带超时等待，便于及时发现取消
+        await asyncio.wait(tasks, timeout=CANCEL_CHECK_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+
+    for task in batches:
+        while tasks and len(tasks) >= (controller.limit if controller else concurrency) and not stopped():
+            await wait_any()
+        if stopped():
+            break
+        future = asyncio.create_task(run_one(task))
+        tasks.add(future)
+        future.add_done_callback(tasks.discard)
+
+    while tasks and not stopped():
+        await wait_any()
+    if tasks:
+        logger.info(f"任务已{'中止' if auth_errors else '取消'}，撤销 {len(tasks)} 个在途批次")
+        for future in list(tasks):
+            future.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if auth_errors:
+        raise auth_errors[0]
+    return not is_cancelled()
+
+
+def run_translation_async(batches, on_result, api_key, base_url, source_lang, reference_lang=None,
+                          concurrency=DEFAULT_ASYNC_CONCURRENCY, retry_policy=None, is_cancelled=None,
+                          controller=None, max_tokens_for=None, timeout=None, usage_tracker=None,
+                          connection_metrics=None, rate_limit_stats=None):
+    """使用 asyncio 引擎翻译所有批次
+
+    batches: 可迭代的 (列索引, 目标语言, [(行号列表, 原文, 参考文本), ...])
+    on_result: 写回回调 on_result(任务, 翻译结果)
+    max_tokens_for: 可选，根据任务计算该批请求的 max_tokens
+    timeout: 可选，请求超时（api_client.make_timeout 的返回值）
+    usage_tracker: 可选，记录各批次 token 用量的 UsageTracker
+    connection_metrics: 可选，统计请求数和新建连接数的 ConnectionMetrics
+    rate_limit_stats: 可选，统计限流等待的 RateLimitStats
+
+    列索引为 None 的任务是多目标语言批次，单元为 (目标列表, 原文, 参考文本)。
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+
+    async def main():
+        # 关闭 SDK 内置重试，由 retry_policy 统一负责退避和部分重试
+        client = create_async_client(api_key, base_url, concurrency, max_retries=0, timeout=timeout,
+                                     metrics=connection_metrics)
+        try:
+            async def translate(task):
+                # 请求、修复、重试和多目标回退与线程引擎共用 batch_pipeline 中的流程
+                steps = translate_task_steps(
+                    task, source_lang, reference_lang, retry_policy, is_cancelled,
+                    max_tokens_for(task) if max_tokens_for else None, usage_tracker
+                )
+                return await run_steps_async(steps, lambda request: request_translation_async(
+                    client, request.messages, controller, request.max_tokens, request.json_mode, request.usage,
+                    rate_limit_stats
+                ), is_cancelled)
+
+            return await run_batches_async(
+                batches, translate, on_result, concurrency, is_cancelled, controller
+            )
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
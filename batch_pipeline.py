@@ -0,0 +1,137 @@
+# 单个批次的翻译流程：构建请求、解析结果、补发修复请求、部分重试和多目标语言回退
+# 流程写成与 I/O 无关的步骤生成器：产出 Request（发送一次请求）和 Sleep（重试退避）步骤，
+# 线程引擎用 run_steps、asyncio 引擎用 run_steps_async 执行，两种引擎共用同一份逻辑
+
+import logging
+
+from retry_policy import RetryPolicy, retry_steps, is_auth_error
+from translation_prompts import (build_batch_messages, build_reference_messages,
+                                 build_multi_target_messages, parse_batch_items,
+                                 parse_multi_target_response, MAX_REPAIR_ROUNDS)
+
+logger = logging.getLogger(__name__)
+
+# 任务取消时未完成条目的标记，写回时跳过，续传时重新翻译
+CANCELLED_MARKER = "[已取消]"
+
+
+class Request:
+    """请求步骤：执行方发送一次翻译请求，送回响应内容；usage 为记录用量的 BatchUsage"""
+
+    def __init__(self, messages, max_tokens=None, json_mode=False, usage=None):
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.json_mode = json_mode
+        self.usage = usage
+
+
+def request_items_steps(build_messages, count, max_tokens=None, usage=None, is_cancelled=None):
+    """以 JSON 模式请求一批条目，只对缺失或格式错误的条目补发修复请求
+
+    build_messages(indices) 为给定条目下标构建请求消息，返回 {条目下标: 译文}。
+    """
+    translations = {}
+    indices = list(range(count))
+    for repair_round in range(MAX_REPAIR_ROUNDS + 1):
+        if repair_round:
+            logger.info(f"{len(indices)} 条结果缺失或格式错误，补发修复请求")
+        try:
+            result = yield Request(build_messages(indices), max_tokens, json_mode=True, usage=usage)
+        except Exception as e:
+            # 首次请求失败交给重试策略；修复请求失败时保留已得到的结果
+            if not repair_round or is_auth_error(e):
+                raise
+            logger.error(f"修复请求失败: {e}")
+            break
+        parsed = parse_batch_items(result, len(indices))
+        for local_index, translation in parsed.items():
+            translations[indices[local_index]] = translation
+        indices = [i for i in indices if i not in translations]
+        if not indices or (is_cancelled and is_cancelled()):
+            break
+    return translations
+
+
+def translate_items_steps(batch_data, source_lang, target_lang, reference_lang=None, policy=None,
+                          is_cancelled=None, max_tokens=None, usage_tracker=None):
+    """把一批条目翻译成一个目标语言，batch_data 为 [(原文, 参考文本), ...]
+
+    reference_lang 不为空时使用带参考翻译的提示词。失败时只重发失败的子批次，反复失败时对半拆分；
+    API Key 无效直接向上抛出。返回 [(原文, 译文), ...]，任务取消时未完成的条目为 CANCELLED_MARKER。
+    """
+    if is_cancelled and is_cancelled():
+        return [(text, CANCELLED_MARKER) for text, _ in batch_data]
+    usage = usage_tracker.start_batch(target_lang, len(batch_data)) if usage_tracker else None
+
+    def build_messages(indices):
+        if reference_lang:
+            return build_reference_messages([batch_data[i] for i in indices], target_lang, reference_lang)
+        return build_batch_messages([batch_data[i][0] for i in indices], source_lang, target_lang)
+
+    def attempt(indices):
+        translations = yield from request_items_steps(
+            lambda local: build_messages([indices[j] for j in local]), len(indices),
+            max_tokens, usage, is_cancelled
+        )
+        return {indices[j]: translation for j, translation in translations.items()}
+
+    translations = yield from retry_steps(len(batch_data), attempt, policy or RetryPolicy(), is_cancelled)
+    return [(text, translations.get(i, CANCELLED_MARKER)) for i, (text, _) in enumerate(batch_data)]
+
+
+def translate_multi_steps(batch_data, source_lang, item_langs, reference_lang=None, policy=None,
+                          is_cancelled=None, max_tokens=None, usage_tracker=None):
+    """一次请求同时翻译成多个目标语言，解析失败的条目回退为按语言单独请求
+
+    batch_data 为 [(原文, 参考文本), ...]，item_langs[i] 为第 i 条需要的目标语言列表。
+    返回 [{目标语言: 译文}, ...]。
+    """
+    results = [{} for _ in batch_data]
+    if is_cancelled and is_cancelled():
+        return results
+
+    target_langs = list(dict.fromkeys(lang for langs in item_langs for lang in langs))
+    # 多目标批次的用量按各语言的单元格数分摊
+    usage = usage_tracker.start_batch(
+        {lang: sum(lang in langs for langs in item_langs) for lang in target_langs}, len(batch_data)
+    ) if usage_tracker else None
+    try:
+        messages = build_multi_target_messages(batch_data, source_lang, target_langs, reference_lang)
+        result = yield Request(messages, max_tokens, json_mode=True, usage=usage)
+        results = parse_multi_target_response(result, len(batch_data), target_langs)
+    except Exception as e:
+        if is_auth_error(e):
+            raise
+        logger.error(f"多语言批量翻译出错，回退为按语言翻译: {e}")
+
+    # 缺失或格式错误的 (条目, 语言) 按语言分组单独请求
+    for lang in target_langs:
+        missing = [i for i, langs in enumerate(item_langs) if lang in langs and lang not in results[i]]
+        if not missing:
+            continue
+        logger.info(f"多语言结果缺少 {len(missing)} 条{lang}译文，回退为单独请求")
+        translations = yield from translate_items_steps(
+            [batch_data[i] for i in missing], source_lang, lang, reference_lang,
+            policy, is_cancelled, usage_tracker=usage_tracker
+        )
+        for i, (_, translation) in zip(missing, translations):
+            results[i][lang] = translation
+
+    return results
+
+
+def translate_task_steps(task, source_lang, reference_lang=None, policy=None, is_cancelled=None,
+                         max_tokens=None, usage_tracker=None):
+    """翻译调度器产生的一个批次任务 (列索引, 目标语言, [(行号列表, 原文, 参考文本), ...])
+
+    列索引为 None 的多目标语言批次（单元为 (目标列表, 原文, 参考文本)）返回 [{目标语言: 译文}, ...]，
+    其他批次返回 [(原文, 译文), ...]。
+    """
+    col_idx, lang, batch_items = task
+    batch_data = [(text, ref_text) for _, text, ref_text in batch_items]
+    if col_idx is None:
+        item_langs = [[target_lang for _, target_lang, _ in targets] for targets, _, _ in batch_items]
+        return (yield from translate_multi_steps(batch_data, source_lang, item_langs, reference_lang,
+                                                 policy, is_cancelled, max_tokens, usage_tracker))
+    return (yield from translate_items_steps(batch_data, source_lang, lang, reference_lang,
+                                             policy, is_cancelled, max_tokens, usage_tracker))
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from retry_policy import get_status_code
+
+logger = logging.getLogger(__name__)
+
+# 自适应并发默认配置
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 20
+DEFAULT_DECREASE_FACTOR = 0.5    # 出现限流/服务端错误时并发数乘以该系数
+DEFAULT_LATENCY_TOLERANCE = 2.0  # 平均延迟超过基线的倍数时视为不健康
+BASELINE_WINDOW = 200            # 计算延迟基线使用的最近成功请求数
+BASELINE_PERCENTILE = 0.1        # 延迟基线取最近成功请求的该分位数
+MAX_RECORDED_DECISIONS = 200
+
+
+def is_overload_error(error):
+    """判断错误是否表示服务端过载（429、5xx 或请求超时）"""
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return "timeout" in type(error).__name__.lower()
+
+
+class AdaptiveConcurrencyController:
+    """AIMD（加性增、乘性减）并发控制器
+
+    每完成一轮（约等于当前并发数个请求）评估一次：
+    - 本轮没有过载错误且平均延迟未明显超过基线时，并发数加1；
+    - 出现 429/5xx/超时时立即按比例降低并发数，同一轮内只降低一次。
+
+    批次大小不一，延迟按每个输出 token 折算后再比较；基线取最近成功请求的低分位数而不是历史最小值，
+    个别特别快的请求（尾批次、单条超长条目）不会永久压低基线。
+    """
+
+    def __init__(self, initial_limit, min_limit=DEFAULT_MIN_CONCURRENCY,
+                 max_limit=DEFAULT_MAX_CONCURRENCY, decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 latency_tolerance=DEFAULT_LATENCY_TOLERANCE):
+        self.min_limit = max(int(min_limit), 1)
+        self.max_limit = max(int(max_limit), self.min_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self._limit = min(max(int(initial_limit), self.min_limit), self.max_limit)
+        self._lock = threading.Lock()
+        self._recent_latencies = deque(maxlen=BASELINE_WINDOW)
+        self._round_latencies = []
+        self._round_errors = 0
+        self._decreased_this_round = False
+        self._last_decrease_at = float("-inf")
+        self.decisions = deque(maxlen=MAX_RECORDED_DECISIONS)
+
+    @property
+    def limit(self):
+        """当前允许的在途请求数"""
+        return self._limit
+
+    def record_success(self, latency, output_tokens=None):
+        """记录一次成功请求及其耗时（秒），output_tokens 为该请求的输出 token 数（为空时按 1 计）"""
+        if output_tokens:
+            latency /= output_tokens
+        with self._lock:
+            self._recent_latencies.append(latency)
+            self._round_latencies.append(latency)
+            self._maybe_finish_round()
+
+    def _baseline_latency(self):
+        """最近成功请求延迟的低分位数（调用方需持有锁）"""
+        latencies = sorted(self._recent_latencies)
+        return latencies[int((len(latencies) - 1) * BASELINE_PERCENTILE)]
+
+    def record_failure(self, error, started_at=None):
+        """记录一次失败请求，过载类错误会立即触发降并发
+
+        started_at 为请求开始时的 time.monotonic()；上次降并发之前发出的请求
+        反映的是旧并发数下的负载，不会再次触发降并发。
+        """
+        with self._lock:
+            if not is_overload_error(error):
+                return
+            stale = started_at is not None and started_at < self._last_decrease_at
+            if not self._decreased_this_round and not stale:
+                new_limit = max(self.min_limit, int(self._limit * self.decrease_factor))
+                self._decide("decrease", new_limit, f"服务端过载: {type(error).__name__}")
+                # 降并发后重新开始一轮评估
+                self._last_decrease_at = time.monotonic()
+                self._round_latencies = []
+                self._round_errors = 0
+                self._decreased_this_round = True
+            self._round_errors += 1
+            self._maybe_finish_round()
+
+    def _maybe_finish_round(self):
+        """一轮请求结束后评估是否加并发（调用方需持有锁）"""
+        samples = len(self._round_latencies) + self._round_errors
+        if samples < self._limit:
+            return
+
+        if not self._round_errors and self._round_latencies:
+            avg_latency = sum(self._round_latencies) / len(self._round_latencies)
+            threshold = self._baseline_latency() * self.latency_tolerance
+            if avg_latency <= threshold and self._limit < self.max_limit:
+                self._decide("increase", self._limit + 1,
+                             f"平均延迟 {avg_latency * 1000:.2f}ms/token 正常（阈值 {threshold * 1000:.2f}ms/token）")
+            elif avg_latency > threshold:
+                logger.debug(f"平均延迟 {avg_latency * 1000:.2f}ms/token 超过阈值 {threshold * 1000:.2f}ms/token，"
+                             f"保持并发数 {self._limit}")
+
+        self._round_latencies = []
+        self._round_errors = 0
+        self._decreased_this_round = False
+
+    def _decide(self, action, new_limit, reason):
+        """调整并发数并记录决策（调用方需持有锁）"""
+        if new_limit == self._limit:
+            return
+        decision = {
+            "time": time.time(),
+            "action": action,
+            "old_limit": self._limit,
+            "new_limit": new_limit,
+            "reason": reason,
+        }
+        self._limit = new_limit
+        self.decisions.append(decision)
+        logger.info(f"自适应并发调整: {decision['old_limit']} -> {new_limit}（{reason}）")
+
+    def get_decisions(self):
+        """返回已记录的调整决策列表"""
+        with self._lock:
+            return list(self.decisions)
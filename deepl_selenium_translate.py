@@ -1,13 +1,47 @@
 import os
+import sys
+import json
+import signal
+import argparse
 import time
 import pandas as pd
-from openpyxl import load_workbook
 import logging
 import concurrent.futures
-from tqdm import tqdm
-from openai import OpenAI
 import threading
 import shutil
+from functools import partial
+from pathlib import Path
+from api_client import (configure_pool, ensure_pool_size, use_client, make_timeout,
+                        abortable_requests, abort_requests, record_connections, ConnectionMetrics,
+                        DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+from rate_limiter import (configure_rate_limit, get_rate_limiter, estimate_request_tokens, RateLimitStats,
+                          DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE)
+from usage_tracker import UsageTracker, format_usage
+from hedging import HedgePolicy, run_hedged, DEFAULT_HEDGE_PERCENTILE, DEFAULT_HEDGE_BUDGET
+from concurrency_control import (AdaptiveConcurrencyController, DEFAULT_MIN_CONCURRENCY,
+                                 DEFAULT_MAX_CONCURRENCY)
+from translation_prompts import (check_auth_error, format_fuzzy_reference, FUZZY_REFERENCE,
+                                 TRANSLATION_MODEL, TRANSLATION_TEMPERATURE, TRANSLATION_MAX_TOKENS)
+from batch_pipeline import translate_task_steps, CANCELLED_MARKER
+from async_translate import run_translation_async, DEFAULT_ASYNC_CONCURRENCY
+from token_batching import (estimate_unit_tokens, pack_batches, max_tokens_for_batch,
+                            DEFAULT_OUTPUT_TOKEN_BUDGET, DEFAULT_INPUT_TOKEN_BUDGET,
+                            DEFAULT_MAX_BATCH_ITEMS)
+from retry_policy import (RetryPolicy, run_steps, is_auth_error, TranslationCancelled,
+                          CANCEL_CHECK_INTERVAL,
+                          DEFAULT_BASE_DELAY as DEFAULT_RETRY_BASE_DELAY,
+                          DEFAULT_MAX_DELAY as DEFAULT_RETRY_MAX_DELAY)
+from fuzzy_match import (get_fuzzy_index, same_invariants, DEFAULT_FUZZY_THRESHOLD, DEFAULT_FUZZY_REUSE_THRESHOLD,
+                         DEFAULT_FUZZY_MAX_ENTRIES)
+from skip_filter import SkipFilter, format_skip_counts
+from source_prep import build_work_plan
+from reference_index import get_reference_index, DEFAULT_REFERENCE_INDEX_PATH
+from translation_memory import (get_translation_memory, cache_key_for,
+                                DEFAULT_CACHE_PATH, DEFAULT_CACHE_MAX_ENTRIES)
+from excel_input import load_sheets, row_key, inspect_workbook, list_sheet_names, SHEET_ROW_STRIDE
+from excel_output import WorkbookOutput, StreamingWorkbookOutput
+from job_journal import (JobJournal, default_journal_path, file_fingerprint, read_journal,
+                         matches_job, find_resumable_journal)
 
 # 在文件开头添加 SUPPORTED_LANGUAGES 定义
 SUPPORTED_LANGUAGES = {
@@ -52,425 +86,1123 @@ DEEPSEEK_BASE_URL = "https://api.deepseek.com"
 DEFAULT_MAX_WORKERS = 5      # 默认并发线程数
 DEFAULT_BATCH_SIZE = 10      # 默认每批处理的条目数
 DEFAULT_MAX_RETRIES = 3      # 默认最大重试次数
-DEFAULT_SAVE_INTERVAL = 100  # 默认每处理100个单元格保存一次
+DEFAULT_SAVE_INTERVAL = 100  # 默认每处理100个单元格将任务日志落盘一次
 DEFAULT_PROGRESS_INTERVAL = 10  # 默认每翻译10个单元格显示一次进度
+DEFAULT_CACHE_ENABLED = True     # 默认启用翻译记忆库缓存
+IN_FLIGHT_PER_WORKER = 2         # 每个线程允许的在途批次数，保证线程池始终有任务可取
 
-# 全局配置变量
-max_workers = DEFAULT_MAX_WORKERS
-batch_size = DEFAULT_BATCH_SIZE
-max_retries = DEFAULT_MAX_RETRIES
-save_interval = DEFAULT_SAVE_INTERVAL
-progress_interval = DEFAULT_PROGRESS_INTERVAL
+# 翻译引擎：thread 为线程池引擎，asyncio 为基于事件循环的异步引擎
+ENGINE_THREAD = "thread"
+ENGINE_ASYNCIO = "asyncio"
+DEFAULT_ENGINE = ENGINE_THREAD
+DEFAULT_ADAPTIVE_CONCURRENCY = False  # 默认关闭自适应并发
+DEFAULT_TOKEN_BATCHING = True         # 默认按预计 token 打包批次，而非固定条数
+DEFAULT_MULTI_TARGET_REQUESTS = False # 默认每个目标语言单独请求
+DEFAULT_STREAMING_OUTPUT = False      # 默认在完整工作簿上写入以保留格式
+DEFAULT_FUZZY_MATCHING = False        # 默认不使用模糊匹配参考
+DEFAULT_FUZZY_AUTO_REUSE = False      # 默认不直接复用模糊匹配到的译文
+DEFAULT_SKIP_UNTRANSLATABLE = True    # 默认跳过数字、链接、编码等无需翻译的单元格
+DEFAULT_STREAM_RESPONSES = True       # 默认流式接收响应，取消任务时可立即中断在途请求
+DEFAULT_HEDGE_REQUESTS = False        # 默认不对慢请求补发对冲请求
+DEFAULT_USAGE_REPORT = False          # 默认不导出 token 用量明细
 
-# 创建锁对象用于线程安全操作
-excel_lock = threading.Lock()
-progress_lock = threading.Lock()
-translated_count = 0  # 全局计数器，记录已翻译的单元格数
-last_progress_report = 0  # 上次显示进度的计数
+# 翻译失败时写入单元格的标记，这些结果不会写入翻译记忆库
+ERROR_MARKERS = {"[格式错误]", "[翻译错误]", CANCELLED_MARKER, "[翻译缺失]"}
 
-# 添加进度回调函数
+# 兼容旧接口的模块级状态：process_excel_with_threading 用这些值创建 TranslationJob，
+# 新代码应直接创建 TranslationJob，每个任务拥有独立的配置、计数、取消标志和回调
+current_config = {}  # set_config 设置的配置
+api_key = None  # 存储API Key的全局变量
 progress_callback = None
-
-# 全局变量
+sheet_progress_callback = None  # 多工作表任务的分表进度回调，参数为 [(工作表名, 已完成, 总数), ...]
 translation_cancelled = False
-api_key = None  # 存储API Key的全局变量
-total_tasks = 0  # 添加全局变量
+current_job = None  # 通过旧接口启动的当前任务，set_translation_cancelled 会取消它
+last_job_summary = {}  # 最近一次任务的统计摘要（跳过原因、缓存命中等），供界面写入历史记录
 
-def set_translation_cancelled(value):
-    """设置翻译取消状态"""
-    global translation_cancelled
-    translation_cancelled = value
+def resolve_config(config=None):
+    """补全配置中未设置的参数，返回任务使用的完整配置"""
+    config = config or {}
+    return {
+        'max_workers': config.get('max_workers', DEFAULT_MAX_WORKERS),
+        'batch_size': config.get('batch_size', DEFAULT_BATCH_SIZE),
+        'max_retries': config.get('max_retries', DEFAULT_MAX_RETRIES),
+        'save_interval': config.get('save_interval', DEFAULT_SAVE_INTERVAL),
+        'progress_interval': config.get('progress_interval', DEFAULT_PROGRESS_INTERVAL),
+        'cache_enabled': config.get('cache_enabled', DEFAULT_CACHE_ENABLED),
+        'cache_path': config.get('cache_path') or DEFAULT_CACHE_PATH,
+        'cache_max_entries': config.get('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES),
+        'engine': config.get('engine', DEFAULT_ENGINE),
+        'async_concurrency': config.get('async_concurrency', DEFAULT_ASYNC_CONCURRENCY),
+        'adaptive_concurrency': config.get('adaptive_concurrency', DEFAULT_ADAPTIVE_CONCURRENCY),
+        'min_concurrency': config.get('min_concurrency', DEFAULT_MIN_CONCURRENCY),
+        'max_concurrency': config.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+        'token_batching': config.get('token_batching', DEFAULT_TOKEN_BATCHING),
+        'batch_token_budget': config.get('batch_token_budget', DEFAULT_OUTPUT_TOKEN_BUDGET),
+        'batch_input_token_budget': config.get('batch_input_token_budget', DEFAULT_INPUT_TOKEN_BUDGET),
+        'max_batch_items': config.get('max_batch_items', DEFAULT_MAX_BATCH_ITEMS),
+        'multi_target_requests': config.get('multi_target_requests', DEFAULT_MULTI_TARGET_REQUESTS),
+        'retry_base_delay': config.get('retry_base_delay', DEFAULT_RETRY_BASE_DELAY),
+        'retry_max_delay': config.get('retry_max_delay', DEFAULT_RETRY_MAX_DELAY),
+        'streaming_output': config.get('streaming_output', DEFAULT_STREAMING_OUTPUT),
+        'reference_index_path': config.get('reference_index_path') or DEFAULT_REFERENCE_INDEX_PATH,
+        'fuzzy_matching': config.get('fuzzy_matching', DEFAULT_FUZZY_MATCHING),
+        'fuzzy_threshold': config.get('fuzzy_threshold', DEFAULT_FUZZY_THRESHOLD),
+        'fuzzy_auto_reuse': config.get('fuzzy_auto_reuse', DEFAULT_FUZZY_AUTO_REUSE),
+        'fuzzy_reuse_threshold': config.get('fuzzy_reuse_threshold', DEFAULT_FUZZY_REUSE_THRESHOLD),
+        'fuzzy_max_entries': config.get('fuzzy_max_entries', DEFAULT_FUZZY_MAX_ENTRIES),
+        'skip_untranslatable': config.get('skip_untranslatable', DEFAULT_SKIP_UNTRANSLATABLE),
+        'stream_responses': config.get('stream_responses', DEFAULT_STREAM_RESPONSES),
+        'connect_timeout': config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+        'read_timeout': config.get('read_timeout', DEFAULT_READ_TIMEOUT),
+        'hedge_requests': config.get('hedge_requests', DEFAULT_HEDGE_REQUESTS),
+        'hedge_percentile': config.get('hedge_percentile', DEFAULT_HEDGE_PERCENTILE),
+        'hedge_budget': config.get('hedge_budget', DEFAULT_HEDGE_BUDGET),
+        'requests_per_minute': config.get('requests_per_minute', DEFAULT_REQUESTS_PER_MINUTE),
+        'tokens_per_minute': config.get('tokens_per_minute', DEFAULT_TOKENS_PER_MINUTE),
+        'usage_report': config.get('usage_report', DEFAULT_USAGE_REPORT),
+        'token_prices': config.get('token_prices'),
+        'keepalive_expiry': config.get('keepalive_expiry'),
+    }
+
+def estimate_unit(unit, estimates=None):
+    """估算翻译单元 (行号列表, 原文, 参考文本) 的输入/输出 token，优先使用预处理阶段的估算结果"""
+    _, text, ref_text = unit
+    if estimates:
+        estimate = estimates.get((text, ref_text))
+        if estimate is not None:
+            return estimate
+    return estimate_unit_tokens(text, ref_text)
+
+def estimate_multi_unit(unit, estimates=None):
+    """估算多目标语言翻译单元 (目标列表, 原文, 参考文本) 的输入/输出 token"""
+    targets, text, ref_text = unit
+    input_tokens, output_tokens = estimate_unit((None, text, ref_text), estimates)
+    return input_tokens, output_tokens * len(targets)
+
+def task_max_tokens(task):
+    """根据批次预计输出 token 计算请求的 max_tokens"""
+    col_idx, _, batch_items = task
+    estimate = estimate_multi_unit if col_idx is None else estimate_unit
+    output_tokens = sum(estimate(unit)[1] for unit in batch_items)
+    return max_tokens_for_batch(output_tokens, TRANSLATION_MAX_TOKENS)
+
+def split_batches(units, size, token_budget, estimate=estimate_unit,
+                  input_budget=DEFAULT_INPUT_TOKEN_BUDGET, max_items=DEFAULT_MAX_BATCH_ITEMS):
+    """把翻译单元切分为批次：token_budget 大于0时按预计 token 打包，否则按固定条数"""
+    if token_budget:
+        return pack_batches(units, estimate, token_budget, input_budget, max_items)
+    return [units[i:i + size] for i in range(0, len(units), size)]
+
+def iter_batches(pending, size, token_budget=0, estimates=None, **budgets):
+    """按批次顺序生成翻译任务 (列索引, 目标语言, 翻译单元列表)，各目标语言交替产出
 
-def translate_batch_with_reference(batch_data, target_lang, reference_lang, retry_count=0):
-    """带参考翻译的批量翻译"""
-    if not batch_data:
+    budgets: 传给 split_batches 的 input_budget / max_items
+    """
+    estimate = partial(estimate_unit, estimates=estimates)
+    packed = {}
+    for col_idx, (lang, units) in pending.items():
+        packed[col_idx] = (lang, split_batches(units, size, token_budget, estimate, **budgets))
+
+    max_batches = max((len(batches) for _, batches in packed.values()), default=0)
+    for index in range(max_batches):
+        for col_idx, (lang, batches) in packed.items():
+            if index < len(batches):
+                yield col_idx, lang, batches[index]
+
+def iter_multi_target_batches(pending, size, token_budget=0, estimates=None, **budgets):
+    """合并各目标语言的相同翻译单元，生成多目标语言翻译任务 (None, None, 翻译单元列表)
+
+    每个单元为 (目标列表, 原文, 参考文本)，目标列表元素为 (列索引, 目标语言, 行号列表)。
+    """
+    merged = {}
+    for col_idx, (lang, units) in pending.items():
+        # 各语言的单元来自同一份去重结果，相同单元的原文和参考文本完全一致
+        for rows, text, ref_text in units:
+            key = (text, ref_text)
+            unit = merged.get(key)
+            if unit is None:
+                unit = merged[key] = ([], text, ref_text)
+            unit[0].append((col_idx, lang, rows))
+
+    estimate = partial(estimate_multi_unit, estimates=estimates)
+    for batch_items in split_batches(list(merged.values()), size, token_budget, estimate, **budgets):
+        yield None, None, batch_items
+
+def language_header_names(lang):
+    """语言可能使用的列标题：中文名或英文代码均可"""
+    names = {lang}
+    if lang in SUPPORTED_LANGUAGES:
+        names.add(SUPPORTED_LANGUAGES[lang])
+    names.update(zh_name for zh_name, en_code in SUPPORTED_LANGUAGES.items() if en_code == lang)
+    return names
+
+def get_job_params(source_lang, target_languages, reference_file=None, reference_lang=None,
+                   reference_column=None, sheet_names=None):
+    """任务日志中记录的任务参数，续传时必须与当前任务一致"""
+    return {
+        "source_lang": source_lang,
+        # 目标语言列按当前顺序重建，回放按语言名匹配，因此顺序不影响续传
+        "target_languages": sorted(target_languages or []),
+        "reference_file": str(Path(reference_file).resolve()) if reference_file else None,
+        "reference_lang": reference_lang,
+        "reference_column": reference_column,
+        # 行键中的工作表序号是 load_sheets 实际读取的工作表中的序号（缺少源语言列的工作表被跳过，不占序号），
+        # 由所选工作表和输入文件内容共同决定：工作表选择不同时日志中的行号不可复用，
+        # 输入文件变化时由 input_fingerprint 检查拒绝续传
+        "sheet_names": list(sheet_names) if sheet_names else None,
+    }
+
+def load_resume_records(journal_path, excel_file, job_params):
+    """读取可续传的任务日志记录，日志与当前任务或输入文件不一致时返回空列表"""
+    header, records = read_journal(journal_path)
+    if header is None:
         return []
-    
-    try:
-        if not api_key:
-            raise ValueError("API Key未设置")
-            
-        client = OpenAI(api_key=api_key, base_url=DEEPSEEK_BASE_URL)
-        
-        # 构建批量翻译请求
-        batch_prompts = []
-        for i, (source_text, ref_text) in enumerate(batch_data):
-            if ref_text:  # 如果有参考文本
-                batch_prompts.append(f"{i+1}. 原文: {source_text}\n   {reference_lang}参考翻译: {ref_text}")
-            else:  # 如果没有参考文本
-                batch_prompts.append(f"{i+1}. 原文: {source_text}")
-        
-        batch_text = "\n\n".join(batch_prompts)
-        
-        prompt = f"""请将以下{len(batch_data)}条文本翻译成{target_lang}。
-如果提供了参考翻译，请确保翻译的内容与参考翻译在语义上保持一致。
-仅返回翻译结果，格式为"1. [翻译结果1]"，"2. [翻译结果2]"等，不要有额外解释。
-
-{batch_text}"""
-
-        if translation_cancelled:
-            return [("[已取消]", "[已取消]") for _ in batch_data]
-
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一个精通多领域的翻译专家。只翻译文本，不添加任何解释或附加文本。返回结果保持简洁。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=2000,
+    if not matches_job(header, job_params):
+        logger.warning("任务日志的翻译参数与当前任务不一致，将重新翻译")
+        return []
+    if header.get("input_fingerprint") != file_fingerprint(excel_file):
+        logger.warning("输入文件在上次任务后已被修改，将重新翻译")
+        return []
+    return records
+
+class TranslationJob:
+    """一次Excel翻译任务：持有自己的配置、计数器、取消标志和回调
+
+    同一进程中可以同时运行多个任务，它们共享连接池（api_client）和翻译记忆库，
+    但互不影响各自的进度和取消状态。线程引擎运行时连接池不足本任务的并发数会自动扩大；
+    超时、空闲连接保持时间和限流由 configure_shared_pool 设置。
+
+    config: 与 set_config 相同格式的配置字典，未设置的参数使用默认值
+    progress_callback(已完成, 总数, 是否结束) / sheet_progress_callback([(工作表名, 已完成, 总数), ...])
+    """
+
+    def __init__(self, config=None, api_key=None, base_url=DEEPSEEK_BASE_URL,
+                 progress_callback=None, sheet_progress_callback=None):
+        self.config = resolve_config(config)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.progress_callback = progress_callback
+        self.sheet_progress_callback = sheet_progress_callback
+
+        self.translated_count = 0  # 已翻译的单元格数
+        self.failed_count = 0  # 重试耗尽后写入失败标记的单元格数，续传时重新翻译
+        self.cache_evictions = 0  # 本任务写入翻译记忆库时触发淘汰的条目数
+        self.total_tasks = 0
+        self.sheet_progress = []  # 多工作表任务中各工作表的 [工作表名, 已完成, 总数]
+        self.summary = {}  # 任务统计摘要（跳过原因、缓存命中等）
+        self.controller = None  # 自适应并发控制器
+        self.usage = UsageTracker()  # token 用量统计，每次 run_excel 重新开始
+        self.connection_metrics = ConnectionMetrics()  # 请求数和新建连接数，每次 run_excel 重新开始
+        self.rate_limit_stats = RateLimitStats()  # 本任务的限流等待，每次 run_excel 重新开始
+        self.hedger = None  # 对冲请求策略，仅线程引擎使用
+        self._hedge_executor = None
+        self._timeout = make_timeout(self.config["connect_timeout"], self.config["read_timeout"])
+        self._last_progress_report = 0
+        self._cancel_event = threading.Event()
+        self.abort_error = None  # 导致任务中止的错误（如 API Key 无效）
+        self._progress_lock = threading.Lock()
+        self._result_lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """请求取消任务，已完成的部分会被保存并保留任务日志；正在等待响应的请求立即断开"""
+        self._cancel_event.set()
+        abort_requests(self._cancel_event)
+
+    def abort(self, error):
+        """因无法继续的错误（如 API Key 无效）中止任务：像取消一样停止所有批次，run_excel 随后报告该错误"""
+        if self.abort_error is None:
+            self.abort_error = error
+        self.cancel()
+
+    def get_retry_policy(self):
+        """根据任务配置创建重试策略（SDK 内置重试已关闭，重试统一由该策略负责）"""
+        config = self.config
+        return RetryPolicy(config["max_retries"], config["retry_base_delay"], config["retry_max_delay"])
+
+    def update_progress_status(self, current, total, finished=False):
+        """更新进度状态"""
+        with self._progress_lock:
+            if current - self._last_progress_report >= self.config["progress_interval"] or finished:
+                self._last_progress_report = current
+                # 使用回调更新进度
+                if self.progress_callback:
+                    try:
+                        self.progress_callback(current, total, finished)
+                    except Exception as e:
+                        logger.error(f"更新进度时出错: {e}")
+                if self.sheet_progress_callback and len(self.sheet_progress) > 1:
+                    try:
+                        self.sheet_progress_callback([tuple(entry) for entry in self.sheet_progress])
+                    except Exception as e:
+                        logger.error(f"更新工作表进度时出错: {e}")
+
+    def add_translated(self, rows):
+        """累计已完成的单元格；多工作表任务同时按行键累计各工作表的进度"""
+        with self._progress_lock:
+            self.translated_count += len(rows)
+            if len(self.sheet_progress) < 2:
+                return
+            finished = []
+            for key in rows:
+                entry = self.sheet_progress[key // SHEET_ROW_STRIDE]
+                entry[1] += 1
+                if entry[1] == entry[2]:
+                    finished.append(entry[0])
+        for title in finished:
+            logger.info(f"工作表「{title}」翻译完成")
+
+    def add_failed(self, rows):
+        """累计写入失败标记的单元格，它们不计入已完成数"""
+        with self._progress_lock:
+            self.failed_count += len(rows)
+
+    def request_translation(self, client, messages, max_tokens=None, json_mode=False, usage=None):
+        """发送翻译请求，启用对冲请求时慢请求会补发一次，先完成者生效
+
+        usage 为该批次的 BatchUsage，每次请求返回的 token 用量都记录到其中。
+        """
+        if self.hedger is None:
+            return self._send_request(client, messages, max_tokens, json_mode, usage=usage)
+        return run_hedged(
+            lambda abort: self._send_request(client, messages, max_tokens, json_mode, abort, usage),
+            self.hedger, self._hedge_executor
         )
+
+    def _send_request(self, client, messages, max_tokens=None, json_mode=False, abort=None, usage=None):
+        """发送一次翻译请求，记录 token 用量，并向自适应并发控制器反馈延迟和过载错误
+
+        stream_responses 开启时流式接收响应，每收到一段内容检查一次取消标志，
+        任务取消（或对冲请求的另一方已完成）后立即关闭连接，不再等待剩余的输出；
+        还没有收到数据的请求由 cancel 直接断开连接。
+        """
+        controller = self.controller
+        stream = self.config["stream_responses"]
+        extra_params = {"response_format": {"type": "json_object"}} if json_mode else {}
+        if stream:
+            # 流式响应只在最后一段附带用量
+            extra_params["stream_options"] = {"include_usage": True}
+        max_tokens = max_tokens or TRANSLATION_MAX_TOKENS
+        # 先在共享限流器中排队，等待时间不计入请求延迟
+        get_rate_limiter().acquire(estimate_request_tokens(messages, max_tokens), lambda: self.cancelled,
+                                   self.rate_limit_stats)
+        start_time = time.monotonic()
+        try:
+            with abortable_requests(self._cancel_event), record_connections(self.connection_metrics):
+                response = client.chat.completions.create(
+                    model=TRANSLATION_MODEL,
+                    messages=messages,
+                    temperature=TRANSLATION_TEMPERATURE,
+                    max_tokens=max_tokens,
+                    stream=stream,
+                    timeout=self._timeout,
+                    **extra_params
+                )
+                if stream:
+                    content, response_usage = self._read_stream(response, abort)
+                else:
+                    content, response_usage = response.choices[0].message.content, response.usage
+        except TranslationCancelled:
+            raise
+        except Exception as e:
+            # 取消时被断开的连接不算请求失败
+            if self.cancelled:
+                raise TranslationCancelled("任务已取消，已中断在途请求") from e
+            if controller:
+                controller.record_failure(e, start_time)
+            check_auth_error(e)
+            raise
+        if controller:
+            controller.record_success(time.monotonic() - start_time,
+                                      getattr(response_usage, "completion_tokens", None) or max_tokens)
+        if usage:
+            usage.record(response_usage)
+        return content
+
+    def _read_stream(self, stream, abort=None):
+        """拼接流式响应的内容，返回 (内容, 用量)
+
+        任务取消或 abort 被设置时关闭连接并抛出 TranslationCancelled。
+        """
+        parts = []
+        response_usage = None
+        with stream:
+            for chunk in stream:
+                if self.cancelled:
+                    raise TranslationCancelled("任务已取消，已中断在途请求")
+                if abort is not None and abort.is_set():
+                    raise TranslationCancelled("对冲请求已先完成，放弃本次请求")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                if getattr(chunk, "usage", None):
+                    response_usage = chunk.usage
+        return "".join(parts), response_usage
+
+    def translate_task(self, task, source_lang, reference_lang=None, max_tokens=None):
+        """翻译一个批次任务，流程见 batch_pipeline.translate_task_steps
+
+        请求、修复、部分重试和多目标回退与 asyncio 引擎共用同一份流程，这里只负责发送请求。
+        """
+        if not self.api_key:
+            raise ValueError("API Key未设置")
+
+        steps = translate_task_steps(task, source_lang, reference_lang, self.get_retry_policy(),
+                                     lambda: self.cancelled, max_tokens, self.usage)
+        return run_steps(steps, self._request_step, lambda: self.cancelled)
+
+    def _request_step(self, request):
+        """发送流程中的一次请求
+
+        每次请求重新获取共享客户端：连接池重新配置后之后的请求使用新的客户端，
+        正在使用的旧客户端等本次请求结束后才关闭。
+        """
+        with use_client(self.api_key, self.base_url, max_retries=0) as client:
+            return self.request_translation(client, request.messages, request.max_tokens,
+                                            request.json_mode, request.usage)
+
+    def run_excel(self, excel_file, output_file, source_lang="English", target_languages=None,
+                  reference_file=None, reference_lang=None, reference_column=None, resume=False,
+                  sheet_names=None):
+        """翻译Excel文件，成功返回 True，取消或出错返回 False（错误信息见 summary["error"]）
+
+        sheet_names 为空时只翻译活动工作表；否则所选工作表在同一任务中一起去重、调度和查询缓存，
+        译文写回各自的工作表。
+        每批结果都会追加到输出文件旁的任务日志（output_file + ".journal"）。
+        resume 为 True 时先回放日志中已完成的单元格，只翻译剩余部分；任务成功后删除日志。
+        """
+        config = self.config
+        # 重置计数器和状态，同一个任务对象可以依次运行多个文件
+        self.summary = {}
+        self.sheet_progress = []
+        self.translated_count = 0
+        self.failed_count = 0
+        self.cache_evictions = 0
+        self.total_tasks = 0
+        self._last_progress_report = 0
+        self.usage = UsageTracker(config["token_prices"])
+        self.connection_metrics = ConnectionMetrics()
+        self.rate_limit_stats = RateLimitStats()
+
+        # 自适应并发：线程引擎在 [min, max_concurrency] 内调整，asyncio 引擎上限为 async_concurrency
+        self.controller = None
+        self.hedger = None
+        if config["adaptive_concurrency"]:
+            self.controller = AdaptiveConcurrencyController(
+                config["max_workers"],
+                min_limit=config["min_concurrency"],
+                max_limit=config["async_concurrency"] if config["engine"] == ENGINE_ASYNCIO
+                else config["max_concurrency"]
+            )
+
+        journal = None
+        output = None
+        saved = False
+        try:
+            # 流式读取一次各输入表，得到标题、源语言列和有效行（源语言列有值的行）
+            source_names = language_header_names(source_lang)
+            sheets = load_sheets(excel_file, source_names,
+                                 reference_column if not reference_file else None, sheet_names)
+            # 各工作表的行合并到同一行键空间，之后的去重、缓存和批次调度不区分工作表
+            valid_rows = [(row_key(sheet_index, row_idx), text, ref_text)
+                          for sheet_index, sheet in enumerate(sheets)
+                          for row_idx, text, ref_text in sheet.rows]
         
-        # 解析返回结果
-        result = response.choices[0].message.content.strip()
-        translated_texts = []
-        
-        # 处理返回的格式，试图匹配"数字. 翻译内容"格式
-        lines = result.split("\n")
-        for i, (source_text, _) in enumerate(batch_data):
-            found = False
-            for line in lines:
-                line = line.strip()
-                if line.startswith(f"{i+1}. ") or line.startswith(f"{i+1}."):
-                    translated = line[line.find(".")+1:].strip()
-                    translated_texts.append((source_text, translated))
-                    found = True
-                    break
+            # 创建输出：默认在完整加载的工作簿上修改以保留格式，streaming_output 时按行流式写出
+            # 原有的目标语言列会被删除，目标语言列重新追加到最后；此后输出只由后台写入线程修改
+            if config["streaming_output"]:
+                output = StreamingWorkbookOutput(excel_file, output_file, sheets, target_languages)
+            else:
+                output = WorkbookOutput(excel_file, output_file, sheets, target_languages)
+            target_langs = output.target_cols
             
-            if not found:
-                translated_texts.append((source_text, "[格式错误]"))
-        
-        return translated_texts
+            # 计算总任务数
+            self.total_tasks = len(valid_rows) * len(target_langs)
+            if len(sheets) > 1:
+                self.sheet_progress.extend([sheet.title, 0, len(sheet.rows) * len(target_langs)] for sheet in sheets)
+                logger.info(f"共 {len(sheets)} 个工作表: {', '.join(sheet.title for sheet in sheets)}")
         
-    except Exception as e:
-        logger.error(f"批量翻译出错: {e}")
-        if retry_count < max_retries:
-            logger.info(f"第{retry_count+1}次重试批量翻译...")
-            time.sleep(1)
-            return translate_batch_with_reference(batch_data, target_lang, reference_lang, retry_count + 1)
-        # 失败时返回错误信息
-        return [(text[0] if isinstance(text, tuple) else text, "[翻译错误]") for text, _ in batch_data]
-
-def update_progress_status(current, total, finished=False):
-    """更新进度状态"""
-    global last_progress_report
-    
-    with progress_lock:
-        if current - last_progress_report >= progress_interval or finished:
-            last_progress_report = current
-            # 使用回调更新进度
-            if progress_callback:
+            # 准备参考源数据：外部参考文件只在首次使用或文件变化时建立持久化索引，之后按原文直接查询
+            reference_data = {}
+            if reference_file and reference_lang:
+                index = get_reference_index(config["reference_index_path"])
+                file_id = index.load(reference_file, source_names, language_header_names(reference_lang),
+                                     fallback_source_col=sheets[0].source_col)
+                reference_data = index.lookup_many(file_id, (text for _, text, _ in valid_rows))
+                logger.info(f"参考源匹配 {len(reference_data)} 条原文")
+
+            # 续传：回放任务日志中已完成的单元格，这些单元格在下面构建待翻译任务时会被跳过
+            job_params = get_job_params(source_lang, target_languages, reference_file,
+                                        reference_lang, reference_column, sheet_names)
+            journal_path = default_journal_path(output_file)
+            resume_records = load_resume_records(journal_path, excel_file, job_params) if resume else []
+            restored = {}  # {列索引: 已恢复的行号集合}
+            if resume_records:
+                lang_cols = {lang: col_idx for col_idx, lang in target_langs}
+                restored_count = 0
+                for lang, rows, translation in resume_records:
+                    col_idx = lang_cols.get(lang)
+                    if col_idx is None:
+                        continue
+                    output.write(col_idx, rows, translation)
+                    restored.setdefault(col_idx, set()).update(rows)
+                    self.add_translated(rows)
+                    restored_count += len(rows)
+                self.update_progress_status(self.translated_count, self.total_tasks)
+                logger.info(f"从任务日志恢复 {restored_count} 个已翻译单元格")
+            journal = JobJournal(
+                journal_path,
+                dict(job_params, input_file=str(Path(excel_file).resolve()),
+                     input_fingerprint=file_fingerprint(excel_file), output_file=str(output_file)),
+                resume=bool(resume_records),
+                sync_every=config["save_interval"]
+            )
+
+            # 相同（规范化后）原文合并为一个翻译单元，结果再分发到所有对应行；
+            # 随后查询翻译记忆库，命中的单元直接写入，只有未命中的才发送到API
+            memory = get_translation_memory(config["cache_path"], config["cache_max_entries"]) if config["cache_enabled"] else None
+            # 外部参考文件按原文查找参考译文；内置参考源直接使用同一行参考列的内容
+            use_reference = bool(reference_lang and (reference_file or reference_column))
+            # 没有显式参考源时，可用模糊匹配到的相似原文译文作为参考提示；
+            # 多目标语言合并请求时各语言的提示不同，只做直接复用
+            use_fuzzy = bool(config["fuzzy_matching"] and memory and not use_reference)
+            fuzzy_hints = not (config["multi_target_requests"] and len(target_langs) > 1)
+            pending = {}  # {列索引: (目标语言, [(行号列表, 原文, 参考文本), ...])}
+            cache_hits = 0
+            cache_misses = 0
+            fuzzy_reused = 0
+            fuzzy_hinted = 0
+            pending_cells = 0
+            # 去重、token 估算和缓存键中与语言无关的部分在列数组上一次完成；各语言只在此基础上追加目标语言
+            if use_reference:
+                plan = build_work_plan(valid_rows, reference_data if reference_file else None, source_lang)
+            else:
+                plan = build_work_plan([(row_idx, text, None) for row_idx, text, _ in valid_rows],
+                                       source_lang=source_lang)
+            # 数字、链接、编码等不需要翻译的单元格在本地识别后原样输出，并按原因计数
+            skip_filter = SkipFilter([text for _, text, _ in plan.units], source_lang) if config["skip_untranslatable"] else None
+            skipped = {}
+            for col_idx, lang in target_langs:
+                units = {}
+                restored_rows = restored.get(col_idx)
+                skip_reasons = skip_filter.reasons(lang) if skip_filter else None
+                for unit_index, (rows, text, ref_text) in enumerate(plan.units):
+                    if restored_rows:
+                        rows = [row_idx for row_idx in rows if row_idx not in restored_rows]
+                        if not rows:
+                            continue
+                    reason = skip_reasons[unit_index] if skip_reasons else None
+                    if reason:
+                        output.write(col_idx, rows, text)
+                        self.add_translated(rows)
+                        skipped[reason] = skipped.get(reason, 0) + len(rows)
+                        continue
+                    key = cache_key_for(plan.key_bases[unit_index], lang)
+                    unit = units.get(key)
+                    if unit is None:
+                        units[key] = (list(rows), text, ref_text)
+                    else:
+                        unit[0].extend(rows)
+
+                if memory and units:
+                    cached = memory.get_many(units.keys())
+                    for key in cached:
+                        rows, _, _ = units.pop(key)
+                        output.write(col_idx, rows, cached[key])
+                        self.add_translated(rows)
+                        cache_hits += len(rows)
+                    cache_misses += sum(len(rows) for rows, _, _ in units.values())
+                    self.update_progress_status(self.translated_count, self.total_tasks)
+
+                # 模糊匹配历史译文：相似度很高时可直接复用，其余匹配作为参考提示随请求发送
+                if use_fuzzy and units:
+                    index = get_fuzzy_index(memory, source_lang, lang, config["fuzzy_max_entries"])
+                    for key, (rows, text, ref_text) in list(units.items()):
+                        match = index.query(text, config["fuzzy_threshold"])
+                        if match is None:
+                            continue
+                        score, match_source, match_translation = match
+                        # 数字或占位符不同的文本即使相似度很高也不能直接复用，只作为参考提示
+                        if (config["fuzzy_auto_reuse"] and score >= config["fuzzy_reuse_threshold"]
+                                and same_invariants(text, match_source)):
+                            del units[key]
+                            output.write(col_idx, rows, match_translation)
+                            self.add_translated(rows)
+                            fuzzy_reused += len(rows)
+                        elif fuzzy_hints:
+                            units[key] = (rows, text, format_fuzzy_reference(match_source, match_translation))
+                            fuzzy_hinted += 1
+                    self.update_progress_status(self.translated_count, self.total_tasks)
+
+                pending[col_idx] = (lang, list(units.values()))
+                pending_cells += sum(len(rows) for rows, _, _ in units.values())
+
+            pending_units = sum(len(units) for _, units in pending.values())
+            logger.info(f"待翻译 {pending_cells} 个单元格，去重后 {pending_units} 个翻译单元")
+            if skipped:
+                logger.info(f"无需翻译直接输出 {sum(skipped.values())} 个单元格（{format_skip_counts(skipped)}）")
+            if memory:
+                lookups = cache_hits + cache_misses
+                hit_rate = cache_hits / lookups if lookups else 0.0
+                logger.info(f"翻译缓存命中 {cache_hits} 个单元格，未命中 {cache_misses} 个，命中率 {hit_rate:.1%}")
+            if use_fuzzy:
+                logger.info(f"模糊匹配直接复用 {fuzzy_reused} 个单元格，{fuzzy_hinted} 个翻译单元附带相似译文参考")
+            # 请求使用的参考源：显式参考源优先，否则在有模糊匹配提示时使用相似条目参考
+            prompt_reference_lang = reference_lang if use_reference else (
+                FUZZY_REFERENCE if fuzzy_hinted else None)
+
+            def write_results(col_idx, lang, batch_items, translations):
+                """将一批翻译结果交给后台写入线程，并写入任务日志和翻译记忆库
+
+                持久化由任务日志负责，这里不再定期保存整个工作簿。
+                """
+                new_entries = []
+                journal_records = []
+                with self._result_lock:
+                    for i, (rows, text, ref_text) in enumerate(batch_items):
+                        if i < len(translations):
+                            translation = translations[i][1]
+                            # 取消时被中断的条目保持空白，续传时重新翻译
+                            if translation == CANCELLED_MARKER:
+                                continue
+                            output.write(col_idx, rows, translation)
+                            # 失败标记不计入已完成数，也不记入日志，续传时会重新翻译
+                            if translation in ERROR_MARKERS:
+                                self.add_failed(rows)
+                                continue
+                            self.add_translated(rows)
+                            self.update_progress_status(self.translated_count, self.total_tasks)
+                            # 模糊匹配提示不是本条原文的参考翻译，不作为缓存键的一部分
+                            memory_ref = ref_text if use_reference else None
+                            new_entries.append((text, source_lang, lang, memory_ref, translation))
+                            journal_records.append((lang, rows, translation))
+
+                journal.append_many(journal_records)
+                # 写入翻译记忆库，供后续任务复用
+                if memory:
+                    evicted = memory.put_many(new_entries)
+                    if evicted:
+                        with self._progress_lock:
+                            self.cache_evictions += evicted
+
+            def handle_result(task, result):
+                """写回一个批次的结果；多目标语言批次按 (列, 语言) 分组后写回"""
+                col_idx, lang, batch_items = task
+                if col_idx is not None:
+                    write_results(col_idx, lang, batch_items, result)
+                    return
+
+                grouped = {}
+                for (targets, text, ref_text), translations in zip(batch_items, result):
+                    for target_col, target_lang, rows in targets:
+                        if target_lang in translations:
+                            units, values = grouped.setdefault((target_col, target_lang), ([], []))
+                            units.append((rows, text, ref_text))
+                            values.append((text, translations[target_lang]))
+                for (target_col, target_lang), (units, values) in grouped.items():
+                    write_results(target_col, target_lang, units, values)
+
+            def submit_batch(executor, task):
+                """提交一个批次的翻译任务"""
+                return executor.submit(self.translate_task, task, source_lang, prompt_reference_lang,
+                                       max_tokens=task_max_tokens(task))
+
+            # 开始翻译处理（仅处理缓存未命中的单元格）
+            token_budget = config["batch_token_budget"] if config["token_batching"] else 0
+            budgets = {"input_budget": config["batch_input_token_budget"], "max_items": config["max_batch_items"]}
+            if config["multi_target_requests"] and len(target_langs) > 1:
+                # 一次请求返回所有目标语言，原文和提示词只发送一次
+                batches = iter_multi_target_batches(pending, config["batch_size"], token_budget,
+                                                    plan.estimates, **budgets)
+            else:
+                batches = iter_batches(pending, config["batch_size"], token_budget, plan.estimates, **budgets)
+            if config["engine"] == ENGINE_ASYNCIO:
+                # asyncio 引擎：单线程事件循环在信号量限制下并发数百个请求
+                # API Key 无效时 asyncio 引擎撤销所有批次并抛出，与线程引擎一样中止任务
                 try:
-                    progress_callback(current, total, finished)
+                    completed = run_translation_async(
+                        batches,
+                        handle_result,
+                        self.api_key,
+                        self.base_url,
+                        source_lang,
+                        prompt_reference_lang,
+                        concurrency=config["async_concurrency"],
+                        retry_policy=self.get_retry_policy(),
+                        is_cancelled=lambda: self.cancelled,
+                        controller=self.controller,
+                        max_tokens_for=task_max_tokens,
+                        timeout=self._timeout,
+                        usage_tracker=self.usage,
+                        connection_metrics=self.connection_metrics,
+                        rate_limit_stats=self.rate_limit_stats
+                    )
                 except Exception as e:
-                    logger.error(f"更新进度时出错: {e}")
-
-def count_already_translated(ws, valid_rows, target_langs):
-    """计算已经翻译的单元格数量"""
-    already_translated = 0
-    total_cells = 0
-    
-    logger.info("开始统计已翻译的单元格...")
-    
-    for row in tqdm(valid_rows, desc="统计已翻译进度"):
-        for col_idx, _ in target_langs:
-            total_cells += 1
-            cell_value = ws.cell(row=row, column=col_idx).value
-            if cell_value and str(cell_value).strip():
-                already_translated += 1
-    
-    percentage = (already_translated / total_cells) * 100 if total_cells > 0 else 0
-    logger.info(f"已有 {already_translated}/{total_cells} ({percentage:.2f}%) 个单元格已翻译")
-    
-    return already_translated
-
-def process_excel_with_threading(excel_file=None, output_file=None, source_lang="English", 
-                               target_languages=None, api_key_param=None, reference_file=None, 
-                               reference_lang=None, reference_column=None):
-    """使用多线程处理Excel文件"""
-    global translated_count, translation_cancelled, api_key, total_tasks, last_progress_report
-    
-    # 重置所有计数器和状态
-    translated_count = 0
-    last_progress_report = 0
-    translation_cancelled = False
-    api_key = api_key_param
-    total_tasks = 0
-
-    try:
-        # 读取Excel文件
-        wb = load_workbook(excel_file)
-        ws = wb.active
-        
-        # 获取标题行
-        header_row = [cell.value for cell in ws[1]]
-        max_row = ws.max_row
-        
-        # 创建新的工作簿
-        new_wb = load_workbook(excel_file)
-        new_ws = new_wb.active
-        
-        # 清除现有的目标语言列（如果存在）
-        existing_cols = []
-        for col_idx, header in enumerate(header_row, 1):
-            if header in target_languages:
-                existing_cols.append(col_idx)
-        
-        # 从后往前删除列（避免索引变化）
-        for col_idx in sorted(existing_cols, reverse=True):
-            new_ws.delete_cols(col_idx)
-        
-        # 重新获取最后一列的索引
-        last_col = new_ws.max_column
-        
-        # 添加目标语言列
-        target_langs = []
-        for i, lang in enumerate(target_languages, 1):
-            col_idx = last_col + i
-            new_ws.cell(row=1, column=col_idx, value=lang)
-            target_langs.append((col_idx, lang))
-            
-        # 获取源语言列索引
-        source_col = None
-        for col_idx, header in enumerate(header_row, 1):
-            # 检查中文名称和英文代码
-            if header == source_lang or header == SUPPORTED_LANGUAGES.get(source_lang) or \
-               header == [k for k, v in SUPPORTED_LANGUAGES.items() if v == source_lang][0]:
-                source_col = col_idx
-                break
-                
-        if source_col is None:
-            raise ValueError(f"未找到源语言列: {source_lang}")
-            
-        # 获取有效行（源语言列有值的行）
-        valid_rows = []
-        for row in range(2, max_row + 1):
-            source_text = ws.cell(row=row, column=source_col).value
-            if source_text and str(source_text).strip():
-                valid_rows.append((row, str(source_text).strip()))
-        
-        # 计算总任务数
-        total_tasks = len(valid_rows) * len(target_langs)
-        
-        # 准备参考源数据
-        reference_data = {}
-        if reference_file and reference_lang:
-            ref_wb = load_workbook(reference_file)
-            ref_ws = ref_wb.active
-            ref_header_row = [cell.value for cell in ref_ws[1]]
-            
-            # 在参考文件中查找参考语言列
-            ref_target_col = None
-            for col_idx, header in enumerate(ref_header_row, 1):
-                # 检查中文名称
-                if header == reference_lang:
-                    ref_target_col = col_idx
-                    break
-                # 检查英文代码
-                if header == SUPPORTED_LANGUAGES.get(reference_lang):
-                    ref_target_col = col_idx
-                    break
-                # 如果传入的是英文代码，检查对应的中文名称
-                for zh_name, en_code in SUPPORTED_LANGUAGES.items():
-                    if en_code == reference_lang and header == zh_name:
-                        ref_target_col = col_idx
-                        break
-                if ref_target_col:
-                    break
-            
-            if ref_target_col is None:
-                raise ValueError(f"在参考文件中未找到{reference_lang}列（支持中英文列名）")
-            
-            # 读取参考数据
-            for row in range(2, ref_ws.max_row + 1):
-                source = ref_ws.cell(row=row, column=source_col).value
-                ref = ref_ws.cell(row=row, column=ref_target_col).value
-                if source and ref:
-                    reference_data[str(source).strip()] = str(ref).strip()
-
-        # 开始翻译处理
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            for start_idx in range(0, len(valid_rows), batch_size):
-                if translation_cancelled:
+                    if is_auth_error(e):
+                        self.abort(e)
+                    raise
+                if not completed:
                     return False
+            else:
+                # 连接池至少要能容纳本任务的并发线程，否则线程会排队等待连接
+                ensure_pool_size(shared_pool_size(config))
+                # 线程引擎：生产者按批次持续提交任务，在途任务数保持在窗口上限以内，
+                # 任意批次完成即写回结果并补充新任务，避免慢请求阻塞整个线程池
+                # 启用自适应并发时，线程池按上限创建，实际在途数由控制器决定
+                controller = self.controller
+                pool_size = controller.max_limit if controller else config["max_workers"]
+                max_in_flight = config["max_workers"] * IN_FLIGHT_PER_WORKER
+                # 取消时不等待在途请求：未开始的批次直接撤销，已完成的批次照常写回，
+                # 正在等待数据的请求由 cancel 断开连接，工作线程随即结束
+                executor = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size)
+                if config["hedge_requests"]:
+                    # 对冲请求在独立线程池中发送，批次线程只等待先完成的一方
+                    self.hedger = HedgePolicy(config["hedge_percentile"], config["hedge_budget"])
+                    self._hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size * 2)
+                in_flight = {}
+                exhausted = False
+                try:
+                    while not self.cancelled:
+                        limit = controller.limit if controller else max_in_flight
+                        while not exhausted and len(in_flight) < limit:
+                            task = next(batches, None)
+                            if task is None:
+                                exhausted = True
+                                break
+                            in_flight[submit_batch(executor, task)] = task
 
-                end_idx = min(start_idx + batch_size, len(valid_rows))
-                batch_rows = valid_rows[start_idx:end_idx]
-                
-                futures = []
-                for col_idx, lang in target_langs:
-                    texts_to_translate = []
-                    rows_to_update = []
-                    
-                    for row_idx, text in batch_rows:
-                        current_text = new_ws.cell(row=row_idx, column=col_idx).value
-                        if not current_text or not str(current_text).strip():
-                            if reference_file and reference_lang and text in reference_data:
-                                texts_to_translate.append((text, reference_data[text]))
-                            else:
-                                texts_to_translate.append((text, None))
-                            rows_to_update.append(row_idx)
-                    
-                    if texts_to_translate:
-                        if reference_file and reference_lang:
-                            future = executor.submit(
-                                translate_batch_with_reference,
-                                texts_to_translate,
-                                lang,
-                                reference_lang
-                            )
-                        else:
-                            future = executor.submit(
-                                translate_batch,
-                                [text[0] for text in texts_to_translate],
-                                source_lang,
-                                lang
-                            )
-                        futures.append((future, rows_to_update, col_idx))
-                
-                # 处理翻译结果
-                for future, rows, col_idx in futures:
-                    if translation_cancelled:
-                        return False
+                        if not in_flight:
+                            break
 
-                    try:
-                        translations = future.result()
-                        with excel_lock:
-                            for i, row in enumerate(rows):
-                                if i < len(translations):
-                                    new_ws.cell(row=row, column=col_idx).value = translations[i][1]
-                                    translated_count += 1
-                                    update_progress_status(translated_count, total_tasks)
-                            
-                            if translated_count % save_interval == 0:
-                                new_wb.save(output_file)
-                    except Exception as e:
-                        logger.error(f"处理翻译结果时出错: {e}")
-        
-        # 保存最终结果
-        new_wb.save(output_file)
+                        # 带超时等待，取消后最多 CANCEL_CHECK_INTERVAL 秒即可返回
+                        done, _ = concurrent.futures.wait(
+                            in_flight, timeout=CANCEL_CHECK_INTERVAL,
+                            return_when=concurrent.futures.FIRST_COMPLETED
+                        )
+                        for future in done:
+                            task = in_flight.pop(future)
+                            try:
+                                handle_result(task, future.result())
+                            except Exception as e:
+                                # API Key 无效时其他批次也不会成功，中止整个任务
+                                if is_auth_error(e):
+                                    self.abort(e)
+                                    break
+                                logger.error(f"处理翻译结果时出错: {e}")
+                finally:
+                    executor.shutdown(wait=not self.cancelled, cancel_futures=True)
+                    if self._hedge_executor:
+                        self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+                        self._hedge_executor = None
+
+                if self.cancelled:
+                    # 取消前已经完成的批次仍写入输出和任务日志
+                    for future, task in in_flight.items():
+                        if future.done() and not future.cancelled() and future.exception() is None:
+                            try:
+                                handle_result(task, future.result())
+                            except Exception as e:
+                                logger.error(f"处理翻译结果时出错: {e}")
+                    abandoned = sum(not f.done() for f in in_flight)
+                    if self.abort_error is not None:
+                        logger.info(f"任务已中止，放弃 {abandoned} 个在途批次")
+                        raise self.abort_error
+                    logger.info(f"任务已取消，放弃 {abandoned} 个在途批次")
+                    return False
         
-        # 更新最终进度
-        if not translation_cancelled:
-            update_progress_status(total_tasks, total_tasks, True)
+            # 全部结果写入后只保存一次；所有单元格都已翻译时任务日志不再需要，
+            # 有单元格翻译失败或未写回时保留任务日志，续传时只翻译这些单元格
+            output.save()
+            saved = True
+            missing = self.total_tasks - self.translated_count
+            if not missing:
+                journal.discard()
         
-        return True
+            metrics = self.connection_metrics.snapshot()
+            logger.info(f"API请求 {metrics['requests']} 次，新建连接 {metrics['connections']} 次，"
+                        f"连接复用率 {metrics['reuse_ratio']:.1%}")
+            if get_rate_limiter().enabled:
+                limit_stats = self.rate_limit_stats.snapshot()
+                logger.info(f"限流等待 {limit_stats['waits']} 次，累计 {limit_stats['wait_time']:.1f} 秒")
+                self.summary["rate_limit"] = limit_stats
+
+            if memory:
+                logger.info(f"翻译缓存命中 {cache_hits} 个单元格，未命中 {cache_misses} 个，"
+                            f"本次写入淘汰旧记录 {self.cache_evictions} 条")
+
+            if self.controller:
+                decisions = self.controller.get_decisions()
+                logger.info(f"自适应并发共调整 {len(decisions)} 次，最终并发数 {self.controller.limit}")
+
+            if self.hedger:
+                hedge_stats = self.hedger.stats()
+                logger.info(f"对冲请求 {hedge_stats['hedged']} 次（共 {hedge_stats['requests']} 次请求），"
+                            f"其中 {hedge_stats['hedge_wins']} 次先于原请求完成")
+                self.summary["hedging"] = hedge_stats
+
+            self.summary.update({
+                "skipped": dict(skipped),
+                "cache_hits": cache_hits,
+                "cache_misses": cache_misses,
+                "cache_evictions": self.cache_evictions,
+                "fuzzy_reused": fuzzy_reused,
+                "sheets": [sheet.title for sheet in sheets],
+            })
+
+            # 更新最终进度（报告实际写回的单元格数）
+            self.update_progress_status(self.translated_count, self.total_tasks, True)
+            if missing:
+                # missing 包含写入失败标记的单元格和出错批次中未写回的单元格
+                logger.error(f"{missing} 个单元格未完成翻译（其中 {self.failed_count} 个翻译失败），"
+                             f"已保留任务日志，可续传补齐")
+                self.summary["missing"] = missing
+                self.summary["failed"] = self.failed_count
+                self.summary["error"] = f"{missing} 个单元格未完成翻译，可续传补齐"
+                return False
+
+            return True
         
-    except Exception as e:
-        logger.error(f"处理Excel文件出错: {e}")
-        return False
+        except Exception as e:
+            logger.error(f"处理Excel文件出错: {e}")
+            self.summary["error"] = str(e)
+            return False
+        finally:
+            # 取消或出错时保存一次已完成的部分，并保留任务日志供下次续传
+            if output and not saved:
+                try:
+                    output.save()
+                    logger.info(f"已保存部分翻译结果: {output_file}")
+                except Exception as e:
+                    logger.error(f"保存部分翻译结果失败: {e}")
+            if journal:
+                journal.close()
+            # 取消或出错的任务也统计已消耗的 token
+            self.summary["usage"] = self.report_usage(output_file)
 
-def translate_batch(texts, source_lang, target_lang, retry_count=0):
-    """不使用参考源的批量翻译"""
-    if not texts or translation_cancelled:
-        return []
-    
+    def report_usage(self, output_file):
+        """记录本次任务的 token 用量，usage_report 开启时在输出文件旁导出明细，返回用量汇总"""
+        usage = self.usage.summary()
+        if usage["requests"]:
+            logger.info(f"Token用量：{format_usage(usage)}")
+        if self.config["usage_report"] and output_file:
+            try:
+                self.usage.export_json(output_file + ".usage.json")
+                self.usage.export_csv(output_file + ".usage.csv")
+                logger.info(f"已导出Token用量明细: {output_file}.usage.json / .usage.csv")
+            except Exception as e:
+                logger.error(f"导出Token用量明细失败: {e}")
+        return usage
+
+    def resume_excel(self, journal_path):
+        """根据任务日志继续未完成的Excel翻译任务，输出写回原输出文件"""
+        return self.run_excel(resume=True, **journal_job_args(journal_path))
+
+def journal_job_args(journal_path):
+    """从任务日志头恢复 run_excel 的参数（不含 resume）"""
+    header, _ = read_journal(journal_path)
+    if header is None:
+        raise ValueError(f"无效的任务日志: {journal_path}")
+    return {
+        "excel_file": header["input_file"],
+        "output_file": header["output_file"],
+        "source_lang": header["source_lang"],
+        "target_languages": header["target_languages"],
+        "reference_file": header.get("reference_file"),
+        "reference_lang": header.get("reference_lang"),
+        "reference_column": header.get("reference_column"),
+        "sheet_names": header.get("sheet_names"),
+    }
+
+def set_translation_cancelled(value):
+    """设置翻译取消状态（旧接口），取消通过 process_excel_with_threading 启动的任务"""
+    global translation_cancelled
+    translation_cancelled = value
+    if value and current_job:
+        current_job.cancel()
+
+def process_excel_with_threading(excel_file=None, output_file=None, source_lang="English",
+                               target_languages=None, api_key_param=None, reference_file=None,
+                               reference_lang=None, reference_column=None, resume=False,
+                               sheet_names=None):
+    """使用多线程处理Excel文件（旧接口）
+
+    用 set_config 设置的配置和模块级回调创建一个 TranslationJob 并运行，参数含义见 TranslationJob.run_excel；
+    任务结束后摘要写入 last_job_summary。
+    """
+    global current_job, translation_cancelled
+    translation_cancelled = False
+    job = TranslationJob(current_config, api_key=api_key_param or api_key, base_url=DEEPSEEK_BASE_URL,
+                         progress_callback=progress_callback,
+                         sheet_progress_callback=sheet_progress_callback)
+    current_job = job
     try:
-        if translation_cancelled:
-            return [("[已取消]", "[已取消]") for _ in texts]
+        return job.run_excel(excel_file, output_file, source_lang, target_languages, reference_file,
+                             reference_lang, reference_column, resume, sheet_names)
+    finally:
+        last_job_summary.clear()
+        last_job_summary.update(job.summary)
+        translation_cancelled = job.cancelled and job.abort_error is None
+        if current_job is job:
+            current_job = None
 
-        if not api_key:
-            raise ValueError("API Key未设置")
-            
-        client = OpenAI(api_key=api_key, base_url=DEEPSEEK_BASE_URL)
-        
-        # 构建批量翻译请求
-        batch_prompts = []
-        for i, text in enumerate(texts):
-            batch_prompts.append(f"{i+1}. {source_lang}原文: {text}")
-        
-        batch_text = "\n\n".join(batch_prompts)
-        
-        prompt = f"""请将以下{len(texts)}条{source_lang}文本翻译成{target_lang}。
-请确保翻译准确、自然、符合目标语言的表达习惯。
-仅返回翻译结果，格式为"1. [翻译结果1]"，"2. [翻译结果2]"等，不要有额外解释。
+def resume_excel_job(journal_path, api_key_param=None):
+    """根据任务日志继续未完成的Excel翻译任务，输出写回原输出文件"""
+    return process_excel_with_threading(api_key_param=api_key_param, resume=True,
+                                        **journal_job_args(journal_path))
 
-{batch_text}"""
+def shared_pool_size(config):
+    """线程引擎按配置的并发数需要的连接数，每个线程都能复用一条长连接"""
+    max_workers = config['max_workers']
+    if config['adaptive_concurrency']:
+        pool_size = max(max_workers, config['max_concurrency'])
+    else:
+        pool_size = max_workers
+    if config['hedge_requests']:
+        # 对冲请求与原请求同时在途，需要额外的连接
+        pool_size *= 2
+    return pool_size
 
-        if translation_cancelled:
-            return [("[已取消]", "[已取消]") for _ in texts]
+def configure_shared_pool(config):
+    """按配置的并发数设置共享连接池、默认超时和共享限流器"""
+    configure_pool(shared_pool_size(config), config['keepalive_expiry'],
+                   make_timeout(config['connect_timeout'], config['read_timeout']))
+    configure_rate_limit(config['requests_per_minute'], config['tokens_per_minute'])
 
-        try:
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个精通多语言翻译的专家。只翻译文本，不添加任何解释或附加文本。返回结果保持简洁。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000,
-            )
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "401" in error_msg and "invalid" in error_msg and "api key" in error_msg:
-                raise ValueError("API Key无效或未授权，请检查API Key是否正确")
-            raise
-        
-        # 解析返回结果
-        result = response.choices[0].message.content.strip()
-        translated_texts = []
-        
-        # 处理返回的格式，试图匹配"数字. 翻译内容"格式
-        lines = result.split("\n")
-        for i, text in enumerate(texts):
-            found = False
-            for line in lines:
-                line = line.strip()
-                # 尝试匹配格式为 "i+1. 翻译内容"
-                if line.startswith(f"{i+1}. ") or line.startswith(f"{i+1}."):
-                    translated = line[line.find(".")+1:].strip()
-                    translated_texts.append((text, translated))
-                    found = True
-                    break
-            
-            if not found:
-                # 如果无法匹配格式，则尝试按顺序取出翻译结果
-                translated_texts.append((text, "[格式错误]"))
-        
-        # 确保返回结果数量匹配
-        while len(translated_texts) < len(texts):
-            translated_texts.append(("[翻译缺失]", "[翻译缺失]"))
-            
-        return translated_texts
-        
-    except ValueError as e:
-        # API Key相关错误直接向上抛出
-        if "api key无效" in str(e).lower():
-            raise
-        # 其他错误进行重试
-        if retry_count < max_retries:
-            time.sleep(1)
-            return translate_batch(texts, source_lang, target_lang, retry_count + 1)
-        return [("[翻译错误]", "[翻译错误]") for _ in texts]
+def set_config(config):
+    """设置旧接口使用的配置参数，并配置共享连接池"""
+    global current_config
+    current_config = resolve_config(config)
+    configure_shared_pool(current_config)
+
+# 命令行退出码
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2       # 参数错误（与 argparse 一致）
+EXIT_AUTH = 3        # API Key 无效或未设置
+EXIT_CANCELLED = 130 # 被 Ctrl+C / SIGTERM 取消，已完成部分已保存并保留任务日志
+
+def resolve_language(name):
+    """把中文名或英文代码转换为英文代码，不支持的语言返回 None"""
+    name = name.strip()
+    if name in SUPPORTED_LANGUAGES:
+        return SUPPORTED_LANGUAGES[name]
+    if name in SUPPORTED_LANGUAGES.values():
+        return name
+    return None
+
+def emit_event(event, **fields):
+    """向标准输出写一行 JSON 事件（日志写到标准错误，两者互不干扰）"""
+    print(json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False),
+          flush=True)
+
+def build_arg_parser():
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="deepl_selenium_translate",
+        description="无界面批量翻译Excel文件，进度以 JSON Lines 输出到标准输出",
+    )
+    parser.add_argument("input", help="输入的Excel文件")
+    parser.add_argument("-o", "--output",
+                        help="输出文件，默认在输入文件旁生成 <文件名>_translated_<时间>.xlsx")
+    parser.add_argument("-s", "--source-lang", default="English", help="源语言，中文名或英文代码（默认 English）")
+    parser.add_argument("-t", "--target-langs", required=True,
+                        help="目标语言，逗号分隔，中文名或英文代码均可，如 French,German")
+    sheets = parser.add_mutually_exclusive_group()
+    sheets.add_argument("--sheets", help="要翻译的工作表名称，逗号分隔（默认只翻译活动工作表）")
+    sheets.add_argument("--all-sheets", action="store_true", help="翻译所有工作表")
+
+    reference = parser.add_argument_group("参考源")
+    reference.add_argument("--reference-lang", help="参考语言；不指定参考文件时使用同一工作表中该语言的列")
+    reference.add_argument("--reference-file", help="外部参考Excel文件")
+    reference.add_argument("--reference-column", help="同一工作表中作为参考源的列标题（默认按参考语言查找）")
+
+    api = parser.add_argument_group("API")
+    api.add_argument("--api-key", default=os.environ.get("DEEPSEEK_API_KEY"),
+                     help="DeepSeek API Key（默认读取环境变量 DEEPSEEK_API_KEY）")
+    api.add_argument("--base-url", default=DEEPSEEK_BASE_URL, help="API 地址")
+    api.add_argument("--connect-timeout", type=float,
+                     help=f"建立连接的超时秒数（默认 {DEFAULT_CONNECT_TIMEOUT:g}）")
+    api.add_argument("--read-timeout", type=float,
+                     help=f"两次收到数据之间的最长等待秒数（默认 {DEFAULT_READ_TIMEOUT:g}）")
+    api.add_argument("--requests-per-minute", type=int, help="每分钟最多请求数（默认不限制）")
+    api.add_argument("--tokens-per-minute", type=int, help="每分钟最多Token数（默认不限制）")
+    api.add_argument("--usage-report", action="store_true", default=None,
+                     help="在输出文件旁导出Token用量明细（.usage.json / .usage.csv）")
+    api.add_argument("--hedge-requests", action="store_true", default=None,
+                     help="请求明显慢于近期水平时补发一次，先完成者生效（仅线程引擎）")
+
+    tuning = parser.add_argument_group("并发与批次")
+    tuning.add_argument("--config", help="JSON 配置文件，格式与 ~/.translate_config.json 相同，命令行参数优先")
+    tuning.add_argument("--engine", choices=[ENGINE_THREAD, ENGINE_ASYNCIO], help="翻译引擎")
+    tuning.add_argument("--workers", type=int, help=f"线程数（默认 {DEFAULT_MAX_WORKERS}）")
+    tuning.add_argument("--async-concurrency", type=int, help="asyncio 引擎的最大并发请求数")
+    tuning.add_argument("--adaptive-concurrency", action="store_true", default=None, help="启用自适应并发")
+    tuning.add_argument("--batch-size", type=int, help=f"关闭Token打包时每批条数（默认 {DEFAULT_BATCH_SIZE}）")
+    tuning.add_argument("--token-budget", type=int, help="单批预计输出Token预算，0 表示按固定条数分批")
+    tuning.add_argument("--multi-target", action="store_true", default=None, help="一次请求返回所有目标语言")
+    tuning.add_argument("--max-retries", type=int, help=f"最大重试次数（默认 {DEFAULT_MAX_RETRIES}）")
+    tuning.add_argument("--streaming-output", action="store_true", default=None,
+                        help="流式写出结果，只保留单元格值")
+
+    cache = parser.add_argument_group("缓存与续传")
+    cache.add_argument("--cache-path", help="翻译记忆库位置（默认 ~/.translate_cache.db）")
+    cache.add_argument("--no-cache", action="store_true", help="不使用翻译记忆库")
+    cache.add_argument("--resume", action="store_true", help="存在同一任务的未完成日志时从中断处继续")
+    parser.add_argument("--progress-interval", type=int, help="每翻译多少个单元格输出一次进度事件")
+    parser.add_argument("--log-level", default="INFO", help="标准错误上的日志级别（默认 INFO）")
+    return parser
+
+def build_cli_config(args):
+    """合并配置文件和命令行参数，生成 set_config 使用的配置"""
+    config = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    overrides = {
+        "engine": args.engine,
+        "max_workers": args.workers,
+        "async_concurrency": args.async_concurrency,
+        "adaptive_concurrency": args.adaptive_concurrency,
+        "batch_size": args.batch_size,
+        "multi_target_requests": args.multi_target,
+        "max_retries": args.max_retries,
+        "streaming_output": args.streaming_output,
+        "cache_path": args.cache_path,
+        "progress_interval": args.progress_interval,
+        "connect_timeout": args.connect_timeout,
+        "read_timeout": args.read_timeout,
+        "hedge_requests": args.hedge_requests,
+        "requests_per_minute": args.requests_per_minute,
+        "tokens_per_minute": args.tokens_per_minute,
+        "usage_report": args.usage_report,
+    }
+    if args.token_budget is not None:
+        overrides["token_batching"] = args.token_budget > 0
+        if args.token_budget > 0:
+            overrides["batch_token_budget"] = args.token_budget
+    if args.no_cache:
+        overrides["cache_enabled"] = False
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    return config
+
+def main(argv=None):
+    """命令行入口：参数见 --help，返回退出码"""
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    logger.setLevel(args.log_level.upper())
+
+    source_lang = resolve_language(args.source_lang)
+    target_languages = [resolve_language(name) for name in args.target_langs.split(",") if name.strip()]
+    reference_lang = resolve_language(args.reference_lang) if args.reference_lang else None
+    if source_lang is None or None in target_languages or (args.reference_lang and reference_lang is None):
+        parser.error(f"不支持的语言，可用: {', '.join(SUPPORTED_LANGUAGES.values())}")
+    target_languages = list(dict.fromkeys(lang for lang in target_languages if lang != source_lang))
+    if not target_languages:
+        parser.error("至少需要一个与源语言不同的目标语言")
+    if not os.path.exists(args.input):
+        parser.error(f"输入文件不存在: {args.input}")
+    if (args.reference_file or args.reference_column) and not reference_lang:
+        parser.error("使用参考文件或参考列时必须指定 --reference-lang")
+    if not args.api_key:
+        emit_event("error", message="API Key未设置，请使用 --api-key 或环境变量 DEEPSEEK_API_KEY")
+        return EXIT_AUTH
+
+    try:
+        config = build_cli_config(args)
+        if args.all_sheets:
+            sheet_names = list_sheet_names(args.input)
+        else:
+            sheet_names = [name.strip() for name in args.sheets.split(",")] if args.sheets else None
+        headers, data_rows = inspect_workbook(args.input, sheet_names)
     except Exception as e:
-        # 其他错误进行重试
-        if retry_count < max_retries:
-            time.sleep(1)
-            return translate_batch(texts, source_lang, target_lang, retry_count + 1)
-        return [("[翻译错误]", "[翻译错误]") for _ in texts]
+        emit_event("error", message=str(e))
+        return EXIT_FAILED
 
-def set_config(config):
-    """设置全局配置参数"""
-    global max_workers, batch_size, max_retries, save_interval, progress_interval
-    
-    max_workers = config.get('max_workers', DEFAULT_MAX_WORKERS)
-    batch_size = config.get('batch_size', DEFAULT_BATCH_SIZE)
-    max_retries = config.get('max_retries', DEFAULT_MAX_RETRIES)
-    save_interval = config.get('save_interval', DEFAULT_SAVE_INTERVAL)
-    progress_interval = config.get('progress_interval', DEFAULT_PROGRESS_INTERVAL)
-
-def main():
-    logger.info("开始多线程批量翻译Excel文件")
-    logger.info(f"线程数: {max_workers}, 批处理大小: {batch_size}, 保存间隔: {save_interval}, 进度显示间隔: {progress_interval}")
-    
-    start_time = time.time()
-    success = process_excel_with_threading()
-    end_time = time.time()
-    
-    if success:
-        logger.info(f"Excel翻译成功完成! 总耗时: {end_time - start_time:.2f} 秒")
+    # 内置参考源：没有指定列标题时，按参考语言的中文名或英文代码查找
+    reference_column = args.reference_column
+    if reference_lang and not args.reference_file and not reference_column:
+        names = language_header_names(reference_lang)
+        reference_column = next((header for header in headers if header in names), None)
+        if reference_column is None:
+            parser.error(f"在Excel文件中未找到{reference_lang}列作为参考源")
+
+    # 使用外部参考文件时不使用参考列，任务日志的参数与 run_excel 收到的参数一致
+    if args.reference_file:
+        reference_column = None
+
+    # 输出文件：续传时沿用未完成任务日志中的输出文件
+    input_path = Path(args.input)
+    resume = False
+    if args.output:
+        output_file = Path(args.output)
+        resume = args.resume and default_journal_path(output_file).exists()
     else:
-        logger.error("Excel翻译过程中出现错误")
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        output_file = input_path.with_name(f"{input_path.stem}_translated_{timestamp}{input_path.suffix}")
+        if args.resume:
+            journal_path = find_resumable_journal(
+                input_path.parent, input_path,
+                **get_job_params(source_lang, target_languages, args.reference_file, reference_lang,
+                                 reference_column, sheet_names)
+            )
+            if journal_path:
+                output_file = Path(read_journal(journal_path)[0]["output_file"])
+                resume = True
+
+    job = TranslationJob(
+        config, api_key=args.api_key, base_url=args.base_url,
+        progress_callback=lambda current, total, finished: emit_event(
+            "progress", done=current, total=total, finished=finished),
+        sheet_progress_callback=lambda sheets: emit_event(
+            "sheet_progress", sheets=[{"sheet": title, "done": done, "total": total}
+                                      for title, done, total in sheets])
+    )
+    configure_shared_pool(job.config)
+
+    # Ctrl+C / SIGTERM：第一次请求取消并保存已完成部分，第二次直接退出；返回前恢复原来的处理函数
+    def request_cancel(signum, frame):
+        logger.warning("收到中断信号，正在取消翻译并保存已完成部分...")
+        job.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    handled_signals = [signal.SIGINT] + ([signal.SIGTERM] if hasattr(signal, "SIGTERM") else [])
+    previous_handlers = {signum: signal.getsignal(signum) for signum in handled_signals}
+    try:
+        for signum in handled_signals:
+            signal.signal(signum, request_cancel)
+
+        emit_event("start", input=str(input_path), output=str(output_file), source_lang=source_lang,
+                   target_languages=target_languages, sheets=sheet_names, rows=data_rows, resume=resume)
+        start_time = time.time()
+        success = job.run_excel(
+            excel_file=str(input_path),
+            output_file=str(output_file),
+            source_lang=source_lang,
+            target_languages=target_languages,
+            reference_file=args.reference_file,
+            reference_lang=reference_lang,
+            reference_column=reference_column,
+            resume=resume,
+            sheet_names=sheet_names
+        )
+    finally:
+        for signum, handler in previous_handlers.items():
+            # getsignal 对不是由 Python 设置的处理函数返回 None，这种处理函数无法恢复
+            if handler is not None:
+                signal.signal(signum, handler)
+    elapsed = round(time.time() - start_time, 2)
+
+    if success:
+        emit_event("done", output=str(output_file), elapsed=elapsed, summary=job.summary)
+        return EXIT_OK
+    if job.cancelled and job.abort_error is None:
+        emit_event("cancelled", output=str(output_file), journal=str(default_journal_path(output_file)),
+                   elapsed=elapsed)
+        return EXIT_CANCELLED
+    error = job.summary.get("error", "翻译失败")
+    emit_event("error", message=error, output=str(output_file), elapsed=elapsed)
+    return EXIT_AUTH if is_auth_error(job.abort_error) else EXIT_FAILED
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,168 @@
+import logging
+
+import numpy as np
+from openpyxl import load_workbook
+
+from source_prep import clean_text_column
+
+logger = logging.getLogger(__name__)
+
+
+# 多工作表任务中，行键 = 工作表序号 * SHEET_ROW_STRIDE + 行号，工作表序号是 load_sheets 返回列表中的下标
+# （被跳过的工作表不占序号，与所选列表中的位置可能不同），
+# 各工作表的单元格可以在同一批翻译单元中去重和调度；单工作表任务的行键就是行号
+SHEET_ROW_STRIDE = 1 << 21  # 大于 Excel 的最大行数 1048576
+
+
+def row_key(sheet_index, row):
+    """工作表序号（load_sheets 返回列表中的下标）和行号合成的行键"""
+    return sheet_index * SHEET_ROW_STRIDE + row
+
+
+def split_row_key(key):
+    """把行键拆分为 (工作表序号, 行号)"""
+    return divmod(key, SHEET_ROW_STRIDE)
+
+
+class SheetRows:
+    """单次遍历工作表得到的紧凑数据
+
+    title: 工作表名称
+    headers: 标题行
+    rows: [(行号, 原文, 参考文本), ...]，只包含源语言列非空的行，没有参考列时参考文本为 None
+    max_row: 工作表最后一行的行号
+    """
+
+    def __init__(self, headers, source_col, rows, max_row, title=None):
+        self.title = title
+        self.headers = headers
+        self.source_col = source_col
+        self.rows = rows
+        self.max_row = max_row
+
+
+def find_column(headers, names):
+    """返回第一个标题在 names 中的列号（从1开始），找不到返回 None"""
+    for col_idx, header in enumerate(headers, 1):
+        if header is not None and header in names:
+            return col_idx
+    return None
+
+
+def list_sheet_names(path):
+    """以只读模式读取工作簿中所有工作表的名称"""
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_headers(path):
+    """以只读模式只读取活动工作表的标题行"""
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(next(wb.active.iter_rows(max_row=1, values_only=True), ()))
+    finally:
+        wb.close()
+
+
+def inspect_workbook(path, sheet_names=None):
+    """以只读模式读取标题行和数据行数，不加载整个工作簿
+
+    sheet_names 为空时只读取活动工作表；否则合并所选工作表的标题（去重）并累加数据行数。
+    """
+    wb = load_workbook(path, read_only=True)
+    try:
+        headers = []
+        data_rows = 0
+        for ws in ([wb[name] for name in sheet_names] if sheet_names else [wb.active]):
+            rows = ws.iter_rows(values_only=True)
+            for header in next(rows, ()):
+                if header not in headers:
+                    headers.append(header)
+            if ws.max_row is not None:
+                data_rows += max(ws.max_row - 1, 0)
+            else:
+                # 文件中没有记录表格尺寸时只能逐行计数
+                data_rows += sum(1 for _ in rows)
+        return headers, data_rows
+    finally:
+        wb.close()
+
+
+def _read_sheet(ws, source_names, reference_column=None):
+    """流式遍历一次工作表，提取标题、源语言列和参考列"""
+    rows = ws.iter_rows(values_only=True)
+    headers = list(next(rows, ()))
+
+    source_col = find_column(headers, source_names)
+    if source_col is None:
+        raise ValueError(f"未找到源语言列: {'/'.join(sorted(source_names))}")
+
+    ref_col = None
+    if reference_column:
+        ref_col = find_column(headers, {reference_column})
+        if ref_col is None:
+            raise ValueError(f"未找到参考列: {reference_column}")
+
+    # 遍历时只收集原始值，有效行判断和去空白在列数组上完成
+    source_values = []
+    ref_values = []
+    for values in rows:
+        source_values.append(values[source_col - 1] if len(values) >= source_col else None)
+        if ref_col is not None:
+            ref_values.append(values[ref_col - 1] if len(values) >= ref_col else None)
+    max_row = len(source_values) + 1
+
+    valid, texts = clean_text_column(source_values)
+    row_numbers = np.flatnonzero(valid) + 2
+    source_texts = texts[valid].tolist()
+    if ref_col is not None:
+        ref_valid, ref_texts = clean_text_column(ref_values)
+        refs = ref_texts.where(ref_valid, None)[valid].tolist()
+    else:
+        refs = [None] * len(source_texts)
+    source_rows = list(zip(row_numbers.tolist(), source_texts, refs))
+
+    logger.info(f"读取工作表「{ws.title}」完成，共 {max_row - 1} 行，有效行 {len(source_rows)} 行")
+    return SheetRows(headers, source_col, source_rows, max_row, ws.title)
+
+
+def load_source_rows(path, source_names, reference_column=None):
+    """流式遍历一次活动工作表，提取标题、源语言列和参考列
+
+    source_names: 可作为源语言列标题的名称集合（中文名或英文代码）
+    reference_column: 可选，同一工作表中作为参考源的列标题
+    """
+    wb = load_workbook(path, read_only=True)
+    try:
+        return _read_sheet(wb.active, source_names, reference_column)
+    finally:
+        wb.close()
+
+
+def load_sheets(path, source_names, reference_column=None, sheet_names=None):
+    """读取多个工作表，返回 [SheetRows, ...]，顺序与 sheet_names 一致
+
+    sheet_names 为空时只读取活动工作表。多个工作表中缺少源语言列或参考列的工作表会被跳过，
+    所选工作表全部无法翻译时抛出 ValueError。
+    """
+    if not sheet_names:
+        return [load_source_rows(path, source_names, reference_column)]
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        sheets = []
+        for name in sheet_names:
+            if name not in wb.sheetnames:
+                raise ValueError(f"未找到工作表: {name}")
+            try:
+                sheets.append(_read_sheet(wb[name], source_names, reference_column))
+            except ValueError as e:
+                logger.warning(f"跳过工作表「{name}」: {e}")
+        if not sheets:
+            raise ValueError(f"所选工作表中都没有可翻译的源语言列: {'/'.join(sorted(source_names))}")
+        return sheets
+    finally:
+        wb.close()
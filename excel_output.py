@@ -0,0 +1,276 @@
+import logging
+import queue
+import sqlite3
+import threading
+
+from openpyxl import Workbook, load_workbook
+
+from excel_input import split_row_key
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter:
+    """后台写入线程基类
+
+    结果回调只需把 (列索引, 行号列表, 译文) 放入队列即可返回，
+    输出只由后台线程修改，写入和保存都不会阻塞结果处理。
+    子类实现 _apply 完成实际写入，并在初始化末尾调用本类的 __init__ 启动线程。
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="excel-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, col_idx, rows, value):
+        """异步写入一组单元格"""
+        self._queue.put((col_idx, rows, value))
+
+    def _apply(self, col_idx, rows, value):
+        raise NotImplementedError
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._apply(*item)
+            except Exception as e:
+                logger.error(f"写入单元格出错: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """等待队列中的单元格全部写入"""
+        self._queue.join()
+
+    def close(self):
+        """写完剩余单元格后停止后台线程"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class WorkbookOutput(BackgroundWriter):
+    """在完整加载的输入工作簿上写入译文，保留原文件的格式和其他工作表
+
+    sheets 为 [SheetRows, ...]，行号使用 excel_input.row_key 合成的行键。
+    各工作表原有的目标语言列会被删除，目标语言列重新追加到最后；
+    target_cols 中的列索引为目标语言序号，写入时再换算为各工作表的实际列号。
+    """
+
+    def __init__(self, excel_file, output_file, sheets, target_languages):
+        self.output_file = output_file
+        self.wb = load_workbook(excel_file)
+        self.target_cols = [(i, lang) for i, lang in enumerate(target_languages, 1)]
+        self._sheets = []  # [(工作表, [各目标语言的实际列号])]
+
+        for sheet in sheets:
+            ws = self.wb[sheet.title] if sheet.title else self.wb.active
+            # 从后往前删除已存在的目标语言列（避免索引变化）
+            existing_cols = [col_idx for col_idx, header in enumerate(sheet.headers, 1)
+                             if header in target_languages]
+            for col_idx in sorted(existing_cols, reverse=True):
+                ws.delete_cols(col_idx)
+
+            # 添加目标语言列
+            last_col = ws.max_column
+            for i, lang in enumerate(target_languages, 1):
+                ws.cell(row=1, column=last_col + i, value=lang)
+            self._sheets.append((ws, [last_col + i for i in range(1, len(target_languages) + 1)]))
+        super().__init__()
+
+    def _apply(self, col_idx, rows, value):
+        for key in rows:
+            sheet_index, row = split_row_key(key)
+            ws, columns = self._sheets[sheet_index]
+            ws.cell(row=row, column=columns[col_idx - 1]).value = value
+
+    def save(self):
+        """写完队列中的单元格后保存整个工作簿"""
+        self.close()
+        self.wb.save(self.output_file)
+
+
+# 流式输出时每个工作表的重排缓冲区在内存中最多暂存的行数，超出的行暂存到临时文件
+DEFAULT_MAX_BUFFERED_ROWS = 10000
+
+
+def _row_ranges(rows):
+    """把升序行号压缩为 [(起始行, 结束行), ...] 连续区间"""
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+
+class _SpillBuffer:
+    """重排缓冲区的溢出存储：超出内存上限的行暂存在临时 SQLite 文件中，按需创建，关闭时删除"""
+
+    def __init__(self):
+        self._conn = None
+
+    def put(self, sheet_index, row, index, value):
+        if self._conn is None:
+            # 空路径为临时数据库文件，连接关闭后自动删除
+            self._conn = sqlite3.connect("", check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE spill (
+                    sheet INTEGER NOT NULL,
+                    row INTEGER NOT NULL,
+                    idx INTEGER NOT NULL,
+                    value,
+                    PRIMARY KEY (sheet, row, idx)
+                ) WITHOUT ROWID
+            """)
+        self._conn.execute("INSERT OR REPLACE INTO spill VALUES (?, ?, ?, ?)", (sheet_index, row, index, value))
+
+    def take(self, sheet_index, row):
+        """取出并删除一行暂存的译文，返回 [(目标语言序号, 译文), ...]"""
+        if self._conn is None:
+            return []
+        cells = self._conn.execute("SELECT idx, value FROM spill WHERE sheet = ? AND row = ?",
+                                   (sheet_index, row)).fetchall()
+        if cells:
+            self._conn.execute("DELETE FROM spill WHERE sheet = ? AND row = ?", (sheet_index, row))
+        return cells
+
+    def peek(self, sheet_index, row):
+        """读取一行暂存的译文但不删除"""
+        if self._conn is None:
+            return []
+        return self._conn.execute("SELECT idx, value FROM spill WHERE sheet = ? AND row = ?",
+                                  (sheet_index, row)).fetchall()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class _SheetStream:
+    """流式输出中一个工作表的读取位置和重排缓冲区
+
+    内存中最多暂存 max_buffered_rows 行，之后才开始的行写入溢出存储；
+    等待译文的有效行以连续区间保存，写出位置只会向后移动。
+    """
+
+    def __init__(self, sheet_index, src_ws, dest_ws, headers, target_languages, valid_rows, spill,
+                 max_buffered_rows=DEFAULT_MAX_BUFFERED_ROWS):
+        self.sheet_index = sheet_index
+        self.keep = [i for i, header in enumerate(headers) if header not in target_languages]
+        self.header = [headers[i] for i in self.keep] + list(target_languages)
+        self.width = len(target_languages)
+        # 只有有效行需要等待译文，其余行读到即可写出
+        self.expected = _row_ranges(valid_rows)
+        self._range_index = 0
+        self.buffer = {}  # {行号: [各目标语言译文]}
+        self.max_buffered_rows = max_buffered_rows
+        self.spill = spill
+        self.spilled = 0  # 写入溢出存储、尚未取回的单元格数
+        self.next_row = 1
+        self.src_rows = src_ws.iter_rows(values_only=True)
+        self.dest = dest_ws
+
+    def set(self, row, index, value):
+        values = self.buffer.get(row)
+        if values is None:
+            if len(self.buffer) >= self.max_buffered_rows:
+                self.spill.put(self.sheet_index, row, index, value)
+                self.spilled += 1
+                return
+            values = self.buffer[row] = [None] * self.width
+        values[index] = value
+
+    def _is_expected(self, row):
+        """行号是否为等待译文的有效行；只能按递增的行号调用"""
+        ranges = self.expected
+        while self._range_index < len(ranges) and ranges[self._range_index][1] < row:
+            self._range_index += 1
+        return self._range_index < len(ranges) and ranges[self._range_index][0] <= row
+
+    def _row_values(self, row, take=False):
+        """合并内存和溢出存储中一行的译文；take 为 True 时同时移出"""
+        values = self.buffer.pop(row, None) if take else self.buffer.get(row)
+        values = list(values) if values else [None] * self.width
+        if self.spilled:
+            cells = self.spill.take(self.sheet_index, row) if take else self.spill.peek(self.sheet_index, row)
+            if take:
+                self.spilled -= len(cells)
+            for index, value in cells:
+                values[index] = value
+        return values
+
+    def emit_ready(self, drain=False):
+        """按行号顺序写出已完成的行；drain 为 True 时不再等待，写出所有剩余行"""
+        while True:
+            row = self.next_row
+            expected = self._is_expected(row)
+            if expected and not drain and any(value is None for value in self._row_values(row)):
+                return
+            source = next(self.src_rows, None)
+            if source is None:
+                return
+            self.next_row += 1
+            if row == 1:
+                self.dest.append(self.header)
+                continue
+            kept = [source[i] if i < len(source) else None for i in self.keep]
+            self.dest.append(kept + (self._row_values(row, take=True) if expected else [None] * self.width))
+
+
+class StreamingWorkbookOutput(BackgroundWriter):
+    """按行顺序流式写出到 write-only 工作簿，输出端内存占用与表格大小无关
+
+    输入表以只读模式逐行读取，一行的所有目标语言译文都到齐后立即写出；
+    批次乱序完成时，已完成但前面还有未完成行的行暂存在各工作表的重排缓冲区中，
+    内存中每个工作表最多暂存 max_buffered_rows 行，其余暂存到临时文件。
+    只保留所选工作表的单元格值，不保留格式和其他工作表。
+    sheets 为 [SheetRows, ...]，行号使用 excel_input.row_key 合成的行键。
+    """
+
+    def __init__(self, excel_file, output_file, sheets, target_languages,
+                 max_buffered_rows=DEFAULT_MAX_BUFFERED_ROWS):
+        self.output_file = output_file
+        self.target_cols = [(i, lang) for i, lang in enumerate(target_languages, 1)]
+        self.max_buffered = 0
+        self.max_spilled = 0
+
+        self._src_wb = load_workbook(excel_file, read_only=True)
+        self._wb = Workbook(write_only=True)
+        self._spill = _SpillBuffer()
+        self._sheets = []
+        for sheet_index, sheet in enumerate(sheets):
+            src_ws = self._src_wb[sheet.title] if sheet.title else self._src_wb.active
+            self._sheets.append(_SheetStream(
+                sheet_index, src_ws, self._wb.create_sheet(title=src_ws.title), sheet.headers,
+                target_languages, (row for row, _, _ in sheet.rows), self._spill, max_buffered_rows
+            ))
+        super().__init__()
+
+    def _apply(self, col_idx, rows, value):
+        touched = set()
+        for key in rows:
+            sheet_index, row = split_row_key(key)
+            self._sheets[sheet_index].set(row, col_idx - 1, value)
+            touched.add(sheet_index)
+        self.max_buffered = max(self.max_buffered, sum(len(stream.buffer) for stream in self._sheets))
+        self.max_spilled = max(self.max_spilled, sum(stream.spilled for stream in self._sheets))
+        for sheet_index in touched:
+            self._sheets[sheet_index].emit_ready()
+
+    def save(self):
+        """写出剩余的行（未完成的译文留空）并保存"""
+        self.close()
+        for stream in self._sheets:
+            stream.emit_ready(drain=True)
+        self._src_wb.close()
+        self._spill.close()
+        self._wb.save(self.output_file)
+        logger.debug(f"流式写出完成，重排缓冲区最多在内存中暂存 {self.max_buffered} 行，"
+                     f"溢出到临时文件 {self.max_spilled} 个单元格")
@@ -0,0 +1,187 @@
+import logging
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from translation_memory import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 模糊匹配默认配置
+DEFAULT_FUZZY_THRESHOLD = 0.6        # 字符 n-gram Jaccard 相似度达到该值才作为参考提示
+DEFAULT_FUZZY_REUSE_THRESHOLD = 0.95 # 达到该相似度时可直接复用已有译文
+DEFAULT_FUZZY_MAX_ENTRIES = 50000    # 每个语言对最多索引的历史译文条数（按最近使用排序）
+NGRAM_SIZE = 3
+NUM_PERM = 64        # MinHash 签名长度
+BANDS = 16           # LSH 分段数，每段 NUM_PERM // BANDS 个值，约在相似度0.5附近开始召回
+SHORTLIST_SIZE = 32  # 按相同分段数预选、再比较完整签名的候选数
+MAX_CANDIDATES = 8   # 每次查询最多精确校验的候选数
+ADD_CHUNK_SIZE = 500 # 批量加入时每块计算签名的条数
+
+# 直接复用译文前必须完全一致的内容：数字和占位符（{name}、{{var}}、${var}、%s、%(name)d 等），
+# 只差一个数字的长文本相似度也很高，复用会带上错误的数值
+INVARIANT_PATTERN = re.compile(
+    r"\{\{[^{}]*\}\}|\$?\{[^{}]*\}|%(?:\([^)]*\))?[-+ #0]*\d*(?:\.\d+)?[sdifeEgGxXoc]|\d+(?:[.,]\d+)*"
+)
+
+# 哈希参数：32位以内的 crc32 与系数相乘不会溢出 int64
+_PRIME = (1 << 31) - 1
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    """规范化文本的字符 n-gram 集合，短于 n 的文本整体作为一个 gram"""
+    text = normalize_text(text).lower()
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def jaccard(a, b):
+    """两个集合的 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def same_invariants(a, b):
+    """两段文本中的数字和占位符（按出现顺序）是否完全相同"""
+    return (INVARIANT_PATTERN.findall(normalize_text(a)) ==
+            INVARIANT_PATTERN.findall(normalize_text(b)))
+
+
+class MinHashIndex:
+    """基于字符 n-gram + MinHash/LSH 的相似原文索引（线程安全）
+
+    签名和各分段（BANDS）的哈希按条目存放在二维数组中。查询时一次向量化比较得到每条历史原文
+    与查询相同的分段数，只对命中分段最多的少量候选比较完整签名，再对前几名计算精确相似度；
+    即使词汇高度重复、大量条目落在同一分段，5万条的索引单次查询也在1毫秒左右。
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.int64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.int64)
+        self._bands = bands
+        self._rows_per_band = num_perm // bands
+        # 分段哈希：段内各值乘以随机系数后求和（uint64 溢出回绕）
+        self._band_weights = rng.randint(1, _PRIME, size=self._rows_per_band).astype(np.uint64)
+        self._signatures = np.empty((0, num_perm), dtype=np.int64)
+        self._band_hashes = np.empty((bands, 0), dtype=np.uint64)  # 按分段存放，查询时逐段比较
+        self._entries = []  # [(原文, 译文)]，下标与数组的行对应
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _signatures_for(self, texts):
+        """批量计算规范化文本的 MinHash 签名，返回 (条数, num_perm) 数组
+
+        字符 n-gram 与 char_ngrams 相同（短于 n 的文本补齐后整体作为一个 gram），
+        所有文本的 gram 在拼接后的码点数组上一次性计算哈希。
+        """
+        texts = [text.ljust(NGRAM_SIZE, "\0") for text in texts]
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        counts = np.array([len(text) - NGRAM_SIZE + 1 for text in texts])
+        offsets = np.cumsum([0] + [len(text) for text in texts[:-1]])
+        gram_starts = np.cumsum(counts) - counts
+        positions = np.repeat(offsets - gram_starts, counts) + np.arange(counts.sum())
+        # 码点小于 2**21，三个码点拼成的整数不会溢出 int64
+        grams = np.zeros(len(positions), dtype=np.int64)
+        for i in range(NGRAM_SIZE):
+            grams = (grams << 21) | codes[positions + i]
+        hashes = grams % _PRIME
+        values = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return np.minimum.reduceat(values, gram_starts, axis=1).T
+
+    def _band_hashes_for(self, signatures):
+        """各分段的哈希，返回 (条数, bands) 数组"""
+        rows = signatures.reshape(len(signatures), self._bands, self._rows_per_band).astype(np.uint64)
+        return (rows * self._band_weights).sum(axis=2)
+
+    def add(self, source_text, translation):
+        """加入一条历史译文"""
+        self.add_many([(source_text, translation)])
+
+    def add_many(self, entries):
+        """批量加入 (原文, 译文)，签名按块向量化计算"""
+        items = []
+        for source_text, translation in entries:
+            text = normalize_text(source_text).lower()
+            if text:
+                items.append((source_text, translation, text))
+        for start in range(0, len(items), ADD_CHUNK_SIZE):
+            chunk = items[start:start + ADD_CHUNK_SIZE]
+            signatures = self._signatures_for([text for _, _, text in chunk])
+            band_hashes = self._band_hashes_for(signatures)
+            with self._lock:
+                self._entries.extend((source_text, translation) for source_text, translation, _ in chunk)
+                self._signatures = np.concatenate((self._signatures, signatures))
+                self._band_hashes = np.concatenate((self._band_hashes, band_hashes.T), axis=1)
+
+    def query(self, text, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """查找最相似的历史原文，返回 (相似度, 原文, 译文)，低于阈值返回 None"""
+        grams = char_ngrams(text)
+        if not grams or not self._entries:
+            return None
+        signature = self._signatures_for([normalize_text(text).lower()])[0]
+        band_hashes = self._band_hashes_for(signature[None, :])[0]
+
+        with self._lock:
+            # 先按相同分段数取候选，再按签名一致比例粗排
+            hits = np.zeros(len(self._entries), dtype=np.int32)
+            for band, band_hash in zip(self._band_hashes, band_hashes):
+                hits += band == band_hash
+            candidates = np.flatnonzero(hits)
+            if not len(candidates):
+                return None
+            if len(candidates) > SHORTLIST_SIZE:
+                top = np.argpartition(-hits[candidates], SHORTLIST_SIZE - 1)[:SHORTLIST_SIZE]
+                candidates = candidates[top]
+            agreement = np.count_nonzero(self._signatures[candidates] == signature, axis=1)
+            ranked = candidates[np.argsort(-agreement, kind="stable")[:MAX_CANDIDATES]]
+            entries = [self._entries[entry_id] for entry_id in ranked]
+
+        # 对前几名计算精确的 n-gram 相似度
+        best = None
+        for source_text, translation in entries:
+            score = jaccard(grams, char_ngrams(source_text))
+            if score >= threshold and (best is None or score > best[0]):
+                best = (score, source_text, translation)
+        return best
+
+
+def build_fuzzy_index(entries):
+    """用 (原文, 译文) 序列建立索引"""
+    start_time = time.monotonic()
+    index = MinHashIndex()
+    index.add_many(entries)
+    logger.info(f"模糊匹配索引建立完成，共 {len(index)} 条，用时 {time.monotonic() - start_time:.1f} 秒")
+    return index
+
+
+# 进程内共享的模糊匹配索引，按 (记忆库路径, 源语言, 目标语言, 条数上限) 复用
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_fuzzy_index(memory, source_lang, target_lang, max_entries=DEFAULT_FUZZY_MAX_ENTRIES):
+    """获取（或建立）翻译记忆库中某语言对的模糊匹配索引
+
+    第一次使用时用最近使用的 max_entries 条建立索引，之后同一进程中的任务复用它，
+    只补充上次获取以来新写入记忆库的条目；补充后超过上限的两倍时重新建立。
+    """
+    key = (str(memory.db_path), source_lang, target_lang, max_entries)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        # 先记下时间再读取，读取期间写入的条目下次可能重复加入，但不会遗漏
+        now = time.time()
+        if cached is None or len(cached[0]) > 2 * max_entries:
+            index = build_fuzzy_index(memory.recent_entries(source_lang, target_lang, max_entries))
+        else:
+            index, since = cached
+            index.add_many(memory.entries_since(source_lang, target_lang, since))
+        _indexes[key] = (index, now)
+        return index
@@ -0,0 +1,103 @@
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 对冲请求默认配置
+DEFAULT_HEDGE_PERCENTILE = 95  # 请求耗时超过近期延迟的该分位数时补发
+DEFAULT_HEDGE_BUDGET = 0.05    # 补发请求数最多占主请求数的比例
+MIN_HEDGE_DELAY = 1.0          # 补发前至少等待的秒数，避免对正常请求也补发
+MIN_LATENCY_SAMPLES = 20       # 样本不足时不补发
+LATENCY_WINDOW = 200           # 计算分位数使用的最近请求数
+
+
+class HedgePolicy:
+    """对冲请求策略（线程安全）
+
+    记录最近成功请求的耗时；请求耗时超过其指定分位数仍未完成时补发一次相同请求，
+    先完成者生效。补发次数不超过主请求数的 budget 比例，服务整体变慢时不会成倍放大负载。
+    """
+
+    def __init__(self, percentile=DEFAULT_HEDGE_PERCENTILE, budget=DEFAULT_HEDGE_BUDGET,
+                 min_delay=MIN_HEDGE_DELAY):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """当前的补发等待时间，样本不足时返回 None（不补发）"""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            return max(float(np.percentile(self._latencies, self.percentile)), self.min_delay)
+
+    def record(self, latency, hedge_won=False):
+        """记录一次成功请求的耗时"""
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def start_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def try_hedge(self):
+        """预算允许时占用一次补发名额"""
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+
+def run_hedged(send, policy, executor):
+    """执行 send(abort)，超过对冲延迟仍未完成时补发一次，返回先成功完成的结果
+
+    send(abort) 发送一次请求，abort 为 threading.Event，被设置后应尽快放弃请求；
+    一方成功后另一方会被通知放弃。两次请求都失败时抛出主请求的异常。
+    """
+    policy.start_request()
+    start_time = time.monotonic()
+    delay = policy.delay()
+    if delay is None:
+        result = send(threading.Event())
+        policy.record(time.monotonic() - start_time)
+        return result
+
+    aborts = [threading.Event()]
+    futures = [executor.submit(send, aborts[0])]
+    done, _ = concurrent.futures.wait(futures, timeout=delay)
+    if not done and policy.try_hedge():
+        logger.debug(f"请求超过 {delay:.1f} 秒未完成，补发对冲请求")
+        aborts.append(threading.Event())
+        futures.append(executor.submit(send, aborts[1]))
+
+    pending = set(futures)
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in sorted(done, key=futures.index):
+            if future.exception() is not None:
+                continue
+            winner = futures.index(future)
+            for index, abort in enumerate(aborts):
+                if index != winner:
+                    abort.set()
+            policy.record(time.monotonic() - start_time, hedge_won=winner > 0)
+            return future.result()
+    # 全部失败：无论哪一方先失败，都抛出主请求的异常
+    raise futures[0].exception()
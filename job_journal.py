@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 任务日志默认配置
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_VERSION = 1
+DEFAULT_SYNC_EVERY = 100  # 每记录多少个单元格强制落盘一次
+
+
+def default_journal_path(output_file):
+    """输出文件对应的任务日志路径"""
+    return Path(str(output_file) + JOURNAL_SUFFIX)
+
+
+def file_fingerprint(path):
+    """用文件大小和修改时间标识输入文件，文件变化后旧日志中的行号不再可信"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def read_journal(path):
+    """读取任务日志，返回 (任务头, [(目标语言, 行号列表, 译文), ...])
+
+    进程崩溃时最后一行可能只写了一半，无法解析的行会被跳过。
+    文件不存在或没有任务头时返回 (None, [])。
+    """
+    path = Path(path)
+    if not path.exists():
+        return None, []
+
+    header = None
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"任务日志第{line_no}行不完整，已跳过")
+                continue
+            if entry.get("type") == "header":
+                header = entry
+            elif header is not None:
+                records.append((entry["l"], entry["r"], entry["t"]))
+    return header, records
+
+
+def find_resumable_journal(directory, input_file, **job_params):
+    """在目录中查找同一输入文件、同一任务参数的未完成任务日志，返回最新的日志路径"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return None
+
+    input_path = str(Path(input_file).resolve())
+    candidates = []
+    for path in directory.glob(f"*{JOURNAL_SUFFIX}"):
+        try:
+            header, _ = read_journal(path)
+        except Exception as e:
+            logger.warning(f"读取任务日志失败 {path.name}: {e}")
+            continue
+        if header and header.get("input_file") == input_path and matches_job(header, job_params):
+            candidates.append(path)
+    return max(candidates, key=lambda p: p.stat().st_mtime) if candidates else None
+
+
+def matches_job(header, job_params):
+    """检查任务头中的参数是否与当前任务一致"""
+    return all(header.get(key) == value for key, value in job_params.items())
+
+
+class JobJournal:
+    """只追加的任务日志（JSON Lines），记录已完成的 (行号, 目标语言, 译文)
+
+    第一行为任务头，记录输入文件、输出文件和任务参数；之后每行为一组已写入的单元格。
+    每批结果写入后立即 flush，进程崩溃时最多丢失最后一批；
+    每记录 sync_every 个单元格 fsync 一次，兼顾断电安全和写入开销。
+    追加的开销只与本批大小有关，不随表格大小增长。
+    """
+
+    def __init__(self, path, header, resume=False, sync_every=DEFAULT_SYNC_EVERY):
+        self.path = Path(path)
+        self.sync_every = max(int(sync_every), 1)
+        self._lock = threading.Lock()
+        self._unsynced = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._file = open(self.path, "a", encoding="utf-8")
+            # 上次崩溃可能留下半行，先补换行避免与新记录粘连
+            if self.path.stat().st_size and not self._ends_with_newline():
+                self._file.write("\n")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            header = dict(header, type="header", version=JOURNAL_VERSION, created_at=time.time())
+            self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+            self._sync(force=True)
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def append_many(self, records):
+        """追加一批已完成的记录 [(目标语言, 行号列表, 译文), ...]"""
+        if not records:
+            return
+        lines = "".join(
+            json.dumps({"l": lang, "r": rows, "t": translation}, ensure_ascii=False) + "\n"
+            for lang, rows, translation in records
+        )
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(lines)
+            self._unsynced += sum(len(rows) for _, rows, _ in records)
+            self._sync()
+
+    def _sync(self, force=False):
+        """flush 到操作系统，累计足够单元格后 fsync 到磁盘（调用方需持有锁或独占文件）"""
+        self._file.flush()
+        if force or self._unsynced >= self.sync_every:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """落盘并关闭日志"""
+        with self._lock:
+            if not self._file.closed:
+                self._sync(force=True)
+                self._file.close()
+
+    def discard(self):
+        """任务完成后删除日志"""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import threading
+import time
+
+from retry_policy import TranslationCancelled, CANCEL_CHECK_INTERVAL
+from token_batching import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 限流默认配置：0 表示不限制
+DEFAULT_REQUESTS_PER_MINUTE = 0
+DEFAULT_TOKENS_PER_MINUTE = 0
+DEFAULT_BURST_SECONDS = 2.0  # 令牌桶容量对应的秒数，越小发送越均匀
+MESSAGE_TOKEN_OVERHEAD = 4   # 每条消息的角色等格式开销
+
+
+def estimate_request_tokens(messages, max_tokens):
+    """估算一次请求计入 TPM 的 token 数：输入按本地规则估算，输出按 max_tokens 预留（偏保守）"""
+    prompt_tokens = sum(estimate_tokens(message.get("content")) + MESSAGE_TOKEN_OVERHEAD
+                        for message in messages)
+    return prompt_tokens + (max_tokens or 0)
+
+
+class TokenBucket:
+    """令牌桶，余额可以为负（表示已被预约的额度），由 RateLimiter 在锁内使用"""
+
+    def __init__(self, per_minute, burst_seconds=DEFAULT_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now):
+        """扣除额度，返回额度补足前需要等待的秒数"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return max(-self.level / self.rate, 0.0)
+
+
+class RateLimitStats:
+    """统计限流等待次数和累计等待时间（线程安全）
+
+    限流器由进程内所有任务共用，每个任务持有自己的统计对象，获取额度时传入。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def record(self, delay):
+        """记录一次获取额度的等待时间（秒），不需要等待时不计数"""
+        if delay <= 0:
+            return
+        with self._lock:
+            self.waits += 1
+            self.wait_time += delay
+
+    def snapshot(self):
+        """返回当前统计数据"""
+        with self._lock:
+            return {"waits": self.waits, "wait_time": self.wait_time}
+
+
+class RateLimiter:
+    """按每分钟请求数（RPM）和 token 数（TPM）限流（线程安全，同步和异步调用方共用）
+
+    采用预约方式排队：每次获取立即从两个桶中扣除额度并得到需要等待的时间，
+    后到的调用方排在之前所有预约之后，按到达顺序放行，突发请求被均匀摊开。
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, burst_seconds=DEFAULT_BURST_SECONDS):
+        self._lock = threading.Lock()
+        self.requests_per_minute = None
+        self.tokens_per_minute = None
+        self.configure(requests_per_minute, tokens_per_minute, burst_seconds)
+
+    def configure(self, requests_per_minute=None, tokens_per_minute=None, burst_seconds=DEFAULT_BURST_SECONDS):
+        """修改限额，不变的限额保留当前余额"""
+        requests_per_minute = requests_per_minute or 0
+        tokens_per_minute = tokens_per_minute or 0
+        with self._lock:
+            if self.requests_per_minute != requests_per_minute:
+                self.requests_per_minute = requests_per_minute
+                self._request_bucket = TokenBucket(requests_per_minute, burst_seconds) \
+                    if requests_per_minute > 0 else None
+            if self.tokens_per_minute != tokens_per_minute:
+                self.tokens_per_minute = tokens_per_minute
+                self._token_bucket = TokenBucket(tokens_per_minute, burst_seconds) \
+                    if tokens_per_minute > 0 else None
+
+    @property
+    def enabled(self):
+        return self._request_bucket is not None or self._token_bucket is not None
+
+    def reserve(self, tokens=0):
+        """预约一次请求的额度，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            delay = 0.0
+            if self._request_bucket:
+                delay = self._request_bucket.reserve(1, now)
+            if self._token_bucket and tokens:
+                delay = max(delay, self._token_bucket.reserve(tokens, now))
+            return delay
+
+    def acquire(self, tokens=0, is_cancelled=None, stats=None):
+        """阻塞到额度可用；is_cancelled 返回 True 时放弃等待并抛出 TranslationCancelled
+
+        stats 为可选的 RateLimitStats，本次等待计入其中。
+        """
+        if not self.enabled:
+            return
+        delay = self.reserve(tokens)
+        if stats:
+            stats.record(delay)
+        deadline = time.monotonic() + delay
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if is_cancelled and is_cancelled():
+                raise TranslationCancelled("任务已取消，放弃等待限流额度")
+            time.sleep(min(remaining, CANCEL_CHECK_INTERVAL))
+
+    async def acquire_async(self, tokens=0, stats=None):
+        """异步等待额度可用，任务被取消时随 asyncio.CancelledError 退出；stats 同 acquire"""
+        if not self.enabled:
+            return
+        delay = self.reserve(tokens)
+        if stats:
+            stats.record(delay)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# 进程内共享的限流器，Excel、字幕和文本翻译的所有请求共用同一份限额
+_shared_limiter = RateLimiter()
+
+
+def configure_rate_limit(requests_per_minute=None, tokens_per_minute=None):
+    """设置共享限流器的每分钟请求数和 token 数，0 或 None 表示不限制"""
+    _shared_limiter.configure(requests_per_minute, tokens_per_minute)
+    if _shared_limiter.enabled:
+        logger.debug(f"API限流：每分钟 {requests_per_minute or '不限'} 次请求，"
+                     f"{tokens_per_minute or '不限'} 个Token")
+
+
+def get_rate_limiter():
+    """获取共享限流器"""
+    return _shared_limiter
@@ -0,0 +1,175 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from excel_input import find_column
+from translation_memory import QUERY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 默认索引配置
+DEFAULT_REFERENCE_INDEX_PATH = Path.home() / ".translate_reference_index.db"
+INSERT_CHUNK_SIZE = 5000
+
+
+class ReferenceIndex:
+    """外部参考文件的持久化索引（线程安全）
+
+    每个参考文件按 (路径, 大小, 修改时间, 列名) 建立一次索引并保存在 SQLite 中，
+    之后的任务直接按原文主键查询；文件变化后自动重建。
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_REFERENCE_INDEX_PATH
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reference_files (
+                file_id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                columns_key TEXT NOT NULL,
+                entries INTEGER,
+                built_at REAL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reference_entries (
+                file_id INTEGER NOT NULL,
+                source_text TEXT NOT NULL,
+                reference_text TEXT NOT NULL,
+                PRIMARY KEY (file_id, source_text)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reference_files_path ON reference_files(path, columns_key)"
+        )
+        self._conn.commit()
+
+    def load(self, reference_file, source_names, reference_names, fallback_source_col=None):
+        """返回参考文件的索引编号，文件尚未索引或已变化时先重建索引
+
+        source_names / reference_names: 可作为原文列、参考语言列标题的名称集合
+        fallback_source_col: 参考文件中没有源语言列标题时使用的列号
+        """
+        path = str(Path(reference_file).resolve())
+        stat = os.stat(path)
+        columns_key = "|".join(sorted(source_names)) + "->" + "|".join(sorted(reference_names))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_id, entries FROM reference_files "
+                "WHERE path = ? AND columns_key = ? AND size = ? AND mtime_ns = ?",
+                (path, columns_key, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+            if row:
+                logger.info(f"使用已有参考索引: {os.path.basename(path)}（{row[1]} 条）")
+                return row[0]
+
+            # 同一文件的旧索引已失效
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT file_id FROM reference_files WHERE path = ? AND columns_key = ?",
+                (path, columns_key),
+            )]
+            for file_id in stale:
+                self._conn.execute("DELETE FROM reference_entries WHERE file_id = ?", (file_id,))
+                self._conn.execute("DELETE FROM reference_files WHERE file_id = ?", (file_id,))
+
+            cursor = self._conn.execute(
+                "INSERT INTO reference_files (path, size, mtime_ns, columns_key, entries, built_at) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, columns_key, time.time()),
+            )
+            file_id = cursor.lastrowid
+            try:
+                count = self._build(file_id, path, source_names, reference_names, fallback_source_col)
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._conn.execute("UPDATE reference_files SET entries = ? WHERE file_id = ?", (count, file_id))
+            self._conn.commit()
+            logger.info(f"已建立参考索引: {os.path.basename(path)}（{count} 条）")
+            return file_id
+
+    def _build(self, file_id, path, source_names, reference_names, fallback_source_col):
+        """流式读取参考文件并写入索引（调用方需持有锁），返回条目数"""
+        wb = load_workbook(path, read_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            headers = list(next(rows, ()))
+            ref_col = find_column(headers, reference_names)
+            if ref_col is None:
+                raise ValueError(f"在参考文件中未找到{'/'.join(sorted(reference_names))}列（支持中英文列名）")
+            source_col = find_column(headers, source_names)
+            if source_col is None:
+                if fallback_source_col is None:
+                    raise ValueError(f"在参考文件中未找到源语言列: {'/'.join(sorted(source_names))}")
+                logger.warning(f"参考文件中没有源语言列标题，使用第 {fallback_source_col} 列作为原文")
+                source_col = fallback_source_col
+
+            count = 0
+            chunk = []
+            for values in rows:
+                if len(values) < max(source_col, ref_col):
+                    continue
+                source, ref = values[source_col - 1], values[ref_col - 1]
+                if source and ref:
+                    chunk.append((file_id, str(source).strip(), str(ref).strip()))
+                if len(chunk) >= INSERT_CHUNK_SIZE:
+                    count += self._insert(chunk)
+                    chunk = []
+            if chunk:
+                count += self._insert(chunk)
+            return count
+        finally:
+            wb.close()
+
+    def _insert(self, chunk):
+        # 同一原文出现多次时以最后一行为准
+        self._conn.executemany("INSERT OR REPLACE INTO reference_entries VALUES (?, ?, ?)", chunk)
+        return len(chunk)
+
+    def lookup_many(self, file_id, texts):
+        """批量查询参考译文，返回 {原文: 参考译文}"""
+        texts = list(dict.fromkeys(texts))
+        found = {}
+        with self._lock:
+            for start in range(0, len(texts), QUERY_CHUNK_SIZE):
+                chunk = texts[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    "SELECT source_text, reference_text FROM reference_entries "
+                    f"WHERE file_id = ? AND source_text IN ({placeholders})",
+                    [file_id] + chunk,
+                ).fetchall())
+        return found
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 进程内共享的索引实例（按路径复用）
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_reference_index(db_path=None):
+    """获取（或创建）指定路径的共享参考索引"""
+    path = str(Path(db_path) if db_path else DEFAULT_REFERENCE_INDEX_PATH)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = ReferenceIndex(path)
+            _indexes[path] = index
+        return index
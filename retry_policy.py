@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# 重试默认配置
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0    # 第一次重试的基础等待时间（秒）
+DEFAULT_MAX_DELAY = 30.0    # 单次等待时间上限（秒）
+BISECT_AFTER_FAILURES = 2   # 同一子批次连续失败多少次后对半拆分
+CANCEL_CHECK_INTERVAL = 0.1 # 等待期间检查取消状态的间隔（秒）
+
+# 重试耗尽后写入单元格的标记
+TRANSLATION_ERROR = "[翻译错误]"
+FORMAT_ERROR = "[格式错误]"
+
+
+class TranslationCancelled(Exception):
+    """任务取消后中断在途请求时抛出，不计为失败也不重试"""
+
+
+def get_status_code(error):
+    """从异常中提取 HTTP 状态码，没有则返回 None"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code
+
+
+def get_retry_after(error):
+    """从错误响应的 Retry-After / retry-after-ms 头中读取建议等待秒数"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_auth_error(error):
+    """判断是否为 API Key 无效/未设置错误，这类错误直接向上抛出终止任务"""
+    return isinstance(error, ValueError) and "api key" in str(error).lower()
+
+
+def is_retryable(error):
+    """判断错误是否值得重试：API Key 无效和除 408/409/429 外的 4xx 错误不重试"""
+    if is_auth_error(error):
+        return False
+    status_code = get_status_code(error)
+    if status_code is not None and 400 <= status_code < 500:
+        return status_code in (408, 409, 429)
+    return True
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动重试策略"""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, failures, error=None):
+        """计算第 failures 次失败后的等待时间；服务端给出 Retry-After 时不早于该时间"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(failures - 1, 0)))
+        delay = random.uniform(0, ceiling)
+        retry_after = get_retry_after(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+def _plan_retry(indices, failures):
+    """失败后决定下一步：连续失败达到阈值时对半拆分，否则原样重发"""
+    if failures >= BISECT_AFTER_FAILURES and len(indices) > 1:
+        middle = len(indices) // 2
+        return [(indices[:middle], failures), (indices[middle:], failures)]
+    return [(indices, failures)]
+
+
+class Sleep:
+    """步骤生成器产出的等待步骤，由执行方在等待期间检查取消状态"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+
+def retry_steps(count, attempt, policy, is_cancelled=None):
+    """部分重试的决策过程：对一个批次执行带部分重试的翻译（与 I/O 无关的生成器）
+
+    attempt(indices) 是翻译给定下标条目的步骤生成器，返回 {下标: 译文}（可以只包含部分条目），
+    它产出的步骤原样交给执行方；重试前的退避以 Sleep 步骤产出，执行方送回是否等满。
+    请求失败或有条目缺失时只重发失败的子批次；同一子批次反复失败时对半拆分。
+    返回 {下标: 译文}，重试耗尽或遇到不可重试错误的条目填入错误标记；
+    只有任务被取消时才会有条目缺失。API Key 错误直接向上抛出。
+    """
+    results = {}
+    queue = [(list(range(count)), 0)]
+    while queue:
+        indices, failures = queue.pop(0)
+        if is_cancelled and is_cancelled():
+            break
+        try:
+            translations = yield from attempt(indices)
+            error = None
+        except Exception as e:
+            if is_auth_error(e):
+                raise
+            translations = {}
+            error = e
+        if is_cancelled and is_cancelled():
+            results.update(translations)
+            break
+
+        results.update(translations)
+        failed = [i for i in indices if i not in translations]
+        if not failed:
+            continue
+
+        failures += 1
+        if failures > policy.max_retries or (error is not None and not is_retryable(error)):
+            marker = TRANSLATION_ERROR if error is not None else FORMAT_ERROR
+            logger.error(f"{len(failed)} 条翻译失败，已重试 {failures - 1} 次，不再重试: {error or '结果缺失'}")
+            for i in failed:
+                results[i] = marker
+            continue
+
+        delay = policy.backoff(failures, error) if error is not None else 0
+        logger.info(f"{len(failed)} 条翻译失败，{delay:.1f} 秒后第{failures}次重试"
+                    + (f": {error}" if error is not None else ""))
+        if delay and not (yield Sleep(delay)):
+            break
+        queue.extend(_plan_retry(failed, failures))
+    return results
+
+
+def run_steps(steps, perform, is_cancelled=None):
+    """在当前线程执行步骤生成器，返回生成器的返回值
+
+    Sleep 步骤在当前线程等待（任务取消时提前结束并送回 False），
+    其他步骤交给 perform(step) 执行，结果送回生成器，异常抛回生成器。
+    """
+    reply, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(reply)
+        except StopIteration as stop:
+            return stop.value
+        reply, error = None, None
+        if isinstance(step, Sleep):
+            reply = _sleep_unless_cancelled(step.delay, is_cancelled)
+            continue
+        try:
+            reply = perform(step)
+        except Exception as e:
+            error = e
+
+
+async def run_steps_async(steps, perform, is_cancelled=None):
+    """run_steps 的异步版本，perform 为协程函数"""
+    reply, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(reply)
+        except StopIteration as stop:
+            return stop.value
+        reply, error = None, None
+        if isinstance(step, Sleep):
+            reply = await _sleep_unless_cancelled_async(step.delay, is_cancelled)
+            continue
+        try:
+            reply = await perform(step)
+        except Exception as e:
+            error = e
+
+
+def _sleep_unless_cancelled(delay, is_cancelled=None):
+    """等待 delay 秒，期间任务被取消则提前返回 False"""
+    deadline = time.monotonic() + delay
+    while True:
+        if is_cancelled and is_cancelled():
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, CANCEL_CHECK_INTERVAL))
+
+
+async def _sleep_unless_cancelled_async(delay, is_cancelled=None):
+    """_sleep_unless_cancelled 的异步版本"""
+    deadline = time.monotonic() + delay
+    while True:
+        if is_cancelled and is_cancelled():
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        await asyncio.sleep(min(remaining, CANCEL_CHECK_INTERVAL))
@@ -0,0 +1,126 @@
+import pandas as pd
+
+# 跳过原因代码
+SKIP_URL = "url"
+SKIP_EMAIL = "email"
+SKIP_VERSION = "version"
+SKIP_NUMBER = "number"
+SKIP_CODE = "code"
+SKIP_SYMBOL = "symbol"
+SKIP_ALREADY_TARGET = "already_target"
+
+SKIP_REASON_NAMES = {
+    SKIP_URL: "链接",
+    SKIP_EMAIL: "邮箱",
+    SKIP_VERSION: "版本号",
+    SKIP_NUMBER: "数字",
+    SKIP_CODE: "编码/SKU",
+    SKIP_SYMBOL: "符号",
+    SKIP_ALREADY_TARGET: "已是目标语言",
+}
+
+# 按顺序匹配整个单元格，先匹配到的原因优先
+SKIP_PATTERNS = [
+    (SKIP_URL, r"(?:https?://|ftp://|www\.)\S+"),
+    (SKIP_EMAIL, r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    (SKIP_VERSION, r"[vV]\d+(?:\.\d+)*(?:[-+][\w.]+)?|\d+\.\d+\.\d+(?:\.\d+)?(?:[-+][\w.]+)?"),
+    (SKIP_NUMBER, r"[-+±]?[$€£¥]?\s*\d[\d\s,.]*(?:%|‰)?"),
+    # 全大写字母与数字组成、至少包含一个数字的编码，如 AB-1234、SKU123、X200
+    (SKIP_CODE, r"(?=\S*\d)[A-Z0-9][A-Z0-9_\-./#]{2,}"),
+    (SKIP_SYMBOL, r"[\W_]+"),
+]
+
+# 文字系统，用于判断单元格是否已经是目标语言（同一文字系统的语言无法可靠区分，不做判断）
+HAN = "[\u3400-\u4dbf\u4e00-\u9fff]"
+KANA = "[\u3040-\u30ff]"
+SCRIPT_PATTERNS = {
+    "han": HAN,
+    "hangul": "[\u1100-\u11ff\uac00-\ud7af]",
+    "cyrillic": "[\u0400-\u04ff]",
+    "greek": "[\u0370-\u03ff]",
+    "arabic": "[\u0600-\u06ff]",
+    "thai": "[\u0e00-\u0e7f]",
+}
+LANGUAGE_SCRIPTS = {
+    "Chinese": "han",
+    "Japanese": "japanese",
+    "Korean": "hangul",
+    "Russian": "cyrillic",
+    "Bulgarian": "cyrillic",
+    "Greek": "greek",
+    "Arabic": "arabic",
+    "Thai": "thai",
+}
+# 源语言可能使用的文字：日文可以只由汉字组成，韩文可以混用汉字，这些文本不能当作已是目标语言
+SOURCE_SCRIPT_PATTERNS = {
+    "japanese": f"{KANA}|{HAN}",
+    "hangul": f"{SCRIPT_PATTERNS['hangul']}|{HAN}",
+}
+LETTER_PATTERN = r"[^\W\d_]"
+TARGET_SCRIPT_RATIO = 0.6  # 目标文字占全部字母的比例达到该值视为已是目标语言
+
+
+def classify_series(texts):
+    """向量化判断与语言无关的跳过原因，返回与 texts 对齐的原因 Series（不跳过为 None）"""
+    texts = pd.Series(texts, dtype=object).fillna("").astype(str)
+    reasons = pd.Series([None] * len(texts), index=texts.index, dtype=object)
+    for reason, pattern in SKIP_PATTERNS:
+        matched = reasons.isna() & texts.str.fullmatch(pattern)
+        reasons[matched] = reason
+    return reasons
+
+
+def in_script_series(texts, script):
+    """向量化判断文本是否主要由指定文字系统的字符组成"""
+    letters = texts.str.count(LETTER_PATTERN)
+    if script == "japanese":
+        # 日文混用汉字和假名，必须出现假名才能与中文区分
+        kana = texts.str.count(KANA)
+        script_chars = kana + texts.str.count(HAN)
+        return (kana > 0) & (script_chars >= letters * TARGET_SCRIPT_RATIO) & (letters > 0)
+    script_chars = texts.str.count(SCRIPT_PATTERNS[script])
+    matched = (script_chars >= letters * TARGET_SCRIPT_RATIO) & (letters > 0)
+    if script == "han":
+        matched &= texts.str.count(KANA) == 0
+    return matched
+
+
+def could_be_source_series(texts, script):
+    """向量化判断文本是否可能是源语言文本（源语言文字系统及其可混用的文字占多数）"""
+    letters = texts.str.count(LETTER_PATTERN)
+    pattern = SOURCE_SCRIPT_PATTERNS.get(script, SCRIPT_PATTERNS.get(script))
+    if pattern is None:
+        return pd.Series(False, index=texts.index)
+    matched = (texts.str.count(pattern) >= letters * TARGET_SCRIPT_RATIO) & (letters > 0)
+    if script == "hangul":
+        # 纯汉字文本按中文处理，只有出现韩文字母时才是韩文
+        matched &= texts.str.count(SCRIPT_PATTERNS["hangul"]) > 0
+    return matched
+
+
+class SkipFilter:
+    """翻译前的本地过滤：数字、链接、邮箱、版本号、编码和已是目标语言的单元格直接原样输出"""
+
+    def __init__(self, texts, source_lang):
+        self.texts = pd.Series(texts, dtype=object).fillna("").astype(str)
+        self.source_script = LANGUAGE_SCRIPTS.get(source_lang)
+        self._base_reasons = classify_series(self.texts)
+        self._could_be_source = could_be_source_series(self.texts, self.source_script) if self.source_script else None
+
+    def reasons(self, target_lang):
+        """返回各文本对目标语言的跳过原因列表（不跳过为 None）"""
+        reasons = self._base_reasons.copy()
+        script = LANGUAGE_SCRIPTS.get(target_lang)
+        if script and script != self.source_script:
+            # 只有文字属于目标语言、且不可能是源语言时才视为已是目标语言
+            already_target = reasons.isna() & in_script_series(self.texts, script)
+            if self._could_be_source is not None:
+                already_target &= ~self._could_be_source
+            reasons[already_target] = SKIP_ALREADY_TARGET
+        return reasons.tolist()
+
+
+def format_skip_counts(counts):
+    """把 {原因: 单元格数} 格式化为摘要文本"""
+    return "，".join(f"{SKIP_REASON_NAMES.get(reason, reason)} {count}"
+                    for reason, count in counts.items() if count)
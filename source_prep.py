@@ -0,0 +1,107 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from translation_memory import cache_key_base
+from token_batching import (CJK_PATTERN, ASCII_CHARS_PER_TOKEN, OTHER_CHARS_PER_TOKEN,
+                            ITEM_INPUT_OVERHEAD, ITEM_OUTPUT_OVERHEAD, OUTPUT_EXPANSION)
+
+logger = logging.getLogger(__name__)
+
+ASCII_PATTERN = r"[\x00-\x7f]"
+WHITESPACE_PATTERN = r"\s+"
+
+
+def clean_text_column(values):
+    """把一列单元格值转为去除首尾空白的文本，返回 (有效行掩码, 文本 Series)
+
+    与逐个单元格判断 `value and str(value).strip()` 的结果一致：空值、空串、0 和纯空白均视为无效。
+    """
+    series = pd.Series(values, dtype=object)
+    truthy = series.astype(bool).to_numpy()
+    texts = series.where(truthy, "").astype(str).str.strip()
+    return truthy & (texts != "").to_numpy(), texts
+
+
+def normalize_series(texts):
+    """向量化的 normalize_text：统一Unicode形式并合并多余空白"""
+    texts = texts.fillna("").astype(str)
+    return texts.str.normalize("NFKC").str.replace(WHITESPACE_PATTERN, " ", regex=True).str.strip()
+
+
+def estimate_tokens_series(texts):
+    """向量化的 estimate_tokens，返回每个文本的预计 token 数"""
+    texts = texts.fillna("").astype(str)
+    total = texts.str.len().to_numpy()
+    cjk = texts.str.count(CJK_PATTERN.pattern).to_numpy()
+    ascii_chars = texts.str.count(ASCII_PATTERN).to_numpy()
+    other = total - cjk - ascii_chars
+    return (cjk + np.ceil(ascii_chars / ASCII_CHARS_PER_TOKEN)
+            + np.ceil(other / OTHER_CHARS_PER_TOKEN)).astype(np.int64)
+
+
+class WorkPlan:
+    """去重后的翻译单元及其预计 token
+
+    units: [(行号列表, 原文, 参考文本), ...]，按首次出现的行号排序
+    estimates: {(原文, 参考文本): (输入token, 输出token)}
+    key_bases: 与 units 对应的缓存键基础（translation_memory.cache_key_base），
+               各目标语言用 cache_key_for 生成缓存键，不必重复规范化和哈希原文
+    """
+
+    def __init__(self, units, estimates, key_bases=None):
+        self.units = units
+        self.estimates = estimates
+        self.key_bases = key_bases or []
+
+
+def build_work_plan(valid_rows, reference_data=None, source_lang=None):
+    """在列数组上完成去重、token 估算和缓存键计算，生成与目标语言无关的翻译单元
+
+    valid_rows: [(行号, 原文, 行内参考文本), ...]
+    reference_data: 可选 {原文: 参考文本}，提供时按原文查找参考文本，替代行内参考文本
+    source_lang: 计入缓存键的源语言
+    """
+    if not valid_rows:
+        return WorkPlan([], {})
+
+    frame = pd.DataFrame(valid_rows, columns=["row", "text", "ref"])
+    if reference_data is not None:
+        frame["ref"] = frame["text"].map(reference_data)
+    frame["ref"] = frame["ref"].where(frame["ref"].notna(), None)
+
+    # 规范化后的原文和参考文本相同的行合并为一个单元；行号列表用字典一次遍历收集，
+    # 比 groupby 的列表聚合快得多，单元按首次出现的顺序排列
+    normalized_texts = normalize_series(frame["text"])
+    normalized_refs = normalize_series(frame["ref"])
+    keys = normalized_texts + "\x1f" + normalized_refs
+    groups = {}
+    first_positions = []
+    for position, (key, row) in enumerate(zip(keys.tolist(), frame["row"].tolist())):
+        rows = groups.get(key)
+        if rows is None:
+            groups[key] = [row]
+            first_positions.append(position)
+        else:
+            rows.append(row)
+    units_frame = frame.iloc[first_positions]
+
+    source_tokens = estimate_tokens_series(units_frame["text"])
+    ref_tokens = estimate_tokens_series(units_frame["ref"])
+    input_tokens = source_tokens + ref_tokens + ITEM_INPUT_OVERHEAD
+    output_tokens = np.ceil(source_tokens * OUTPUT_EXPANSION).astype(np.int64) + ITEM_OUTPUT_OVERHEAD
+
+    texts = units_frame["text"].tolist()
+    refs = [ref if isinstance(ref, str) else None for ref in units_frame["ref"].tolist()]
+    units = list(zip(groups.values(), texts, refs))
+    estimates = dict(zip(zip(texts, refs), zip(input_tokens.tolist(), output_tokens.tolist())))
+    # 不是文本的参考值在单元中为 None，缓存键中也按空参考计算
+    key_bases = [cache_key_base(text, source_lang, normalized_ref if ref is not None else "")
+                 for text, normalized_ref, ref in zip(normalized_texts.iloc[first_positions].tolist(),
+                                                      normalized_refs.iloc[first_positions].tolist(), refs)]
+
+    logger.info(f"有效行 {len(frame)} 行，去重后 {len(units)} 个翻译单元，"
+                f"预计输出Token 中位数 {int(np.median(output_tokens))}，"
+                f"P95 {int(np.percentile(output_tokens, 95))}，最大 {int(output_tokens.max())}")
+    return WorkPlan(units, estimates, key_bases)
@@ -3,7 +3,8 @@ from tkinter import ttk, filedialog, messagebox
 import re
 from pathlib import Path
 import chardet
-from openai import OpenAI
+from api_client import use_client
+from rate_limiter import get_rate_limiter, estimate_request_tokens
 import threading
 from constants import SUPPORTED_LANGUAGES
 import datetime
@@ -241,20 +242,20 @@ class SubtitleTranslateFrame(ttk.Frame):
     def _do_translate(self):
         """执行翻译"""
         try:
-            client = OpenAI(api_key=self.api_key, base_url=self.DEEPSEEK_BASE_URL)
-            self.translated_content = []
+            with use_client(self.api_key, self.DEEPSEEK_BASE_URL) as client:
+                self.translated_content = []
             
-            # 获取批量翻译数量
-            batch_size = int(self.batch_size.get())
+                # 获取批量翻译数量
+                batch_size = int(self.batch_size.get())
             
-            # 批量翻译
-            total_items = len(self.subtitle_content)
-            for i in range(0, total_items, batch_size):
-                batch = self.subtitle_content[i:i + batch_size]
-                texts = [item['text'] for item in batch]
+                # 批量翻译
+                total_items = len(self.subtitle_content)
+                for i in range(0, total_items, batch_size):
+                    batch = self.subtitle_content[i:i + batch_size]
+                    texts = [item['text'] for item in batch]
                 
-                # 构建提示词，要求直接翻译，不添加任何额外注释
-                prompt = f"""请将以下{len(texts)}条字幕从{self.source_lang.get()}翻译成{self.target_lang.get()}。
+                    # 构建提示词，要求直接翻译，不添加任何额外注释
+                    prompt = f"""请将以下{len(texts)}条字幕从{self.source_lang.get()}翻译成{self.target_lang.get()}。
 注意事项：
 1. 只翻译文本内容，不要添加任何翻译注释或说明
 2. 保持原文的语气和表达方式
@@ -268,108 +269,113 @@ class SubtitleTranslateFrame(ttk.Frame):
 
 请按照原文顺序翻译，每条翻译占一行。"""
                 
-                max_retries = 3  # 最大重试次数
-                retry_count = 0
-                success = False
+                    max_retries = 3  # 最大重试次数
+                    retry_count = 0
+                    success = False
                 
-                while retry_count < max_retries and not success:
-                    try:
-                        # 如果是重试，且批次大于10，则减半批量大小
-                        if retry_count > 0 and len(batch) > 10:
-                            half_size = len(batch) // 2
-                            # 分两次处理这个批次
-                            for split_start in range(0, len(batch), half_size):
-                                split_end = min(split_start + half_size, len(batch))
-                                split_batch = batch[split_start:split_end]
-                                split_texts = [item['text'] for item in split_batch]
+                    while retry_count < max_retries and not success:
+                        try:
+                            # 如果是重试，且批次大于10，则减半批量大小
+                            if retry_count > 0 and len(batch) > 10:
+                                half_size = len(batch) // 2
+                                # 分两次处理这个批次
+                                for split_start in range(0, len(batch), half_size):
+                                    split_end = min(split_start + half_size, len(batch))
+                                    split_batch = batch[split_start:split_end]
+                                    split_texts = [item['text'] for item in split_batch]
                                 
-                                # 更新提示词
-                                split_prompt = prompt.replace(
-                                    f"以下{len(texts)}条字幕",
-                                    f"以下{len(split_batch)}条字幕"
-                                ).replace(
-                                    chr(10).join(f"{j+1}. {text}" for j, text in enumerate(texts)),
-                                    chr(10).join(f"{j+1}. {text}" for j, text in enumerate(split_texts))
-                                )
+                                    # 更新提示词
+                                    split_prompt = prompt.replace(
+                                        f"以下{len(texts)}条字幕",
+                                        f"以下{len(split_batch)}条字幕"
+                                    ).replace(
+                                        chr(10).join(f"{j+1}. {text}" for j, text in enumerate(texts)),
+                                        chr(10).join(f"{j+1}. {text}" for j, text in enumerate(split_texts))
+                                    )
                                 
-                                response = client.chat.completions.create(
-                                    model="deepseek-chat",
-                                    messages=[
+                                    messages = [
                                         {"role": "system", "content": "你是一个专业的字幕翻译专家。请严格按照原文顺序翻译每一条字幕，每条翻译占一行。"},
                                         {"role": "user", "content": split_prompt}
-                                    ],
-                                    temperature=0.3,
-                                    max_tokens=4000
-                                )
+                                    ]
+                                    get_rate_limiter().acquire(estimate_request_tokens(messages, 4000))
+                                    response = client.chat.completions.create(
+                                        model="deepseek-chat",
+                                        messages=messages,
+                                        temperature=0.3,
+                                        max_tokens=4000
+                                    )
                                 
-                                # 处理翻译结果
-                                translations = response.choices[0].message.content.strip().split('\n')
-                                translations = [t.strip() for t in translations if t.strip()]
+                                    # 处理翻译结果
+                                    translations = response.choices[0].message.content.strip().split('\n')
+                                    translations = [t.strip() for t in translations if t.strip()]
                                 
-                                if len(translations) != len(split_batch):
-                                    raise ValueError(f"翻译结果数量不匹配：期望 {len(split_batch)} 条，实际获得 {len(translations)} 条")
+                                    if len(translations) != len(split_batch):
+                                        raise ValueError(f"翻译结果数量不匹配：期望 {len(split_batch)} 条，实际获得 {len(translations)} 条")
                                 
-                                # 更新翻译结果
-                                for j, translation in enumerate(translations):
-                                    item = split_batch[j].copy()
-                                    # 清理翻译文本
-                                    translation = re.sub(r'^\d+[\.\、\s]*', '', translation)
-                                    translation = re.sub(r'[\[【].*?[\]】]', '', translation)
-                                    item['translation'] = translation.strip()
-                                    self.translated_content.append(item)
+                                    # 更新翻译结果
+                                    for j, translation in enumerate(translations):
+                                        item = split_batch[j].copy()
+                                        # 清理翻译文本
+                                        translation = re.sub(r'^\d+[\.\、\s]*', '', translation)
+                                        translation = re.sub(r'[\[【].*?[\]】]', '', translation)
+                                        item['translation'] = translation.strip()
+                                        self.translated_content.append(item)
                             
-                            success = True
-                            break
+                                success = True
+                                break
                             
-                        else:
-                            response = client.chat.completions.create(
-                                model="deepseek-chat",
-                                messages=[
+                            else:
+                                messages = [
                                     {"role": "system", "content": "你是一个专业的字幕翻译专家。请严格按照原文顺序翻译每一条字幕，每条翻译占一行。"},
                                     {"role": "user", "content": prompt}
-                                ],
-                                temperature=0.3,
-                                max_tokens=4000
-                            )
+                                ]
+                                # 与Excel翻译共用限流额度
+                                get_rate_limiter().acquire(estimate_request_tokens(messages, 4000))
+                                response = client.chat.completions.create(
+                                    model="deepseek-chat",
+                                    messages=messages,
+                                    temperature=0.3,
+                                    max_tokens=4000
+                                )
                             
-                            # 解析翻译结果
-                            translations = response.choices[0].message.content.strip().split('\n')
-                            translations = [t.strip() for t in translations if t.strip()]
+                                # 解析翻译结果
+                                translations = response.choices[0].message.content.strip().split('\n')
+                                translations = [t.strip() for t in translations if t.strip()]
                             
-                            # 确保翻译结果数量与原文匹配
-                            if len(translations) == len(batch):
-                                # 更新翻译结果
-                                for j, translation in enumerate(translations):
-                                    item = batch[j].copy()
-                                    # 清理翻译文本
-                                    translation = re.sub(r'^\d+[\.\、\s]*', '', translation)
-                                    translation = re.sub(r'[\[【].*?[\]】]', '', translation)
-                                    item['translation'] = translation.strip()
-                                    self.translated_content.append(item)
-                                success = True
-                                break
-                            else:
-                                raise ValueError(f"翻译结果数量不匹配：期望 {len(batch)} 条，实际获得 {len(translations)} 条")
+                                # 确保翻译结果数量与原文匹配
+                                if len(translations) == len(batch):
+                                    # 更新翻译结果
+                                    for j, translation in enumerate(translations):
+                                        item = batch[j].copy()
+                                        # 清理翻译文本
+                                        translation = re.sub(r'^\d+[\.\、\s]*', '', translation)
+                                        translation = re.sub(r'[\[【].*?[\]】]', '', translation)
+                                        item['translation'] = translation.strip()
+                                        self.translated_content.append(item)
+                                    success = True
+                                    break
+                                else:
+                                    raise ValueError(f"翻译结果数量不匹配：期望 {len(batch)} 条，实际获得 {len(translations)} 条")
                     
-                    except Exception as e:
-                        retry_count += 1
-                        if retry_count >= max_retries:
-                            raise Exception(f"批次{i//batch_size + 1}翻译失败: {str(e)}")
-                        self.status_label.config(text=f"第{i//batch_size + 1}批翻译出错，正在第{retry_count + 1}次重试...")
+                        except Exception as e:
+                            retry_count += 1
+                            if retry_count >= max_retries:
+                                raise Exception(f"批次{i//batch_size + 1}翻译失败: {str(e)}")
+                            self.status_label.config(text=f"第{i//batch_size + 1}批翻译出错，正在第{retry_count + 1}次重试...")
                 
-                # 更新进度
-                progress = min(100, int(len(self.translated_content) / total_items * 100))
-                self.status_label.config(text=f"翻译进度: {progress}% ({len(self.translated_content)}/{total_items})")
+                    # 更新进度
+                    progress = min(100, int(len(self.translated_content) / total_items * 100))
+                    self.status_label.config(text=f"翻译进度: {progress}% ({len(self.translated_content)}/{total_items})")
             
-            # 确保所有字幕都已翻译
-            if len(self.translated_content) != total_items:
-                raise ValueError(f"翻译不完整：期望 {total_items} 条，实际翻译 {len(self.translated_content)} 条")
+                # 确保所有字幕都已翻译
+                if len(self.translated_content) != total_items:
+                    raise ValueError(f"翻译不完整：期望 {total_items} 条，实际翻译 {len(self.translated_content)} 条")
             
-            # 显示翻译结果
-            self.show_translation()
+                # 显示翻译结果
+                self.show_translation()
             
-            # 保存翻译结果
-            self.save_translation()
+                # 保存翻译结果
+                self.save_translation()
             
         except Exception as e:
             messagebox.showerror("错误", f"翻译失败: {str(e)}")
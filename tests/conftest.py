@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openpyxl import Workbook
+
+# 模块位于仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class BadRequestHandler(BaseHTTPRequestHandler):
+    """所有请求都返回不可重试的 400 错误"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"error": {"message": "bad request", "type": "invalid_request_error"}}'
+        self.send_response(400)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """返回启动本地 HTTP 服务器的函数 start(handler)，服务器地址为 base_url，测试结束后全部关闭"""
+    servers = []
+
+    def start(handler):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        httpd.base_url = f"http://127.0.0.1:{httpd.server_port}"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return httpd
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def bad_request_server(http_server):
+    """所有请求都返回 400 的本地服务器"""
+    return http_server(BadRequestHandler)
+
+
+@pytest.fixture
+def make_workbook(tmp_path):
+    """返回在 tmp_path 下创建输入工作簿的函数
+
+    rows 为整数时生成表头 English/French 和 rows 行英文原文；
+    也可以直接传入各行的值，此时 header 为表头。
+    """
+    def make(rows=1, header=("English", "French"), name="input.xlsx"):
+        path = tmp_path / name
+        wb = Workbook()
+        ws = wb.active
+        ws.append(list(header))
+        if isinstance(rows, int):
+            rows = [[f"sentence number {i}", None] for i in range(rows)]
+        for row in rows:
+            ws.append(list(row))
+        wb.save(path)
+        return path
+
+    return make
@@ -0,0 +1,46 @@
+import socket
+import threading
+import time
+
+import deepl_selenium_translate as translate
+
+ROWS = 20
+
+
+def test_cancel_aborts_requests_waiting_for_first_byte(tmp_path, make_workbook):
+    """服务器接受连接但从不响应时，取消任务会断开在途连接，工作线程立即结束而不是等到读取超时"""
+    source = make_workbook(ROWS)
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    connections = []
+
+    def accept_forever():
+        while True:
+            try:
+                connections.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept_forever, daemon=True).start()
+    config = {"batch_size": 2, "token_batching": False, "max_workers": 2, "cache_enabled": False,
+              "read_timeout": 30}
+    job = translate.TranslationJob(config, api_key="key",
+                                   base_url=f"http://127.0.0.1:{server.getsockname()[1]}")
+    threads_before = set(threading.enumerate())
+    threading.Timer(0.5, job.cancel).start()
+    try:
+        start = time.monotonic()
+        assert not job.run_excel(str(source), str(tmp_path / "output.xlsx"), "English", ["French"])
+        assert time.monotonic() - start < 3
+
+        deadline = time.monotonic() + 3
+        # 线程池的工作线程不是守护线程，阻塞时进程无法退出
+        while any(not thread.daemon for thread in set(threading.enumerate()) - threads_before):
+            assert time.monotonic() < deadline, "工作线程仍阻塞在未响应的请求上"
+            time.sleep(0.05)
+    finally:
+        server.close()
+        for connection in connections:
+            connection.close()
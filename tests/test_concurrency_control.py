@@ -0,0 +1,36 @@
+from concurrency_control import AdaptiveConcurrencyController
+
+
+def run_rounds(controller, samples):
+    for latency, output_tokens in samples:
+        controller.record_success(latency, output_tokens)
+
+
+def test_small_fast_batch_does_not_pin_baseline():
+    """一个输出很少、很快返回的小批次之后，正常的满批次仍然可以提高并发数"""
+    controller = AdaptiveConcurrencyController(5, max_limit=20)
+    run_rounds(controller, [(0.6, 100)] + [(3.0, 1000)] * 200)
+    assert controller.limit == 20
+
+
+def test_mixed_batch_sizes_increase_concurrency():
+    """大小批次交替出现、每 token 延迟稳定时并发数持续提高"""
+    controller = AdaptiveConcurrencyController(5, max_limit=20)
+    run_rounds(controller, [(0.5, 100), (3.0, 1000), (1.2, 300)] * 100)
+    assert controller.limit == 20
+
+
+def test_single_fast_outlier_does_not_pin_baseline():
+    """个别异常快的请求不会作为基线，之后的正常请求仍然可以提高并发数"""
+    controller = AdaptiveConcurrencyController(5, max_limit=20)
+    run_rounds(controller, [(0.3, 1000)] + [(3.0, 1000)] * 200)
+    assert controller.limit == 20
+
+
+def test_slow_rounds_hold_concurrency():
+    """每 token 延迟明显变慢时不再提高并发数"""
+    controller = AdaptiveConcurrencyController(5, max_limit=20)
+    run_rounds(controller, [(3.0, 1000)] * 60)
+    limit = controller.limit
+    run_rounds(controller, [(9.0, 1000)] * 100)
+    assert controller.limit == limit
@@ -0,0 +1,115 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import api_client
+import deepl_selenium_translate as translate
+
+
+class SlowTranslationHandler(BaseHTTPRequestHandler):
+    """等待片刻后按编号返回每条原文的 JSON 译文"""
+
+    delay = 0.5
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = request["messages"][-1]["content"]
+        items = {number: f"fr:{text}" for number, text in
+                 re.findall(r"^(\d+)\. (?:原文: )?(.*)$", prompt, re.MULTILINE)}
+        time.sleep(self.delay)
+        body = json.dumps({
+            "id": "test", "object": "chat.completion", "created": 0, "model": "test",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(items)}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_job_grows_pool_to_its_worker_count(tmp_path, monkeypatch, make_workbook):
+    """直接创建的任务也按 max_workers 扩大共享连接池，不必先调用 configure_pool"""
+    source = make_workbook()
+
+    monkeypatch.setattr(translate.TranslationJob, "translate_task",
+                        lambda job, task, *args, **kwargs: [(text, f"fr:{text}") for _, text, _ in task[2]])
+    monkeypatch.setattr(api_client, "_pool_size", api_client.DEFAULT_POOL_SIZE)
+    job = translate.TranslationJob({"max_workers": 20, "cache_enabled": False}, api_key="key")
+    assert job.run_excel(str(source), str(tmp_path / "output.xlsx"), "English", ["French"])
+    assert api_client._pool_size == 20
+
+
+def test_reconfiguring_pool_closes_previous_clients(monkeypatch):
+    """连接池配置变化时关闭旧客户端，释放其连接"""
+    monkeypatch.setattr(api_client, "_clients", {})
+    monkeypatch.setattr(api_client, "_pool_size", api_client.DEFAULT_POOL_SIZE)
+    client = api_client.get_client("key", "http://127.0.0.1:1")
+    variant = api_client.get_client("key", "http://127.0.0.1:1", max_retries=0)
+
+    api_client.configure_pool(api_client.DEFAULT_POOL_SIZE + 1)
+
+    assert client.is_closed() and variant.is_closed()
+    assert not api_client.get_client("key", "http://127.0.0.1:1").is_closed()
+
+
+def test_client_in_use_is_closed_after_last_request(monkeypatch):
+    """连接池重新配置时正在使用的客户端不被关闭，使用结束后才关闭"""
+    monkeypatch.setattr(api_client, "_clients", {})
+    monkeypatch.setattr(api_client, "_pool_size", api_client.DEFAULT_POOL_SIZE)
+
+    with api_client.use_client("key", "http://127.0.0.1:1", max_retries=0) as client:
+        api_client.configure_pool(api_client.DEFAULT_POOL_SIZE + 1)
+        assert not client.is_closed()
+        assert api_client.get_client("key", "http://127.0.0.1:1") is not client
+    assert client.is_closed()
+
+
+def test_concurrent_jobs_with_different_pool_sizes(tmp_path, monkeypatch, make_workbook, http_server):
+    """并发数更大的任务扩大连接池时，先开始的任务的在途请求照常完成"""
+    source = make_workbook(10)
+    monkeypatch.setattr(api_client, "_clients", {})
+    monkeypatch.setattr(api_client, "_pool_size", api_client.DEFAULT_POOL_SIZE)
+    httpd = http_server(SlowTranslationHandler)
+    results = {}
+
+    def run(name, max_workers):
+        config = {"batch_size": 2, "token_batching": False, "max_workers": max_workers,
+                  "cache_enabled": False, "max_retries": 0, "stream_responses": False,
+                  "read_timeout": 10}
+        job = translate.TranslationJob(config, api_key="key", base_url=httpd.base_url)
+        start = time.monotonic()
+        ok = job.run_excel(str(source), str(tmp_path / f"output_{name}.xlsx"), "English", ["French"])
+        results[name] = (ok, job.failed_count, time.monotonic() - start)
+
+    first = threading.Thread(target=run, args=("small", 2))
+    first.start()
+    time.sleep(0.3)
+    run("large", api_client.DEFAULT_POOL_SIZE + 3)
+    first.join()
+
+    assert api_client._pool_size == api_client.DEFAULT_POOL_SIZE + 3
+    for ok, failed, elapsed in results.values():
+        assert ok and failed == 0
+        assert elapsed < 5
+
+
+def test_connection_metrics_are_per_job(tmp_path, make_workbook, bad_request_server):
+    """每次任务只统计自己发出的请求，不累计之前任务的请求数"""
+    source = make_workbook(6)
+    config = {"batch_size": 2, "token_batching": False, "max_workers": 2, "cache_enabled": False,
+              "max_retries": 0, "stream_responses": False}
+    requests = []
+    for run in range(2):
+        job = translate.TranslationJob(config, api_key="key", base_url=bad_request_server.base_url)
+        job.run_excel(str(source), str(tmp_path / f"output{run}.xlsx"), "English", ["French"])
+        requests.append(job.connection_metrics.snapshot()["requests"])
+
+    assert requests == [3, 3]
@@ -0,0 +1,42 @@
+from fuzzy_match import build_fuzzy_index, get_fuzzy_index, same_invariants, DEFAULT_FUZZY_REUSE_THRESHOLD
+from translation_memory import TranslationMemory
+
+TEMPLATE = ("Free standard shipping is available on all orders over ${amount} placed through the online "
+            "store, excluding oversized items, gift cards and purchases shipped to remote regions.")
+
+
+def test_long_texts_differing_only_in_a_number_are_not_reusable():
+    """只差一个数字的长文本相似度超过复用阈值，但数字不同，不能直接复用译文"""
+    old = TEMPLATE.format(amount=50)
+    new = TEMPLATE.format(amount=60)
+    score, source, _ = build_fuzzy_index([(old, "译文 50")]).query(new)
+    assert source == old and score >= DEFAULT_FUZZY_REUSE_THRESHOLD
+    assert not same_invariants(new, old)
+
+
+def test_placeholders_must_match():
+    assert same_invariants("Hello {name}, you have 3 messages", "Hello  {name}, you have 3 messages!")
+    assert not same_invariants("Hello {name}", "Hello {user}")
+    assert not same_invariants("Saved %s files", "Saved %d files")
+    assert same_invariants("Page 1 of 10", "page 1 of 10")
+
+
+def test_best_match_among_repetitive_entries():
+    """大量条目共用相同分段时，仍能从中找到最相似的一条"""
+    entries = [(f"Classic Cotton T-Shirt - Model {model}, size M", f"译文 {model}") for model in range(100, 1100)]
+    _, source, translation = build_fuzzy_index(entries).query("Classic Cotton T-Shirt - Model 537, size M!")
+    assert source == "Classic Cotton T-Shirt - Model 537, size M"
+    assert translation == "译文 537"
+
+
+def test_fuzzy_index_is_reused_and_updated(tmp_path):
+    """同一语言对的索引在任务间复用，之后写入记忆库的条目会补充进去"""
+    memory = TranslationMemory(tmp_path / "cache.db")
+    memory.put_many([(TEMPLATE.format(amount=50), "English", "French", None, "fr 50")])
+    index = get_fuzzy_index(memory, "English", "French")
+    assert len(index) == 1
+
+    memory.put_many([(TEMPLATE.format(amount=70), "English", "French", None, "fr 70")])
+    assert get_fuzzy_index(memory, "English", "French") is index
+    assert len(index) == 2
+    assert index.query(TEMPLATE.format(amount=70))[2] == "fr 70"
@@ -0,0 +1,29 @@
+import concurrent.futures
+import threading
+
+import pytest
+
+from hedging import HedgePolicy, run_hedged
+
+
+def test_primary_error_is_raised_when_hedge_fails_first():
+    """两次请求都失败时抛出主请求的异常，即使对冲请求先失败"""
+    policy = HedgePolicy(budget=1.0, min_delay=0.05)
+    for _ in range(20):
+        policy.record(0.01)
+    hedge_failed = threading.Event()
+    calls = []
+
+    def send(abort):
+        calls.append(abort)
+        if len(calls) == 1:
+            # 主请求等对冲请求失败之后才失败
+            assert hedge_failed.wait(2)
+            raise ValueError("primary")
+        hedge_failed.set()
+        raise RuntimeError("hedge")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="primary"):
+            run_hedged(send, policy, executor)
+    assert policy.stats()["hedged"] == 1
@@ -0,0 +1,84 @@
+import json
+import signal
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from openpyxl import load_workbook
+
+import deepl_selenium_translate as translate
+
+ROWS = 40
+BATCH_SIZE = 2
+
+
+class UnauthorizedHandler(BaseHTTPRequestHandler):
+    """模拟 DeepSeek 对无效 API Key 的 401 响应"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        body = json.dumps({"error": {
+            "message": "Authentication Fails, Your api key: ****-key is invalid",
+            "type": "authentication_error",
+            "code": "invalid_request_error",
+        }}).encode()
+        self.send_response(401)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(http_server):
+    httpd = http_server(UnauthorizedHandler)
+    httpd.requests = 0
+    return httpd
+
+
+@pytest.fixture
+def workbook(make_workbook):
+    return make_workbook(ROWS)
+
+
+def run_cli(args, capsys):
+    handlers = [signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)]
+    code = translate.main(args)
+    # main 返回后恢复原来的信号处理函数
+    assert [signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)] == handlers
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.strip()]
+    return code, events
+
+
+@pytest.mark.parametrize("engine", [translate.ENGINE_THREAD, translate.ENGINE_ASYNCIO])
+def test_invalid_api_key_aborts_job(engine, server, workbook, tmp_path, capsys):
+    output = tmp_path / "output.xlsx"
+    code, events = run_cli([
+        str(workbook), "-o", str(output), "-t", "French", "--engine", engine,
+        "--api-key", "invalid-key", "--base-url", server.base_url,
+        "--workers", "2", "--async-concurrency", "2", "--batch-size", str(BATCH_SIZE),
+        "--token-budget", "0", "--no-cache",
+    ], capsys)
+
+    assert code == translate.EXIT_AUTH
+    assert events[-1]["event"] == "error"
+    assert "API Key无效" in events[-1]["message"]
+    assert not any(event["event"] in ("done", "cancelled") for event in events)
+    assert not any(event["event"] == "progress" and event["done"] for event in events)
+    # 第一个 401 之后不再发送新的批次
+    assert server.requests < ROWS // BATCH_SIZE
+    # 没有写入任何译文，任务日志保留以便换用正确的 Key 续传
+    ws = load_workbook(output).active
+    assert all(row[1] is None for row in ws.iter_rows(min_row=2, values_only=True))
+    assert translate.default_journal_path(output).exists()
+
+
+def test_missing_api_key(workbook, tmp_path, capsys, monkeypatch):
+    monkeypatch.delenv("DEEPSEEK_API_KEY", raising=False)
+    code, events = run_cli([str(workbook), "-o", str(tmp_path / "output.xlsx"), "-t", "French"], capsys)
+
+    assert code == translate.EXIT_AUTH
+    assert events[-1]["event"] == "error"
@@ -0,0 +1,56 @@
+from openpyxl import load_workbook
+
+import deepl_selenium_translate as translate
+
+ROWS = 10
+BATCH_SIZE = 2
+
+
+def test_failed_batch_keeps_journal(tmp_path, monkeypatch, make_workbook):
+    """有批次出错时保留任务日志并报告实际完成数，续传只补齐缺失的单元格"""
+    source = make_workbook(ROWS)
+    output = tmp_path / "output.xlsx"
+
+    calls = []
+
+    def translate_task(job, task, source_lang, reference_lang=None, max_tokens=None):
+        calls.append(task)
+        if len(calls) == 2:
+            raise RuntimeError("连接被重置")
+        return [(text, f"fr:{text}") for _, text, _ in task[2]]
+
+    monkeypatch.setattr(translate.TranslationJob, "translate_task", translate_task)
+    progress = []
+    config = {"batch_size": BATCH_SIZE, "token_batching": False, "max_workers": 1, "cache_enabled": False}
+    job = translate.TranslationJob(config, api_key="key",
+                                   progress_callback=lambda done, total, finished: progress.append((done, total, finished)))
+
+    assert not job.run_excel(str(source), str(output), "English", ["French"])
+    assert job.summary["missing"] == BATCH_SIZE
+    assert progress[-1] == (ROWS - BATCH_SIZE, ROWS, True)
+    assert translate.default_journal_path(output).exists()
+
+    calls.clear()
+    job = translate.TranslationJob(config, api_key="key")
+    assert job.run_excel(str(source), str(output), "English", ["French"], resume=True)
+    assert [len(task[2]) for task in calls] == [BATCH_SIZE]
+    assert not translate.default_journal_path(output).exists()
+    ws = load_workbook(output).active
+    assert all(row[1] == f"fr:{row[0]}" for row in ws.iter_rows(min_row=2, values_only=True))
+
+
+def test_all_requests_failing_keeps_journal(tmp_path, make_workbook, bad_request_server):
+    """所有请求都失败时单元格只有失败标记，任务不算成功，任务日志保留供续传重试"""
+    source = make_workbook(ROWS)
+    output = tmp_path / "output.xlsx"
+    config = {"batch_size": BATCH_SIZE, "token_batching": False, "max_workers": 2,
+              "cache_enabled": False, "max_retries": 0, "stream_responses": False}
+    job = translate.TranslationJob(config, api_key="key", base_url=bad_request_server.base_url)
+    assert not job.run_excel(str(source), str(output), "English", ["French"])
+
+    assert job.translated_count == 0
+    assert job.summary["failed"] == ROWS
+    assert job.summary["missing"] == ROWS
+    assert translate.default_journal_path(output).exists()
+    ws = load_workbook(output).active
+    assert all(row[1] == "[翻译错误]" for row in ws.iter_rows(min_row=2, values_only=True))
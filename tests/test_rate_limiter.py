@@ -0,0 +1,27 @@
+import deepl_selenium_translate as translate
+from rate_limiter import RateLimitStats, configure_rate_limit, get_rate_limiter
+
+REQUESTS_PER_MINUTE = 600  # 每秒10次，令牌桶容量20次
+
+
+def test_job_reports_only_its_own_rate_limit_waits(tmp_path, make_workbook, bad_request_server):
+    """共享限流器上其他调用方的等待不计入本任务的统计"""
+    source = make_workbook(6)
+    configure_rate_limit(REQUESTS_PER_MINUTE)
+    try:
+        limiter = get_rate_limiter()
+        other = RateLimitStats()
+        # 其他调用方先用完令牌桶的余额，并预约了约1秒的额度
+        for _ in range(30):
+            other.record(limiter.reserve())
+        config = {"batch_size": 2, "token_batching": False, "max_workers": 1, "cache_enabled": False,
+                  "max_retries": 0, "stream_responses": False}
+        job = translate.TranslationJob(config, api_key="key", base_url=bad_request_server.base_url)
+        job.run_excel(str(source), str(tmp_path / "output.xlsx"), "English", ["French"])
+    finally:
+        configure_rate_limit(0, 0)
+
+    assert other.snapshot()["waits"] == 10
+    # 每个批次请求都排在之前的预约之后
+    assert job.summary["rate_limit"]["waits"] == 3
+    assert job.rate_limit_stats.snapshot()["wait_time"] > 0
@@ -0,0 +1,19 @@
+from skip_filter import SkipFilter, SKIP_ALREADY_TARGET, SKIP_NUMBER
+
+
+def test_kanji_only_japanese_is_translated_to_chinese():
+    """日文源文本可以只由汉字组成，翻译成中文时不能当作已是中文而跳过"""
+    texts = ["東京", "会議室", "ひらがなの文", "12,345"]
+    reasons = SkipFilter(texts, "Japanese").reasons("Chinese")
+    assert reasons == [None, None, None, SKIP_NUMBER]
+
+
+def test_korean_hanja_mix_is_translated_to_chinese():
+    """韩文混用汉字的文本翻译成中文时不跳过，纯汉字文本仍视为已是中文"""
+    reasons = SkipFilter(["大韓民國 정부", "中华人民共和国"], "Korean").reasons("Chinese")
+    assert reasons == [None, SKIP_ALREADY_TARGET]
+
+
+def test_text_in_target_script_is_skipped():
+    reasons = SkipFilter(["会议室", "meeting room"], "English").reasons("Chinese")
+    assert reasons == [SKIP_ALREADY_TARGET, None]
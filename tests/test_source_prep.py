@@ -0,0 +1,19 @@
+from source_prep import build_work_plan
+from translation_memory import cache_key_for, make_cache_key
+
+ROWS = [
+    (2, "  Hello　 world ", None),
+    (3, "Hello world", None),
+    (4, "ﾊﾛｰ\tworld", "参考\n 译文"),
+    (5, "Ｆｕｌｌ width １２３", 123),
+    (6, "tab\tand\x1cseparator", "  "),
+]
+
+
+def test_plan_cache_keys_match_make_cache_key():
+    """工作计划预先计算的缓存键与逐条调用 make_cache_key 的结果一致"""
+    plan = build_work_plan(ROWS, source_lang="English")
+    assert len(plan.units) == len(plan.key_bases) == 4
+    for (rows, text, ref), key_base in zip(plan.units, plan.key_bases):
+        for lang in ("French", "日本語"):
+            assert cache_key_for(key_base, lang) == make_cache_key(text, "English", lang, ref)
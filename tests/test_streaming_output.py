@@ -0,0 +1,35 @@
+from openpyxl import load_workbook
+
+from excel_input import load_sheets
+from excel_output import StreamingWorkbookOutput
+
+ROWS = 200
+MAX_BUFFERED_ROWS = 10
+
+
+def test_out_of_order_results_are_spilled_beyond_buffer_limit(tmp_path, make_workbook):
+    """结果逆序到达时内存中的重排缓冲区不超过上限，溢出的行写出时按原顺序取回"""
+    # 每隔几行留一个空行，有效行不是连续区间
+    source = make_workbook([[f"text {i}" if i % 7 else None, f"note {i}"] for i in range(ROWS)],
+                           header=("English", "Note"))
+    output_file = tmp_path / "output.xlsx"
+
+    sheets = load_sheets(str(source), {"English"})
+    output = StreamingWorkbookOutput(str(source), str(output_file), sheets, ["French", "German"],
+                                     max_buffered_rows=MAX_BUFFERED_ROWS)
+    for row, text, _ in reversed(sheets[0].rows):
+        output.write(1, [row], f"fr:{text}")
+    for row, text, _ in reversed(sheets[0].rows):
+        output.write(2, [row], f"de:{text}")
+    output.save()
+
+    assert output.max_buffered <= MAX_BUFFERED_ROWS
+    assert output.max_spilled > 0
+    rows = list(load_workbook(output_file).active.iter_rows(values_only=True))
+    assert rows[0] == ("English", "Note", "French", "German")
+    assert len(rows) == ROWS + 1
+    for i, row in enumerate(rows[1:]):
+        if i % 7:
+            assert row == (f"text {i}", f"note {i}", f"fr:text {i}", f"de:text {i}")
+        else:
+            assert row == (None, f"note {i}", None, None)
@@ -0,0 +1,21 @@
+import deepl_selenium_translate as translate
+
+ROWS = 6
+
+
+def test_job_reports_cache_misses_and_evictions(tmp_path, monkeypatch, make_workbook):
+    """每次任务分别统计缓存命中、未命中和写入时淘汰的条目数"""
+    source = make_workbook(ROWS)
+    monkeypatch.setattr(translate.TranslationJob, "translate_task",
+                        lambda job, task, *args, **kwargs: [(text, f"fr:{text}") for _, text, _ in task[2]])
+    config = {"batch_size": 2, "token_batching": False, "max_workers": 1, "fuzzy_matching": False,
+              "cache_path": str(tmp_path / "cache.db"), "cache_max_entries": 4}
+
+    summaries = []
+    for run in range(2):
+        job = translate.TranslationJob(config, api_key="key")
+        assert job.run_excel(str(source), str(tmp_path / f"output{run}.xlsx"), "English", ["French"])
+        summaries.append(job.summary)
+
+    # 上限4条，超出时淘汰到3条：第一次写入6条淘汰3条；第二次命中剩下的3条，补写的第一批2条淘汰2条
+    assert [(s["cache_hits"], s["cache_misses"], s["cache_evictions"]) for s in summaries] == [(0, 6, 3), (3, 3, 2)]
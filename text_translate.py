@@ -2,7 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import json
 from pathlib import Path
-from openai import OpenAI
+from api_client import use_client
+from rate_limiter import get_rate_limiter, estimate_request_tokens
 import threading
 import os
 from constants import SUPPORTED_LANGUAGES  # 从constants导入
@@ -212,48 +213,51 @@ class TextTranslateFrame(ttk.Frame):
     def _do_translate(self, source_text, terms):
         """执行翻译的具体实现"""
         try:
-            client = OpenAI(api_key=self.api_key, base_url=self.DEEPSEEK_BASE_URL)
+            with use_client(self.api_key, self.DEEPSEEK_BASE_URL) as client:
             
-            # 将文本分段，每段最多1000个字符
-            segments = self._split_text(source_text, 1000)
-            translated_segments = []
+                # 将文本分段，每段最多1000个字符
+                segments = self._split_text(source_text, 1000)
+                translated_segments = []
             
-            for i, segment in enumerate(segments):
-                # 构建提示词
-                prompt = f"请将以下{self.source_lang.get()}文本翻译成{self.target_lang.get()}。\n\n"
+                for i, segment in enumerate(segments):
+                    # 构建提示词
+                    prompt = f"请将以下{self.source_lang.get()}文本翻译成{self.target_lang.get()}。\n\n"
                 
-                # 添加术语表提示
-                if terms:
-                    prompt += "请注意以下专业术语的翻译：\n"
-                    for source, target in terms:
-                        prompt += f"- {source} → {target}\n"
-                    prompt += "\n原文：\n"
+                    # 添加术语表提示
+                    if terms:
+                        prompt += "请注意以下专业术语的翻译：\n"
+                        for source, target in terms:
+                            prompt += f"- {source} → {target}\n"
+                        prompt += "\n原文：\n"
                 
-                prompt += segment
+                    prompt += segment
                 
-                response = client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=[
+                    messages = [
                         {"role": "system", "content": "你是一个专业的翻译专家，请准确翻译用户的文本。"},
                         {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=2000
-                )
+                    ]
+                    # 与Excel翻译共用限流额度
+                    get_rate_limiter().acquire(estimate_request_tokens(messages, 2000))
+                    response = client.chat.completions.create(
+                        model="deepseek-chat",
+                        messages=messages,
+                        temperature=0.3,
+                        max_tokens=2000
+                    )
                 
-                # 获取翻译结果
-                translation = response.choices[0].message.content.strip()
-                translated_segments.append(translation)
+                    # 获取翻译结果
+                    translation = response.choices[0].message.content.strip()
+                    translated_segments.append(translation)
                 
-                # 更新进度
-                self.after(0, self.status_label.configure, 
-                          {"text": f"已完成 {i+1}/{len(segments)} 段"})
+                    # 更新进度
+                    self.after(0, self.status_label.configure, 
+                              {"text": f"已完成 {i+1}/{len(segments)} 段"})
             
-            # 合并所有翻译结果
-            final_translation = "\n".join(translated_segments)
+                # 合并所有翻译结果
+                final_translation = "\n".join(translated_segments)
             
-            # 在主线程中更新UI
-            self.after(0, self._update_translation, final_translation)
+                # 在主线程中更新UI
+                self.after(0, self._update_translation, final_translation)
             
         except Exception as e:
             self.after(0, self._show_error, str(e))
@@ -0,0 +1,77 @@
+import math
+import re
+
+# 按 token 预算打包批次的默认配置
+DEFAULT_OUTPUT_TOKEN_BUDGET = 1500  # 单批预计输出 token 上限（低于 max_tokens=2000，留出余量）
+DEFAULT_INPUT_TOKEN_BUDGET = 4000   # 单批预计输入 token 上限
+DEFAULT_MAX_BATCH_ITEMS = 50        # 单批最多条目数，避免编号过长导致错位
+MODEL_MAX_OUTPUT_TOKENS = 8192      # deepseek-chat 单次请求允许的最大输出 token
+
+# 本地估算参数：中日韩字符约1个token/字，ASCII约4字符/token，其他字符约2字符/token
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+ASCII_CHARS_PER_TOKEN = 4
+OTHER_CHARS_PER_TOKEN = 2
+ITEM_INPUT_OVERHEAD = 8    # 每条的编号、"原文:"等提示词开销
+ITEM_OUTPUT_OVERHEAD = 4   # 每条结果的编号开销
+OUTPUT_EXPANSION = 2.0     # 译文相对原文的 token 膨胀系数（偏保守）
+MAX_TOKENS_SAFETY = 1.5    # 为超长条目单独设置 max_tokens 时的安全系数
+
+
+def estimate_tokens(text):
+    """用本地启发式规则估算文本的 token 数"""
+    if not text:
+        return 0
+    text = str(text)
+    cjk = len(CJK_PATTERN.findall(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other = len(text) - cjk - ascii_chars
+    return cjk + math.ceil(ascii_chars / ASCII_CHARS_PER_TOKEN) + math.ceil(other / OTHER_CHARS_PER_TOKEN)
+
+
+def estimate_unit_tokens(text, ref_text=None):
+    """估算一个翻译单元的 (输入token, 输出token)"""
+    source_tokens = estimate_tokens(text)
+    input_tokens = source_tokens + estimate_tokens(ref_text) + ITEM_INPUT_OVERHEAD
+    output_tokens = math.ceil(source_tokens * OUTPUT_EXPANSION) + ITEM_OUTPUT_OVERHEAD
+    return input_tokens, output_tokens
+
+
+def pack_batches(units, estimate, output_budget=DEFAULT_OUTPUT_TOKEN_BUDGET,
+                 input_budget=DEFAULT_INPUT_TOKEN_BUDGET, max_items=DEFAULT_MAX_BATCH_ITEMS):
+    """按 token 预算把翻译单元打包成批次
+
+    estimate(unit) 返回 (输入token, 输出token)。
+    超出单批预算的单元单独成批，其余单元按顺序装入批次直到任一预算或条数上限。
+    """
+    batches = []
+    current = []
+    used_input = used_output = 0
+    for unit in units:
+        input_tokens, output_tokens = estimate(unit)
+        if output_tokens > output_budget or input_tokens > input_budget:
+            # 超长条目单独请求，避免拖累同批其他条目被截断
+            if current:
+                batches.append(current)
+                current, used_input, used_output = [], 0, 0
+            batches.append([unit])
+            continue
+
+        if current and (used_output + output_tokens > output_budget
+                        or used_input + input_tokens > input_budget
+                        or len(current) >= max_items):
+            batches.append(current)
+            current, used_input, used_output = [], 0, 0
+
+        current.append(unit)
+        used_input += input_tokens
+        used_output += output_tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def max_tokens_for_batch(output_tokens, default_max_tokens):
+    """根据预计输出 token 计算请求的 max_tokens，不低于默认值、不超过模型上限"""
+    needed = math.ceil(output_tokens * MAX_TOKENS_SAFETY)
+    return min(max(default_max_tokens, needed), MODEL_MAX_OUTPUT_TOKENS)
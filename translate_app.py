@@ -3,7 +3,6 @@ from tkinter import ttk, filedialog, messagebox
 import os
 import json
 from pathlib import Path
-import pandas as pd
 import threading
 import logging
 import queue
@@ -16,6 +15,11 @@ from constants import SUPPORTED_LANGUAGES  # 从constants导入
 from text_translate import TextTranslateFrame  # 导入TextTranslateFrame
 from subtitle_translate import SubtitleTranslateFrame  # 添加这行导入
 from subtitle_result import SubtitleResultFrame  # 添加导入
+from job_journal import find_resumable_journal, read_journal
+from excel_input import inspect_workbook, read_headers, list_sheet_names
+from skip_filter import format_skip_counts
+from rate_limiter import configure_rate_limit
+from usage_tracker import format_usage
 
 class LightTheme:
     """明亮主题样式"""
@@ -60,6 +64,9 @@ class TranslateApplication:
         
         # 加载配置
         self.config = self.load_config()
+        # 文本和字幕翻译也使用共享限流器，启动时即应用配置的限额
+        engine_config = deepl_selenium_translate.resolve_config(self.config)
+        configure_rate_limit(engine_config["requests_per_minute"], engine_config["tokens_per_minute"])
         
         # 设置当前主题
         self.current_theme = self.config.get("theme", "light")
@@ -77,6 +84,8 @@ class TranslateApplication:
         self.progress_percent = tk.StringVar(value="0%")
         self.remaining_time = tk.StringVar(value="预计剩余时间: --:--")
         self.progress_detail = tk.StringVar(value="等待开始翻译...")
+        self.sheet_progress_detail = tk.StringVar()
+        self.all_sheets_var = tk.BooleanVar(value=self.config.get("all_sheets", False))
         self.theme_var = tk.StringVar(value=self.current_theme)
         
         # 参考相关变量
@@ -304,6 +313,8 @@ class TranslateApplication:
         ttk.Button(file_frame, text="选择文件", 
                   style="Modern.TButton",
                   command=self.select_file).grid(row=0, column=2, padx=5)
+        ttk.Checkbutton(file_frame, text="翻译所有工作表",
+                       variable=self.all_sheets_var).grid(row=1, column=1, sticky="w", padx=5, pady=(5, 0))
                   
         # 翻译参考设置区域
         ref_frame = ttk.LabelFrame(home_page, text="翻译参考设置", 
@@ -438,6 +449,12 @@ class TranslateApplication:
                                style="Modern.TLabel")
         detail_label.pack(fill="x", pady=(5, 0))
         
+        # 多工作表任务的分表进度
+        sheet_label = ttk.Label(self.progress_frame,
+                              textvariable=self.sheet_progress_detail,
+                              style="Modern.TLabel")
+        sheet_label.pack(fill="x", pady=(2, 0))
+        
         # 操作按钮
         btn_frame = ttk.Frame(home_page, style="Modern.TFrame")
         btn_frame.pack(fill="x", pady=10)
@@ -546,12 +563,15 @@ class TranslateApplication:
                 
             # 检查是否可以读取文件
             try:
-                df = pd.read_excel(self.file_path.get())
+                # 只读模式读取标题行和行数，不加载整个工作簿
+                sheet_names = list_sheet_names(self.file_path.get()) if self.all_sheets_var.get() else None
+                sheet_info = inspect_workbook(self.file_path.get(), sheet_names)
+                headers, data_rows = sheet_info
                 # 检查是否已经存在目标语言列
                 existing_langs = []
                 selected_lang_codes = [SUPPORTED_LANGUAGES[lang] for lang in target_langs]
                 
-                for col in df.columns:
+                for col in headers:
                     if col in selected_lang_codes:
                         # 找到对应的中文名称
                         for zh_name, en_name in SUPPORTED_LANGUAGES.items():
@@ -582,6 +602,34 @@ class TranslateApplication:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_file = save_dir / f"{input_file.stem}_translated_{timestamp}{input_file.suffix}"
             
+            # 解析参考源设置，它和语言、工作表一起决定可续传的任务日志
+            try:
+                reference_params = self.resolve_reference_params(headers)
+            except ValueError as e:
+                messagebox.showerror("参考源设置错误", str(e))
+                return
+            except Exception as e:
+                messagebox.showerror("错误", f"读取参考文件失败: {str(e)}")
+                return
+            
+            # 检查是否有同一文件、同一任务参数的未完成任务，可从中断处继续；
+            # 参数与 run_excel 写入任务日志时使用的 get_job_params 一致
+            resume = False
+            journal_path = find_resumable_journal(
+                save_dir, input_file,
+                **deepl_selenium_translate.get_job_params(
+                    SUPPORTED_LANGUAGES[source_lang],
+                    [SUPPORTED_LANGUAGES[lang] for lang in target_langs],
+                    sheet_names=sheet_names,
+                    **reference_params
+                )
+            )
+            if journal_path and messagebox.askyesno("继续翻译",
+                f"检测到该文件未完成的翻译任务：\n{journal_path.name}\n是否从上次中断处继续？"):
+                header, _ = read_journal(journal_path)
+                output_file = Path(header["output_file"])
+                resume = True
+            
             # 清空日志显示
             if hasattr(self, 'home_log_text'):
                 self.home_log_text.delete("1.0", "end")
@@ -592,9 +640,13 @@ class TranslateApplication:
             self.progress_percent.set("0%")
             self.remaining_time.set("预计剩余时间: --:--")
             self.progress_detail.set("准备开始翻译...")
+            self.sheet_progress_detail.set("")
             
             # 记录开始信息
-            self.message_queue.put(('log', f"Excel文件共有 {len(df)} 行"))
+            if sheet_names:
+                self.message_queue.put(('log', f"翻译 {len(sheet_names)} 个工作表，共有 {data_rows} 行"))
+            else:
+                self.message_queue.put(('log', f"Excel文件共有 {data_rows} 行"))
             self.message_queue.put(('log', f"添加目标语言列: {', '.join(target_langs)}"))
             
             # 重置状态
@@ -613,7 +665,11 @@ class TranslateApplication:
                 args=(self.file_path.get(), 
                       str(output_file),
                       self.source_lang.get(),
-                      target_langs),
+                      target_langs,
+                      resume,
+                      sheet_info,
+                      sheet_names,
+                      reference_params),
                 daemon=True
             )
             self.translation_thread.start()
@@ -660,7 +716,64 @@ class TranslateApplication:
                 if self.progress_var.get() >= 100:
                     self.show_progress_frame(False)
                 
-    def run_translation(self, input_file, output_file, source_lang, target_langs):
+    def resolve_reference_params(self, headers):
+        """根据参考源设置生成 run_excel 的参考源参数，设置无效时抛出 ValueError"""
+        if self.ref_mode.get() == "internal":
+            # 检查内置参考源语言是否选择
+            if not self.internal_ref_lang.get():
+                raise ValueError("请选择内置参考源的语言")
+                
+            ref_lang_display = self.internal_ref_lang.get()
+            ref_lang_code = SUPPORTED_LANGUAGES[ref_lang_display]
+            
+            # 检查文件中的列名，支持中文名和英文代码
+            ref_col_name = None
+            for col in headers:
+                # 检查是否是支持的语言（中文名或英文代码）
+                if col == ref_lang_code:  # 英文代码匹配
+                    ref_col_name = col
+                    break
+                # 检查是否是中文名匹配
+                for zh_name, en_code in SUPPORTED_LANGUAGES.items():
+                    if col == zh_name:
+                        ref_col_name = col
+                        ref_lang_code = en_code  # 更新为实际的语言代码
+                        break
+                if ref_col_name:
+                    break
+            
+            if not ref_col_name:
+                raise ValueError(f"在Excel文件中未找到{ref_lang_display}列作为参考源")
+                
+            return {
+                "reference_lang": ref_lang_code,
+                "reference_column": ref_col_name
+            }
+        
+        if self.ref_mode.get() == "external":
+            # 检查外部参考源设置
+            if not self.ref_file_path.get() or not self.ref_lang.get():
+                raise ValueError("请选择外部参考文件和参考语言")
+            if not os.path.exists(self.ref_file_path.get()):
+                raise ValueError("选择的外部参考文件不存在")
+            
+            # 读取参考文件的第一行（标题行），只检查参考语言列
+            ref_headers = read_headers(self.ref_file_path.get())
+            ref_lang_code = SUPPORTED_LANGUAGES[self.ref_lang.get()]
+            if ref_lang_code not in ref_headers and self.ref_lang.get() not in ref_headers:
+                raise ValueError(f"在参考文件中未找到{self.ref_lang.get()}列")
+            
+            return {
+                "reference_file": self.ref_file_path.get(),
+                "reference_lang": ref_lang_code
+            }
+        
+        # 不使用参考源
+        return {}
+
+    def run_translation(self, input_file, output_file, source_lang, target_langs, resume=False,
+                        sheet_info=None, sheet_names=None, reference_params=None):
+        reference_params = reference_params or {}
         try:
             # 检查API Key
             api_key = self.api_key.get().strip()
@@ -670,7 +783,7 @@ class TranslateApplication:
             
             # 记录开始信息
             start_time = datetime.now()
-            total_rows = len(pd.read_excel(input_file))
+            headers, total_rows = sheet_info or inspect_workbook(input_file, sheet_names)
             
             # 使用logger记录开始信息
             self.logger.info(f"\n{'='*50}")
@@ -683,75 +796,15 @@ class TranslateApplication:
             
             # 设置进度回调
             deepl_selenium_translate.progress_callback = self.update_progress
+            deepl_selenium_translate.sheet_progress_callback = self.update_sheet_progress
             
-            # 准备参考源参数
-            reference_params = {}
-            if self.ref_mode.get() == "internal":
-                # 检查内置参考源语言是否选择
-                if not self.internal_ref_lang.get():
-                    self.handle_error("参考源设置错误", "请选择内置参考源的语言")
-                    return
-                    
-                # 读取Excel文件获取参考列
-                df = pd.read_excel(input_file)
-                ref_lang_display = self.internal_ref_lang.get()
-                ref_lang_code = SUPPORTED_LANGUAGES[ref_lang_display]
-                
-                # 检查文件中的列名，支持中文名和英文代码
-                ref_col_name = None
-                for col in df.columns:
-                    # 检查是否是支持的语言（中文名或英文代码）
-                    if col == ref_lang_code:  # 英文代码匹配
-                        ref_col_name = col
-                        break
-                    # 检查是否是中文名匹配
-                    for zh_name, en_code in SUPPORTED_LANGUAGES.items():
-                        if col == zh_name:
-                            ref_col_name = col
-                            ref_lang_code = en_code  # 更新为实际的语言代码
-                            break
-                    if ref_col_name:
-                        break
-                
-                if not ref_col_name:
-                    self.handle_error("参考源设置错误", f"在Excel文件中未找到{ref_lang_display}列作为参考源")
-                    return
-                    
-                reference_params = {
-                    "reference_lang": ref_lang_code,
-                    "reference_column": ref_col_name
-                }
-                self.message_queue.put(('log', f"使用内置参考源，参考语言: {ref_lang_display} (列名: {ref_col_name})"))
-            
-            elif self.ref_mode.get() == "external":
-                # 检查外部参考源设置
-                if not self.ref_file_path.get() or not self.ref_lang.get():
-                    self.handle_error("参考源设置错误", "请选择外部参考文件和参考语言")
-                    return
-                if not os.path.exists(self.ref_file_path.get()):
-                    self.handle_error("参考源设置错误", "选择的外部参考文件不存在")
-                    return
-                
-                # 读取参考文件的第一行（标题行）
-                try:
-                    ref_df = pd.read_excel(self.ref_file_path.get(), nrows=1)  # 只读取第一行
-                    ref_lang_code = SUPPORTED_LANGUAGES[self.ref_lang.get()]
-                    
-                    # 只检查参考语言列
-                    if ref_lang_code not in ref_df.columns and self.ref_lang.get() not in ref_df.columns:
-                        self.handle_error("参考源设置错误", f"在参考文件中未找到{self.ref_lang.get()}列")
-                        return
-                    
-                    reference_params = {
-                        "reference_file": self.ref_file_path.get(),
-                        "reference_lang": ref_lang_code
-                    }
-                    self.message_queue.put(('log', f"使用外部参考文件: {os.path.basename(self.ref_file_path.get())}"))
-                    self.message_queue.put(('log', f"参考语言: {self.ref_lang.get()}"))
-                    
-                except Exception as e:
-                    self.handle_error("读取参考文件失败", str(e))
-                    return
+            # 记录参考源设置（参考源参数在开始翻译前已经解析并用于查找可续传的任务）
+            if reference_params.get("reference_file"):
+                self.message_queue.put(('log', f"使用外部参考文件: {os.path.basename(reference_params['reference_file'])}"))
+                self.message_queue.put(('log', f"参考语言: {self.ref_lang.get()}"))
+            elif reference_params:
+                self.message_queue.put(('log', f"使用内置参考源，参考语言: {self.internal_ref_lang.get()} "
+                                               f"(列名: {reference_params['reference_column']})"))
             else:
                 # 不使用参考源
                 self.message_queue.put(('log', "不使用参考源进行翻译"))
@@ -762,13 +815,19 @@ class TranslateApplication:
             deepl_selenium_translate.set_translation_cancelled(False)  # 重置取消状态
             
             # 设置翻译参数配置
-            translate_config = {
-                'max_workers': int(self.max_workers_var.get()),
-                'batch_size': int(self.batch_size_var.get()),
-                'max_retries': int(self.max_retries_var.get()),
-                'save_interval': int(self.save_interval_var.get()),
-                'progress_interval': int(self.progress_interval_var.get())
-            }
+            # 保存的配置加上界面中的参数；未设置的参数由 resolve_config 补全为引擎默认值
+            translate_config = dict(
+                self.config,
+                max_workers=int(self.max_workers_var.get()),
+                batch_size=int(self.batch_size_var.get()),
+                max_retries=int(self.max_retries_var.get()),
+                save_interval=int(self.save_interval_var.get()),
+                progress_interval=int(self.progress_interval_var.get()),
+                cache_enabled=self.cache_enabled_var.get(),
+                adaptive_concurrency=self.adaptive_concurrency_var.get(),
+                token_batching=self.token_batching_var.get(),
+                multi_target_requests=self.multi_target_var.get(),
+            )
             
             # 设置全局配置
             deepl_selenium_translate.set_config(translate_config)
@@ -779,6 +838,8 @@ class TranslateApplication:
                 source_lang=SUPPORTED_LANGUAGES[source_lang],
                 target_languages=[SUPPORTED_LANGUAGES[lang] for lang in target_langs],
                 api_key_param=api_key,
+                resume=resume,
+                sheet_names=sheet_names,
                 **reference_params
             )
             
@@ -806,9 +867,18 @@ class TranslateApplication:
                         f"翻译行数：{total_rows}\n"
                         f"用时：{duration_str}\n"
                         f"保存位置：{os.path.basename(output_file)}\n"
-                        f"{'-' * 50}\n"
                     )
+                    summary = deepl_selenium_translate.last_job_summary
+                    if len(summary.get("sheets", [])) > 1:
+                        history_msg += f"工作表：{', '.join(summary['sheets'])}\n"
+                    if summary.get("skipped"):
+                        history_msg += f"无需翻译：{format_skip_counts(summary['skipped'])}\n"
+                    if summary.get("usage", {}).get("requests"):
+                        history_msg += f"Token用量：{format_usage(summary['usage'])}\n"
+                    history_msg += f"{'-' * 50}\n"
                     self.message_queue.put(('history', history_msg))
+                elif "api key" in deepl_selenium_translate.last_job_summary.get("error", "").lower():
+                    self.handle_error("API认证失败", "API Key 无效或未授权，请检查API Key是否正确")
                 else:
                     error_msg = "翻译过程返回失败状态，请检查浏览器是否正常运行"
                     self.message_queue.put(('log', error_msg))
@@ -970,7 +1040,9 @@ class TranslateApplication:
             if not (1 <= progress_interval <= 100):
                 raise ValueError("进度显示间隔必须在1-100之间")
             
-            config = {
+            # 保留配置文件中未在界面展示的高级参数
+            config = dict(self.config)
+            config.update({
                 "save_path": self.save_path.get(),
                 "source_lang": self.source_lang.get(),
                 "target_langs": selected_langs,
@@ -980,8 +1052,14 @@ class TranslateApplication:
                 "batch_size": batch_size,
                 "max_retries": max_retries,
                 "save_interval": save_interval,
-                "progress_interval": progress_interval
-            }
+                "progress_interval": progress_interval,
+                "cache_enabled": self.cache_enabled_var.get(),
+                "adaptive_concurrency": self.adaptive_concurrency_var.get(),
+                "token_batching": self.token_batching_var.get(),
+                "multi_target_requests": self.multi_target_var.get(),
+                "all_sheets": self.all_sheets_var.get()
+            })
+            self.config = config
             
             config_path = Path.home() / ".translate_config.json"
             with open(config_path, "w", encoding="utf-8") as f:
@@ -1037,6 +1115,20 @@ class TranslateApplication:
         except Exception as e:
             logger.error(f"更新进度显示时出错: {e}")
 
+    def update_sheet_progress(self, sheets):
+        """更新多工作表任务的分表进度：显示已完成的工作表数和正在翻译的工作表"""
+        try:
+            done_sheets = sum(1 for _, done, total in sheets if done >= total)
+            active = [f"{title} {done}/{total}" for title, done, total in sheets if 0 < done < total]
+            text = f"工作表: 已完成 {done_sheets}/{len(sheets)}"
+            if active:
+                text += f"，进行中: {', '.join(active[:3])}"
+                if len(active) > 3:
+                    text += f" 等{len(active)}个"
+            self.sheet_progress_detail.set(text)
+        except Exception as e:
+            logging.error(f"更新工作表进度显示时出错: {e}")
+
     def process_progress(self):
         """处理进度更新队列"""
         try:
@@ -1319,50 +1411,89 @@ class TranslateApplication:
                                               padding=15)
         translate_params_frame.pack(fill="x", pady=10)
 
+        # 输入框的初始值：保存的配置，未设置时为翻译引擎的默认值
+        engine_config = deepl_selenium_translate.resolve_config(self.config)
+
         # 并发线程数
         ttk.Label(translate_params_frame, text="并发线程数:", 
                  style="Modern.TLabel").grid(row=0, column=0, sticky="w", padx=5, pady=5)
-        self.max_workers_var = tk.StringVar(value=str(self.config.get("max_workers", 5)))
+        self.max_workers_var = tk.StringVar(value=str(engine_config["max_workers"]))
         ttk.Entry(translate_params_frame, textvariable=self.max_workers_var, 
                  width=10).grid(row=0, column=1, sticky="w", padx=5)
-        ttk.Label(translate_params_frame, text="（建议：1-10，默认：5）", 
+        ttk.Label(translate_params_frame, text=f"（建议：1-10，默认：{deepl_selenium_translate.DEFAULT_MAX_WORKERS}）", 
                  style="Modern.TLabel").grid(row=0, column=2, sticky="w", padx=5)
 
         # 批处理大小
         ttk.Label(translate_params_frame, text="批处理大小:", 
                  style="Modern.TLabel").grid(row=1, column=0, sticky="w", padx=5, pady=5)
-        self.batch_size_var = tk.StringVar(value=str(self.config.get("batch_size", 10)))
+        self.batch_size_var = tk.StringVar(value=str(engine_config["batch_size"]))
         ttk.Entry(translate_params_frame, textvariable=self.batch_size_var, 
                  width=10).grid(row=1, column=1, sticky="w", padx=5)
-        ttk.Label(translate_params_frame, text="（建议：5-20，默认：10）", 
+        ttk.Label(translate_params_frame, text=f"（建议：5-20，默认：{deepl_selenium_translate.DEFAULT_BATCH_SIZE}）", 
                  style="Modern.TLabel").grid(row=1, column=2, sticky="w", padx=5)
 
         # 最大重试次数
         ttk.Label(translate_params_frame, text="最大重试次数:", 
                  style="Modern.TLabel").grid(row=2, column=0, sticky="w", padx=5, pady=5)
-        self.max_retries_var = tk.StringVar(value=str(self.config.get("max_retries", 3)))
+        self.max_retries_var = tk.StringVar(value=str(engine_config["max_retries"]))
         ttk.Entry(translate_params_frame, textvariable=self.max_retries_var, 
                  width=10).grid(row=2, column=1, sticky="w", padx=5)
-        ttk.Label(translate_params_frame, text="（建议：1-5，默认：3）", 
+        ttk.Label(translate_params_frame, text=f"（建议：1-5，默认：{deepl_selenium_translate.DEFAULT_MAX_RETRIES}）", 
                  style="Modern.TLabel").grid(row=2, column=2, sticky="w", padx=5)
 
         # 保存间隔
         ttk.Label(translate_params_frame, text="保存间隔:", 
                  style="Modern.TLabel").grid(row=3, column=0, sticky="w", padx=5, pady=5)
-        self.save_interval_var = tk.StringVar(value=str(self.config.get("save_interval", 100)))
+        self.save_interval_var = tk.StringVar(value=str(engine_config["save_interval"]))
         ttk.Entry(translate_params_frame, textvariable=self.save_interval_var, 
                  width=10).grid(row=3, column=1, sticky="w", padx=5)
-        ttk.Label(translate_params_frame, text="（每处理多少个单元格保存一次，默认：100）", 
+        ttk.Label(translate_params_frame, text=f"（每处理多少个单元格将进度落盘一次，默认：{deepl_selenium_translate.DEFAULT_SAVE_INTERVAL}）", 
                  style="Modern.TLabel").grid(row=3, column=2, sticky="w", padx=5)
 
         # 进度显示间隔
         ttk.Label(translate_params_frame, text="进度显示间隔:", 
                  style="Modern.TLabel").grid(row=4, column=0, sticky="w", padx=5, pady=5)
-        self.progress_interval_var = tk.StringVar(value=str(self.config.get("progress_interval", 10)))
+        self.progress_interval_var = tk.StringVar(value=str(engine_config["progress_interval"]))
         ttk.Entry(translate_params_frame, textvariable=self.progress_interval_var, 
                  width=10).grid(row=4, column=1, sticky="w", padx=5)
-        ttk.Label(translate_params_frame, text="（每处理多少个单元格更新一次进度，默认：10）", 
+        ttk.Label(translate_params_frame, text=f"（每处理多少个单元格更新一次进度，默认：{deepl_selenium_translate.DEFAULT_PROGRESS_INTERVAL}）", 
                  style="Modern.TLabel").grid(row=4, column=2, sticky="w", padx=5)
+
+        # 翻译记忆库缓存
+        ttk.Label(translate_params_frame, text="翻译缓存:", 
+                 style="Modern.TLabel").grid(row=5, column=0, sticky="w", padx=5, pady=5)
+        self.cache_enabled_var = tk.BooleanVar(value=engine_config["cache_enabled"])
+        ttk.Checkbutton(translate_params_frame, text="启用",
+                       variable=self.cache_enabled_var).grid(row=5, column=1, sticky="w", padx=5)
+        ttk.Label(translate_params_frame, text="（复用历史译文，相同原文不再重复调用API，默认：启用）", 
+                 style="Modern.TLabel").grid(row=5, column=2, sticky="w", padx=5)
+
+        # 自适应并发
+        ttk.Label(translate_params_frame, text="自适应并发:", 
+                 style="Modern.TLabel").grid(row=6, column=0, sticky="w", padx=5, pady=5)
+        self.adaptive_concurrency_var = tk.BooleanVar(value=engine_config["adaptive_concurrency"])
+        ttk.Checkbutton(translate_params_frame, text="启用",
+                       variable=self.adaptive_concurrency_var).grid(row=6, column=1, sticky="w", padx=5)
+        ttk.Label(translate_params_frame, text="（根据接口延迟和限流错误自动调整并发数，默认：关闭）", 
+                 style="Modern.TLabel").grid(row=6, column=2, sticky="w", padx=5)
+
+        # 按Token打包批次
+        ttk.Label(translate_params_frame, text="按Token打包:", 
+                 style="Modern.TLabel").grid(row=7, column=0, sticky="w", padx=5, pady=5)
+        self.token_batching_var = tk.BooleanVar(value=engine_config["token_batching"])
+        ttk.Checkbutton(translate_params_frame, text="启用",
+                       variable=self.token_batching_var).grid(row=7, column=1, sticky="w", padx=5)
+        ttk.Label(translate_params_frame, text="（按预计Token数组批，短文本多条合并、超长文本单独请求；关闭后使用批处理大小，默认：启用）", 
+                 style="Modern.TLabel").grid(row=7, column=2, sticky="w", padx=5)
+
+        # 多目标语言合并请求
+        ttk.Label(translate_params_frame, text="多语言合并请求:", 
+                 style="Modern.TLabel").grid(row=8, column=0, sticky="w", padx=5, pady=5)
+        self.multi_target_var = tk.BooleanVar(value=engine_config["multi_target_requests"])
+        ttk.Checkbutton(translate_params_frame, text="启用",
+                       variable=self.multi_target_var).grid(row=8, column=1, sticky="w", padx=5)
+        ttk.Label(translate_params_frame, text="（一次请求返回所有目标语言的译文，解析失败时自动按语言重试，默认：关闭）", 
+                 style="Modern.TLabel").grid(row=8, column=2, sticky="w", padx=5)
         
         # 保存配置按钮
         ttk.Button(settings_page, text="保存配置",
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 默认缓存配置
+DEFAULT_CACHE_PATH = Path.home() / ".translate_cache.db"
+DEFAULT_CACHE_MAX_ENTRIES = 500000  # 默认最多缓存50万条译文
+EVICTION_RATIO = 0.9  # 超出上限时淘汰到上限的90%，避免频繁淘汰
+
+# SQLite 单条语句的参数上限较低，批量查询时分块
+QUERY_CHUNK_SIZE = 500
+
+
+def normalize_text(text):
+    """规范化文本：统一Unicode形式并合并多余空白"""
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text))
+    return " ".join(text.split())
+
+
+def make_cache_key(source_text, source_lang, target_lang, reference_text=None):
+    """根据规范化原文、源语言、目标语言和参考文本生成缓存键"""
+    return cache_key_for(cache_key_base(normalize_text(source_text), source_lang,
+                                        normalize_text(reference_text)), target_lang)
+
+
+def cache_key_base(normalized_text, source_lang, normalized_reference=""):
+    """缓存键中与目标语言无关的部分，参数为已规范化的原文和参考文本
+
+    原文、源语言先计入哈希，每个目标语言只需复制哈希状态再加入目标语言和参考文本（见 cache_key_for），
+    与 make_cache_key 得到相同的键。
+    """
+    prefix = hashlib.sha1(f"{normalized_text}\x1f{source_lang or ''}\x1f".encode("utf-8"))
+    return prefix, normalized_reference or ""
+
+
+def cache_key_for(key_base, target_lang):
+    """由 cache_key_base 的结果生成某个目标语言的缓存键"""
+    prefix, normalized_reference = key_base
+    digest = prefix.copy()
+    digest.update(f"{target_lang or ''}\x1f{normalized_reference}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranslationMemory:
+    """基于SQLite的持久化翻译记忆库（线程安全）"""
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+        self.db_path = Path(db_path) if db_path else DEFAULT_CACHE_PATH
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                cache_key TEXT PRIMARY KEY,
+                source_text TEXT NOT NULL,
+                source_lang TEXT,
+                target_lang TEXT,
+                reference_text TEXT,
+                translation TEXT NOT NULL,
+                created_at REAL,
+                last_used REAL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)"
+        )
+        self._conn.commit()
+        self._entry_count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def get_many(self, keys):
+        """批量查询缓存，返回 {cache_key: 译文}"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+                chunk = keys[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT cache_key, translation FROM translations WHERE cache_key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                # 更新最近使用时间，供淘汰策略使用
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE cache_key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, entries):
+        """批量写入缓存，返回本次写入触发淘汰的条目数
+
+        entries: 可迭代的 (source_text, source_lang, target_lang, reference_text, translation)
+        """
+        now = time.time()
+        rows = []
+        for source_text, source_lang, target_lang, reference_text, translation in entries:
+            rows.append((
+                make_cache_key(source_text, source_lang, target_lang, reference_text),
+                normalize_text(source_text),
+                source_lang,
+                target_lang,
+                normalize_text(reference_text) or None,
+                translation,
+                now,
+                now,
+            ))
+        if not rows:
+            return 0
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE translations SET translation = ?, last_used = ? WHERE cache_key = ?",
+                [(row[5], now, row[0]) for row in rows],
+            )
+            self._conn.commit()
+            self._entry_count += inserted
+            if self.max_entries and self._entry_count > self.max_entries:
+                return self._evict()
+        return 0
+
+    def recent_entries(self, source_lang, target_lang, limit):
+        """返回某语言对最近使用的 limit 条 (规范化原文, 译文)，供模糊匹配建立索引"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT source_text, translation FROM translations "
+                "WHERE source_lang = ? AND target_lang = ? ORDER BY last_used DESC LIMIT ?",
+                (source_lang, target_lang, limit),
+            ).fetchall()
+
+    def entries_since(self, source_lang, target_lang, since):
+        """返回某语言对在 since（time.time() 时间戳）之后新写入的 (规范化原文, 译文)，供模糊匹配索引增量更新"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT source_text, translation FROM translations "
+                "WHERE source_lang = ? AND target_lang = ? AND created_at >= ?",
+                (source_lang, target_lang, since),
+            ).fetchall()
+
+    def _evict(self):
+        """按最近使用时间淘汰最旧的条目，返回淘汰的条目数（调用方需持有锁）"""
+        target = int(self.max_entries * EVICTION_RATIO)
+        remove_count = self._entry_count - target
+        if remove_count <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM translations WHERE cache_key IN ("
+            "SELECT cache_key FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (remove_count,),
+        )
+        self._conn.commit()
+        self._entry_count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        logger.info(f"翻译缓存已淘汰 {remove_count} 条旧记录，当前 {self._entry_count} 条")
+        return remove_count
+
+
+
+# 进程内共享的翻译记忆库实例（按路径复用）
+_memories = {}
+_memories_lock = threading.Lock()
+
+
+def get_translation_memory(db_path=None, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+    """获取（或创建）指定路径的共享翻译记忆库"""
+    path = str(Path(db_path) if db_path else DEFAULT_CACHE_PATH)
+    with _memories_lock:
+        memory = _memories.get(path)
+        if memory is None:
+            memory = TranslationMemory(path, max_entries)
+            _memories[path] = memory
+        else:
+            memory.max_entries = max_entries
+        return memory
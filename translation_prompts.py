@@ -0,0 +1,181 @@
+# 批量翻译请求的提示词构建与结果解析，供线程引擎和 asyncio 引擎共用
+
+import json
+import re
+
+TRANSLATION_MODEL = "deepseek-chat"
+TRANSLATION_TEMPERATURE = 0.3
+TRANSLATION_MAX_TOKENS = 2000
+MAX_REPAIR_ROUNDS = 1  # 缺失或格式错误的条目最多补发几轮修复请求
+
+# reference_lang 取该值时，参考文本是模糊匹配到的相似原文的已有译文，而非本条原文的参考翻译
+FUZZY_REFERENCE = "相似条目"
+
+# 非 JSON 返回时的兜底格式："1. 译文"、"1、译文"、"1) 译文"
+NUMBERED_LINE_PATTERN = re.compile(r"^\s*(\d+)\s*[.、)）:：]\s*(.*)$")
+
+
+def build_batch_messages(texts, source_lang, target_lang):
+    """构建不使用参考源的批量翻译请求消息"""
+    batch_prompts = []
+    for i, text in enumerate(texts):
+        batch_prompts.append(f"{i+1}. {source_lang}原文: {text}")
+
+    batch_text = "\n\n".join(batch_prompts)
+
+    prompt = f"""请将以下{len(texts)}条{source_lang}文本翻译成{target_lang}。
+请确保翻译准确、自然、符合目标语言的表达习惯。
+仅返回JSON对象，键为条目编号，值为翻译结果，例如：{{"1": "翻译结果1", "2": "翻译结果2"}}，不要有额外解释。
+
+{batch_text}"""
+
+    return [
+        {"role": "system", "content": "你是一个精通多语言翻译的专家。只翻译文本，不添加任何解释或附加文本。以JSON格式返回结果。"},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def build_reference_messages(batch_data, target_lang, reference_lang):
+    """构建带参考翻译的批量翻译请求消息，batch_data 为 [(原文, 参考文本), ...]
+
+    reference_lang 为 FUZZY_REFERENCE 时，参考文本为相似原文的已有译文（见 format_fuzzy_reference）。
+    """
+    if reference_lang == FUZZY_REFERENCE:
+        label = "相似原文的已有译文"
+        instruction = "如果提供了相似原文的已有译文，请保持术语和风格一致，但必须按本条原文的实际内容翻译（数字、名称等以原文为准）。"
+    else:
+        label = f"{reference_lang}参考翻译"
+        instruction = "如果提供了参考翻译，请确保翻译的内容与参考翻译在语义上保持一致。"
+
+    batch_prompts = []
+    for i, (source_text, ref_text) in enumerate(batch_data):
+        if ref_text:  # 如果有参考文本
+            batch_prompts.append(f"{i+1}. 原文: {source_text}\n   {label}: {ref_text}")
+        else:  # 如果没有参考文本
+            batch_prompts.append(f"{i+1}. 原文: {source_text}")
+
+    batch_text = "\n\n".join(batch_prompts)
+
+    prompt = f"""请将以下{len(batch_data)}条文本翻译成{target_lang}。
+{instruction}
+仅返回JSON对象，键为条目编号，值为翻译结果，例如：{{"1": "翻译结果1", "2": "翻译结果2"}}，不要有额外解释。
+
+{batch_text}"""
+
+    return [
+        {"role": "system", "content": "你是一个精通多领域的翻译专家。只翻译文本，不添加任何解释或附加文本。以JSON格式返回结果。"},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def format_fuzzy_reference(source_text, translation):
+    """把模糊匹配结果格式化为参考文本"""
+    return f"{translation}（相似原文: {source_text}）"
+
+
+def parse_batch_items(result, count):
+    """单次遍历解析批量翻译结果，返回 {条目下标: 译文}
+
+    优先按 JSON 对象（键为条目编号）解析；不是合法 JSON 时按"编号. 译文"逐行解析。
+    缺失、越界或空白的条目不会出现在结果中，由调用方补发修复请求。
+    """
+    items = {}
+    try:
+        data = json.loads(_strip_code_fence(result))
+    except (TypeError, ValueError):
+        data = None
+
+    if isinstance(data, dict):
+        entries = data.items()
+    elif isinstance(data, list) and len(data) == count:
+        entries = ((i + 1, value) for i, value in enumerate(data))
+    else:
+        entries = []
+        for line in (result or "").split("\n"):
+            match = NUMBERED_LINE_PATTERN.match(line)
+            if match:
+                entries.append(match.groups())
+
+    for key, value in entries:
+        try:
+            index = int(str(key).strip().rstrip(".")) - 1
+        except ValueError:
+            continue
+        if isinstance(value, dict) and len(value) == 1:
+            value = next(iter(value.values()))
+        if 0 <= index < count and index not in items and isinstance(value, str) and value.strip():
+            items[index] = value.strip()
+    return items
+
+
+def check_auth_error(error):
+    """API Key 无效时抛出统一的 ValueError，其他错误由调用方处理"""
+    error_msg = str(error).lower()
+    if "401" in error_msg and "invalid" in error_msg and "api key" in error_msg:
+        raise ValueError("API Key无效或未授权，请检查API Key是否正确")
+
+
+def build_multi_target_messages(batch_data, source_lang, target_langs, reference_lang=None):
+    """构建一次返回多个目标语言的批量翻译请求消息（JSON 格式返回）
+
+    batch_data 为 [(原文, 参考文本), ...]，参考文本可以为 None。
+    """
+    batch_prompts = []
+    for i, (source_text, ref_text) in enumerate(batch_data):
+        if ref_text and reference_lang:
+            batch_prompts.append(f"{i+1}. 原文: {source_text}\n   {reference_lang}参考翻译: {ref_text}")
+        else:
+            batch_prompts.append(f"{i+1}. 原文: {source_text}")
+
+    batch_text = "\n\n".join(batch_prompts)
+    langs_text = "、".join(target_langs)
+    example = ", ".join(f'"{lang}": "..."' for lang in target_langs)
+
+    prompt = f"""请将以下{len(batch_data)}条{source_lang}文本分别翻译成{langs_text}。
+请确保翻译准确、自然、符合目标语言的表达习惯。如果提供了参考翻译，请确保译文与参考翻译在语义上保持一致。
+仅返回JSON对象，键为条目编号，值为各目标语言的译文，例如：{{"1": {{{example}}}}}，不要有额外解释。
+
+{batch_text}"""
+
+    return [
+        {"role": "system", "content": "你是一个精通多语言翻译的专家。只翻译文本，不添加任何解释或附加文本。以JSON格式返回结果。"},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_multi_target_response(result, count, target_langs):
+    """解析多目标语言的 JSON 返回结果
+
+    返回长度为 count 的列表，每项为 {目标语言: 译文}；缺失或格式错误的语言不会出现在字典中。
+    整体无法解析为 JSON 时返回全部为空字典的列表。
+    """
+    parsed = [{} for _ in range(count)]
+    try:
+        data = json.loads(_strip_code_fence(result))
+    except (TypeError, ValueError):
+        return parsed
+    if not isinstance(data, dict):
+        return parsed
+
+    for key, value in data.items():
+        try:
+            index = int(str(key).strip().rstrip(".")) - 1
+        except ValueError:
+            continue
+        if not 0 <= index < count or not isinstance(value, dict):
+            continue
+        for lang in target_langs:
+            translation = value.get(lang)
+            if isinstance(translation, str) and translation.strip():
+                parsed[index][lang] = translation.strip()
+    return parsed
+
+
+def _strip_code_fence(text):
+    """去掉模型有时包裹在 JSON 外层的 ``` 代码块标记"""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
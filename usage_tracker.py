@@ -0,0 +1,152 @@
+import csv
+import json
+import threading
+
+# 每次请求记录的用量字段
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+def extract_usage(usage):
+    """从响应的 usage 中取出 (输入, 输出, 缓存命中) token 数，没有 usage 时返回 None
+
+    缓存命中数优先读取 DeepSeek 的 prompt_cache_hit_tokens，其次读取 OpenAI 格式的
+    prompt_tokens_details.cached_tokens。
+    """
+    if usage is None:
+        return None
+    cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details else None
+    return (usage.prompt_tokens or 0, usage.completion_tokens or 0, cached or 0)
+
+
+def format_usage(usage):
+    """把用量汇总格式化为一行文字，用于日志和历史记录"""
+    text = (f"输入 {usage['prompt_tokens']}（缓存命中 {usage['cached_tokens']}），"
+            f"输出 {usage['completion_tokens']}，共 {usage['requests']} 次请求")
+    if "cost" in usage:
+        text += f"，费用约 {usage['cost']:.4f}"
+    return text
+
+
+def _empty_counts():
+    return dict.fromkeys(USAGE_FIELDS, 0)
+
+
+class BatchUsage:
+    """一个批次的用量，批次内的所有请求（含重试、修复请求和对冲请求）都记录到这里"""
+
+    def __init__(self, tracker, batch_id):
+        self.tracker = tracker
+        self.batch_id = batch_id
+
+    def record(self, usage):
+        """记录一次请求的 usage（响应对象的 usage 属性）"""
+        counts = extract_usage(usage)
+        if counts:
+            self.tracker.record(self, counts)
+
+
+class UsageTracker:
+    """Token 用量统计（线程安全），按请求、批次、目标语言和任务累计
+
+    prices 为可选的 {"input": 未命中缓存的输入, "cached_input": 命中缓存的输入, "output": 输出}，
+    单位为每百万 token 的价格；设置后汇总中包含费用。
+    """
+
+    def __init__(self, prices=None):
+        self.prices = prices
+        self._lock = threading.Lock()
+        self._batches = []   # [{"batch", "languages", "items"}]
+        self._weights = []   # 各批次用量在目标语言间的分摊比例
+        self._requests = []  # [(批次号, 输入, 输出, 缓存命中)]
+
+    def start_batch(self, languages, items):
+        """开始记录一个批次
+
+        languages 为目标语言，或多目标批次的 {目标语言: 单元格数}（用量按单元格数分摊到各语言）。
+        """
+        if isinstance(languages, str):
+            weights = {languages: 1.0}
+        else:
+            total = sum(languages.values()) or 1
+            weights = {lang: count / total for lang, count in languages.items()}
+        with self._lock:
+            batch_id = len(self._batches)
+            self._batches.append({"batch": batch_id, "languages": "+".join(weights), "items": items})
+            self._weights.append(weights)
+        return BatchUsage(self, batch_id)
+
+    def record(self, batch, counts):
+        with self._lock:
+            self._requests.append((batch.batch_id,) + tuple(counts))
+
+    def _cost(self, counts):
+        if not self.prices:
+            return None
+        uncached = counts["prompt_tokens"] - counts["cached_tokens"]
+        return (uncached * self.prices.get("input", 0)
+                + counts["cached_tokens"] * self.prices.get("cached_input", 0)
+                + counts["completion_tokens"] * self.prices.get("output", 0)) / 1_000_000
+
+    def _with_cost(self, counts):
+        cost = self._cost(counts)
+        if cost is not None:
+            counts["cost"] = round(cost, 6)
+        return counts
+
+    def totals(self):
+        """整个任务的用量，requests 为有用量信息的请求数"""
+        with self._lock:
+            counts = _empty_counts()
+            for _, *values in self._requests:
+                for field, value in zip(USAGE_FIELDS, values):
+                    counts[field] += value
+            counts["requests"] = len(self._requests)
+        return self._with_cost(counts)
+
+    def by_language(self):
+        """按目标语言汇总的用量，多目标批次按单元格数分摊（取整）"""
+        languages = {}
+        with self._lock:
+            for batch_id, *values in self._requests:
+                for lang, weight in self._weights[batch_id].items():
+                    counts = languages.setdefault(lang, _empty_counts())
+                    for field, value in zip(USAGE_FIELDS, values):
+                        counts[field] += value * weight
+        return {lang: self._with_cost({field: round(value) for field, value in counts.items()})
+                for lang, counts in languages.items()}
+
+    def by_batch(self):
+        """按批次汇总的用量，包含批次的目标语言、单元格数和请求次数"""
+        with self._lock:
+            batches = {batch["batch"]: dict(batch, requests=0, **_empty_counts()) for batch in self._batches}
+            for batch_id, *values in self._requests:
+                batch = batches[batch_id]
+                batch["requests"] += 1
+                for field, value in zip(USAGE_FIELDS, values):
+                    batch[field] += value
+        return [self._with_cost(batch) for batch in batches.values() if batch["requests"]]
+
+    def summary(self):
+        """写入任务摘要和历史记录的汇总：任务总量和各目标语言用量"""
+        summary = self.totals()
+        summary["by_language"] = self.by_language()
+        return summary
+
+    def export_json(self, path):
+        """导出任务、目标语言和批次三级用量"""
+        data = {"totals": self.totals(), "by_language": self.by_language(), "batches": self.by_batch()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        """导出逐次请求的用量，每行一次请求"""
+        with self._lock:
+            rows = [(index, batch_id, self._batches[batch_id]["languages"], self._batches[batch_id]["items"])
+                    + tuple(values) for index, (batch_id, *values) in enumerate(self._requests)]
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("request", "batch", "languages", "items") + USAGE_FIELDS)
+            writer.writerows(rows)